@@ -6,17 +6,45 @@ Created by: FaheemKhan0817
 Last updated: 2025-03-03 08:01:20
 """
 import os
+import sys
+import time
 import requests
-import pandas as pd
 import logging
-from datetime import datetime, timedelta
+import statistics
+from datetime import datetime, timedelta, timezone
 
 from airflow import DAG
+from airflow.exceptions import AirflowFailException
 from airflow.operators.python import PythonOperator
 from airflow.utils.task_group import TaskGroup
 from airflow.utils.dates import days_ago
 from airflow.operators.dummy import DummyOperator
 
+# Make the shared covid_data package importable from the repository checkout
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from covid_data import (
+    DAG_MODES,
+    REFERENCE_URLS,
+    URLS,
+    ArtifactStore,
+    CovidStore,
+    ValidationFailed,
+    artifact_dir,
+    dag_mode,
+    data_dirs,
+    fetch_all,
+    fetch_if_changed,
+    process_source,
+    raw_path,
+    refresh_country_cube,
+    refresh_population,
+    validate_files,
+    validation_report_path,
+)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -28,6 +56,14 @@ logger = logging.getLogger(__name__)
 OWNER = "FaheemKhan0817"
 PIPELINE_TIMESTAMP = "2025-03-03 08:01:20"
 
+# Task layout, set with COVID_DAG_MODE: "fanout" (one task per step and
+# dataset) or "single" (the whole pipeline in one task, without per-task
+# scheduling overhead)
+DAG_MODE = dag_mode()
+
+# Recent runs per layout the summary compares latency over
+LATENCY_HISTORY_RUNS = 10
+
 # Define default arguments for the DAG
 default_args = {
     'owner': OWNER,
@@ -48,158 +84,476 @@ dag = DAG(
     tags=['covid19', 'data_pipeline', 'jhu_csse'],
 )
 
-# Define the data sources
-urls = {
-    "confirmed": "https://raw.githubusercontent.com/CSSEGISandData/COVID-19/master/csse_covid_19_data/csse_covid_19_time_series/time_series_covid19_confirmed_global.csv",
-    "deaths": "https://raw.githubusercontent.com/CSSEGISandData/COVID-19/master/csse_covid_19_data/csse_covid_19_time_series/time_series_covid19_deaths_global.csv",
-    "recovered": "https://raw.githubusercontent.com/CSSEGISandData/COVID-19/master/csse_covid_19_data/csse_covid_19_time_series/time_series_covid19_recovered_global.csv"
-}
+# Define the data sources (shared with the standalone scripts); reference
+# tables are downloaded alongside but not processed as datasets
+urls = URLS
+reference_urls = REFERENCE_URLS
 
 # Define file paths using Airflow's variables
 def get_file_paths():
     """Generate file paths for raw and processed data directories."""
     airflow_home = os.environ.get('AIRFLOW_HOME', '/opt/airflow')
-    raw_data_path = os.path.join(airflow_home, "data", "raw")
-    processed_data_path = os.path.join(airflow_home, "data", "processed")
     
     # Create directories if they don't exist
-    for path in [raw_data_path, processed_data_path]:
-        os.makedirs(path, exist_ok=True)
-    
-    return raw_data_path, processed_data_path
+    return data_dirs(airflow_home)
 
-def download_dataset(dataset_type, url, **kwargs):
-    """Download a specific COVID-19 dataset and save as CSV."""
+def get_artifact_store():
+    """Return the content-addressed store tasks publish their outputs to."""
+    airflow_home = os.environ.get('AIRFLOW_HOME', '/opt/airflow')
+    return ArtifactStore(artifact_dir(airflow_home))
+
+def record_task(context, metrics, step=None):
+    """Record a task's (or a step of a task's) duration and bytes processed for this run."""
+    task_id = context['ti'].task_id + (f".{step}" if step else "")
+    get_artifact_store().record_task(context['run_id'], task_id, **metrics)
+
+def pull_ref(ti, task_id, key):
+    """Return an artifact reference pushed by an upstream task (None if it pushed none)."""
+    return ti.xcom_pull(task_ids=task_id, key=key)
+
+def get_run_conf(**kwargs):
+    """Return the config the DAG run was triggered with (empty for scheduled runs)."""
+    dag_run = kwargs.get('dag_run')
+    return (dag_run.conf if dag_run else None) or {}
+
+def is_full_refresh(**kwargs):
+    """Return True if the DAG run was triggered with {"full_refresh": true}."""
+    return bool(get_run_conf(**kwargs).get('full_refresh', False))
+
+# Pipeline steps, shared by the fan-out tasks and the single-task layout. Each
+# takes and returns artifact references and returns its metrics for record_task
+
+def ingest(dataset_type, url):
+    """Download one source and publish it; returns (raw reference, metrics)."""
     raw_data_path, _ = get_file_paths()
-    raw_file = os.path.join(raw_data_path, f"{dataset_type}.csv")
+    raw_file = raw_path(raw_data_path, dataset_type)
     
     logger.info(f"Downloading {dataset_type} data to {raw_file}...")
+    started = time.perf_counter()
 
     try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        
-        with open(raw_file, "wb") as f:
-            f.write(response.content)
-
-        logger.info(f"✅ Successfully downloaded: {raw_file}")
-        
-        # Pass the file path to the next task via XCom
-        kwargs['ti'].xcom_push(key=f'{dataset_type}_raw_file', value=raw_file)
-        return True
-    
+        # Conditional request: an unchanged source is not downloaded again
+        changed = fetch_if_changed(url, raw_file)
+        if changed:
+            logger.info(f"✅ Successfully downloaded: {raw_file}")
+        else:
+            logger.info(f"⏭️ Source unchanged since last run: {raw_file}")
     except requests.RequestException as e:
         logger.error(f"❌ Failed to download {dataset_type}: {e}")
         raise
+    
+    return publish_raw(dataset_type, changed, time.perf_counter() - started)
 
-def process_dataset(dataset_type, **kwargs):
-    """Process a COVID-19 dataset."""
-    raw_data_path, processed_data_path = get_file_paths()
+def publish_raw(dataset_type, changed, seconds):
+    """Publish a downloaded raw file; returns (raw reference, metrics)."""
+    raw_data_path, _ = get_file_paths()
+    started = time.perf_counter()
     
-    # Attempt to get the file path from XCom, fall back to constructing it
-    ti = kwargs['ti']
-    raw_file = ti.xcom_pull(task_ids=f'ingest_data.download_{dataset_type}_data', 
-                           key=f'{dataset_type}_raw_file')
+    # Publish the download; downstream steps get the reference (hash, size,
+    # shape) and read the stored copy, never the mutable raw file
+    ref = get_artifact_store().publish(f"raw/{dataset_type}", raw_path(raw_data_path, dataset_type), changed=changed)
+    metrics = {
+        'seconds': round(seconds + time.perf_counter() - started, 3),
+        'bytes_in': ref['bytes'] if changed else 0, 'bytes_out': ref['bytes'],
+        'rows': ref.get('rows'), 'changed': changed,
+    }
+    return ref, metrics
+
+def validate(refs, full_refresh=False):
+    """Validate the raw datasets ({dataset: raw reference}); returns (summary, metrics).
+
+    Raises AirflowFailException if they are invalid.
+    """
+    _, processed_data_path = get_file_paths()
+    store = get_artifact_store()
+    started = time.perf_counter()
+    inputs = {dataset_type: ref['sha256'] for dataset_type, ref in refs.items()}
+    
+    # The same inputs already passed validation in an earlier run
+    last = store.ref('validation')
+    if last and last.get('inputs') == inputs and not full_refresh:
+        logger.info("⏭️ Raw data unchanged since it was last validated, skipping validation")
+        metrics = {'seconds': round(time.perf_counter() - started, 3), 'skipped': True, 'bytes_in': 0}
+        return {'ok': True, 'warnings': last.get('warnings', []), 'skipped': True}, metrics
+    
+    try:
+        report = validate_files(
+            {dataset_type: store.resolve(ref) for dataset_type, ref in refs.items()},
+            processed_data_path, raise_on_error=True
+        )
+    except ValidationFailed as e:
+        # Retrying cannot fix bad source data, so fail without retries
+        raise AirflowFailException(f"❌ Raw data failed validation: {e}")
     
-    if not raw_file:
-        raw_file = os.path.join(raw_data_path, f"{dataset_type}.csv")
+    store.publish('validation', validation_report_path(processed_data_path),
+                  inputs=inputs, warnings=report['warnings'])
+    metrics = {
+        'seconds': round(time.perf_counter() - started, 3), 'skipped': False,
+        'bytes_in': sum(ref['bytes'] for ref in refs.values()),
+    }
     
-    processed_file = os.path.join(processed_data_path, f"{dataset_type}_processed.csv")
+    # Compact summary for XCom; the full report is in validation_report.json
+    return {'ok': report['ok'], 'warnings': report['warnings'], 'skipped': False}, metrics
+
+def process(dataset_type, raw_ref, full_refresh=False, chunk_size=None):
+    """Process one dataset from its raw reference; returns (processed file, updated, processed reference, metrics)."""
+    raw_data_path, processed_data_path = get_file_paths()
+    store = get_artifact_store()
+    started = time.perf_counter()
+    
+    # Content decides: the processed file is current if it was built from
+    # exactly this raw file, even if the last run failed after downloading it
+    last = store.ref(f'processed/{dataset_type}')
+    changed = not last or last.get('input_sha256') != raw_ref['sha256']
     
     try:
-        logger.info(f"Processing {raw_file}...")
-        
-        # Check if raw file exists
-        if not os.path.exists(raw_file):
-            raise FileNotFoundError(f"Raw file not found: {raw_file}")
-        
-        # Read the CSV file
-        df = pd.read_csv(raw_file)
-        
-        # Process data: Remove empty columns
-        df.dropna(axis=1, how="all", inplace=True)
-        
-        # Save processed data
-        df.to_csv(processed_file, index=False)
-        logger.info(f"✅ Processed data saved: {processed_file}")
-        
-        # Update processing timestamp
-        kwargs['ti'].xcom_push(key=f'{dataset_type}_processed_timestamp', 
-                              value=PIPELINE_TIMESTAMP)
-        return processed_file
-        
+        processed_file, updated = process_source(
+            dataset_type, raw_data_path, processed_data_path,
+            changed=changed,
+            full_refresh=full_refresh,
+            chunk_size=chunk_size,
+            raw_file=store.resolve(raw_ref),
+        )
     except Exception as e:
         logger.error(f"❌ Error processing {dataset_type}: {e}")
         raise
+    
+    if updated or changed or full_refresh:
+        processed_ref = store.publish(f'processed/{dataset_type}', processed_file,
+                                      input_sha256=raw_ref['sha256'])
+    else:
+        processed_ref = last
+    
+    metrics = {
+        'seconds': round(time.perf_counter() - started, 3),
+        'skipped': not (changed or full_refresh),
+        'bytes_in': raw_ref['bytes'] if changed or full_refresh else 0,
+        'bytes_out': processed_ref['bytes'] if updated else 0,
+        'rows': processed_ref.get('rows'),
+    }
+    return processed_file, updated, processed_ref, metrics
 
-# Create a summary function for final reporting
-def generate_pipeline_summary(**kwargs):
-    """Generate a summary of the data pipeline execution."""
-    ti = kwargs['ti']
+def build_cube(processed_refs, population_raw=None, full_refresh=False):
+    """Build the country cube and population table from the processed references; returns (cube file, metrics)."""
+    raw_data_path, processed_data_path = get_file_paths()
+    store = get_artifact_store()
+    started = time.perf_counter()
+    
+    # Skip the rebuild when the cube was built from exactly these processed files
+    inputs = {dataset_type: ref['sha256'] for dataset_type, ref in processed_refs.items()}
+    last = store.ref('cube')
+    updated = not last or last.get('inputs') != inputs or full_refresh
+
+    try:
+        logger.info("Building country cube...")
+        cube_file = refresh_country_cube(processed_data_path, updated=updated)
+        cube_ref = store.publish('cube', cube_file, inputs=inputs) if updated else last
+    except Exception as e:
+        logger.error(f"❌ Error building country cube: {e}")
+        raise
+    
+    # Country populations for the dashboard's per-capita comparison (optional);
+    # without a fresh download the last known table is kept
+    population_last = store.ref('population')
+    if population_raw is None:
+        logger.warning("⚠️ No population download in this run, keeping the last known population table")
+    population_changed = population_raw is not None and (
+        population_last is None or population_last.get('input_sha256') != population_raw['sha256']
+    )
+    try:
+        population_file = refresh_population(raw_data_path, processed_data_path,
+                                             changed=population_changed or full_refresh)
+        if population_file and population_raw and population_changed:
+            store.publish('population', population_file, input_sha256=population_raw['sha256'])
+    except Exception as e:
+        logger.warning(f"Could not process the population table: {e}")
+    
+    metrics = {
+        'seconds': round(time.perf_counter() - started, 3),
+        'skipped': not updated, 'bytes_out': cube_ref['bytes'] if updated else 0,
+    }
+    return cube_file, metrics
+
+def end_to_end_seconds(**kwargs):
+    """Return the seconds since the DAG run started (None outside a DAG run)."""
+    dag_run = kwargs.get('dag_run')
+    start_date = getattr(dag_run, 'start_date', None)
+    if start_date is None:
+        return None
+    return round((datetime.now(timezone.utc) - start_date).total_seconds(), 3)
+
+def log_summary(run_id, validation, end_to_end=None):
+    """Write the run manifest and log artifacts, validation, task timings and end-to-end latency."""
+    store = get_artifact_store()
     
     logger.info("==== COVID-19 Data Pipeline Summary ====")
     logger.info(f"Pipeline executed by: {OWNER}")
     logger.info(f"Execution timestamp: {PIPELINE_TIMESTAMP}")
+    logger.info(f"DAG layout: {DAG_MODE}")
     
-    # Report on each dataset
-    for dataset_type in urls.keys():
-        processed_file = ti.xcom_pull(task_ids=f'process_data.process_{dataset_type}_data')
-        if processed_file and os.path.exists(processed_file):
-            file_size = os.path.getsize(processed_file) / 1024  # Size in KB
-            logger.info(f"Dataset: {dataset_type} - Successfully processed ({file_size:.2f} KB)")
-        else:
-            logger.warning(f"Dataset: {dataset_type} - Processing may have failed")
+    # Collect this run's artifacts and task records into its manifest
+    names = (
+        [f"raw/{dataset_type}" for dataset_type in {**urls, **reference_urls}]
+        + [f"processed/{dataset_type}" for dataset_type in urls]
+        + ['validation', 'cube', 'population']
+    )
+    manifest = store.write_manifest(run_id, names, dag_mode=DAG_MODE, end_to_end_seconds=end_to_end)
+    
+    # Report on each artifact: shape, size and content hash
+    for name, ref in manifest['artifacts'].items():
+        if ref is None:
+            logger.warning(f"Artifact: {name} - not published")
+            continue
+        shape = f"{ref['rows']} rows x {ref['columns']} columns, " if 'rows' in ref else ""
+        logger.info(f"Artifact: {name} - {shape}{ref['bytes'] / 1024:.2f} KB, sha256 {ref['sha256'][:12]}")
+    
+    if validation:
+        skipped = " (inputs already validated)" if validation.get('skipped') else ""
+        logger.info(f"Validation: passed with {len(validation['warnings'])} warning(s){skipped}")
+        for warning in validation['warnings']:
+            logger.info(f"  {warning}")
+    
+    # Per-task durations and throughput
+    for task_id, record in manifest['tasks'].items():
+        processed_bytes = max(record.get('bytes_in') or 0, record.get('bytes_out') or 0)
+        throughput = processed_bytes / 1024 / 1024 / record['seconds'] if record['seconds'] else 0.0
+        status = "skipped (inputs unchanged)" if record.get('skipped') else f"{throughput:.2f} MB/s"
+        logger.info(
+            f"Task: {task_id} - {record['seconds']:.2f}s, "
+            f"{(record.get('bytes_in') or 0) / 1024:.0f} KB in, {(record.get('bytes_out') or 0) / 1024:.0f} KB out, {status}"
+        )
+    
+    # End-to-end latency of this run against recent runs of each layout
+    if end_to_end is not None:
+        logger.info(f"End-to-end latency: {end_to_end:.2f}s since the DAG run started")
+    for mode in DAG_MODES:
+        latencies = [
+            m['end_to_end_seconds'] for m in store.manifests()
+            if m.get('dag_mode') == mode and m.get('end_to_end_seconds') is not None
+        ][-LATENCY_HISTORY_RUNS:]
+        if latencies:
+            logger.info(
+                f"Latency ({mode} layout, last {len(latencies)} runs): "
+                f"median {statistics.median(latencies):.2f}s, min {min(latencies):.2f}s"
+            )
+    
+    # Drop stored objects no reference or recent run needs any more
+    try:
+        store.gc()
+    except OSError as e:
+        logger.warning(f"Could not clean up the artifact store: {e}")
+    
+    # Report what the dashboard will see, read through the shared data-access layer
+    _, processed_data_path = get_file_paths()
+    try:
+        covid_store = CovidStore(processed_data_path).load()
+        logger.info(
+            f"Data coverage: {len(covid_store.countries)} countries, "
+            f"{len(covid_store.dates)} dates ({covid_store.dates[0]} to {covid_store.dates[-1]})"
+        )
+    except Exception as e:
+        logger.warning(f"Could not load processed data for the summary: {e}")
     
     logger.info("====================================")
     return True
 
-# Start of pipeline marker
-start = DummyOperator(
-    task_id='start_pipeline',
-    dag=dag
-)
+# Fan-out layout: one Airflow task per step and dataset, passing references over XCom
 
-# End of pipeline marker
-end = DummyOperator(
-    task_id='end_pipeline',
-    dag=dag
-)
+def download_dataset(dataset_type, url, **kwargs):
+    """Download a specific COVID-19 dataset and save as CSV."""
+    ref, metrics = ingest(dataset_type, url)
+    kwargs['ti'].xcom_push(key=f'{dataset_type}_raw_artifact', value=ref)
+    kwargs['ti'].xcom_push(key=f'{dataset_type}_changed', value=metrics['changed'])
+    record_task(kwargs, metrics)
+    return True
+
+def download_reference(dataset_type, url, **kwargs):
+    """Download an optional reference table; a failure is logged and the last known table is kept."""
+    try:
+        return download_dataset(dataset_type, url, **kwargs)
+    except requests.RequestException as e:
+        logger.warning(f"⚠️ Could not download the {dataset_type} table ({e}), keeping the last known one")
+        return False
+
+def validate_raw_data(**kwargs):
+    """Check the downloaded datasets together and fail the run before processing if they are invalid."""
+    refs = {
+        dataset_type: pull_ref(kwargs['ti'], f'ingest_data.download_{dataset_type}_data', f'{dataset_type}_raw_artifact')
+        for dataset_type in urls.keys()
+    }
+    summary, metrics = validate(refs, full_refresh=is_full_refresh(**kwargs))
+    record_task(kwargs, metrics)
+    return summary
+
+def process_dataset(dataset_type, **kwargs):
+    """Process a COVID-19 dataset, appending only new date columns when possible."""
+    ti = kwargs['ti']
+    
+    # The raw file comes from the download task as an artifact reference
+    raw_ref = pull_ref(ti, f'ingest_data.download_{dataset_type}_data', f'{dataset_type}_raw_artifact')
+    processed_file, updated, processed_ref, metrics = process(
+        dataset_type, raw_ref,
+        full_refresh=is_full_refresh(**kwargs),
+        chunk_size=get_run_conf(**kwargs).get('chunk_size'),
+    )
+    
+    # Update processing timestamp
+    ti.xcom_push(key=f'{dataset_type}_processed_timestamp', 
+                 value=PIPELINE_TIMESTAMP)
+    ti.xcom_push(key=f'{dataset_type}_updated', value=updated)
+    ti.xcom_push(key=f'{dataset_type}_processed_artifact', value=processed_ref)
+    record_task(kwargs, metrics)
+    return processed_file
+
+def build_country_cube(**kwargs):
+    """Pre-aggregate the processed datasets into the country x date cube."""
+    ti = kwargs['ti']
+    processed_refs = {
+        dataset_type: pull_ref(ti, f'process_data.process_{dataset_type}_data', f'{dataset_type}_processed_artifact')
+        for dataset_type in urls.keys()
+    }
+    population_raw = pull_ref(ti, 'download_population_data', 'population_raw_artifact')
+    cube_file, metrics = build_cube(processed_refs, population_raw, full_refresh=is_full_refresh(**kwargs))
+    record_task(kwargs, metrics)
+    return cube_file
+
+# Create a summary function for final reporting
+def generate_pipeline_summary(**kwargs):
+    """Generate a summary of the data pipeline execution."""
+    validation = kwargs['ti'].xcom_pull(task_ids='validate_data')
+    return log_summary(kwargs['run_id'], validation, end_to_end_seconds(**kwargs))
+
+# Single-task layout: the same steps in one Airflow task, with the downloads
+# running concurrently in threads
+
+def run_pipeline(**kwargs):
+    """Run ingest, validation, processing, the cube and the summary in one task."""
+    full_refresh = is_full_refresh(**kwargs)
+    chunk_size = get_run_conf(**kwargs).get('chunk_size')
+    raw_data_path, _ = get_file_paths()
+    
+    # Concurrent downloads over one keep-alive session; transient failures
+    # are retried with backoff, permanent ones (e.g. 404) fail at once
+    fetched = fetch_all({**urls, **reference_urls}, raw_data_path)
+    failed = {dataset_type: stats['error'] for dataset_type, stats in fetched.items()
+              if stats['error'] and dataset_type in urls}
+    for dataset_type, error in failed.items():
+        logger.error(f"❌ Failed to download {dataset_type}: {error}")
+    if failed:
+        raise requests.RequestException(f"Failed to download {', '.join(failed)}")
+    
+    raw_refs = {}
+    for dataset_type, stats in fetched.items():
+        # A missing reference table keeps the last known one
+        if stats['error']:
+            logger.warning(f"⚠️ Could not download the {dataset_type} table ({stats['error']}), keeping the last known one")
+            continue
+        logger.info(f"{'✅ Downloaded' if stats['changed'] else '⏭️ Unchanged since last run'}: {dataset_type}")
+        raw_refs[dataset_type], metrics = publish_raw(dataset_type, stats['changed'], stats['seconds'])
+        record_task(kwargs, metrics, step=f'download_{dataset_type}')
+    
+    validation, metrics = validate({dataset_type: raw_refs[dataset_type] for dataset_type in urls},
+                                   full_refresh=full_refresh)
+    record_task(kwargs, metrics, step='validate')
+    
+    # Processing is pandas work that holds the GIL, so threads would only
+    # interleave it, and Airflow workers may not start child processes
+    # (Celery workers are daemonic); the datasets are processed in turn
+    processed_refs = {}
+    for dataset_type in urls:
+        _, _, processed_refs[dataset_type], metrics = process(
+            dataset_type, raw_refs[dataset_type], full_refresh=full_refresh, chunk_size=chunk_size
+        )
+        record_task(kwargs, metrics, step=f'process_{dataset_type}')
+    
+    _, metrics = build_cube(processed_refs, raw_refs.get('population'), full_refresh=full_refresh)
+    record_task(kwargs, metrics, step='build_country_cube')
+    
+    return log_summary(kwargs['run_id'], validation, end_to_end_seconds(**kwargs))
+
+if DAG_MODE == 'single':
+    # One task for the whole pipeline
+    pipeline_task = PythonOperator(
+        task_id='run_pipeline',
+        python_callable=run_pipeline,
+        dag=dag,
+    )
+else:
+    # Start of pipeline marker
+    start = DummyOperator(
+        task_id='start_pipeline',
+        dag=dag
+    )
+
+    # End of pipeline marker
+    end = DummyOperator(
+        task_id='end_pipeline',
+        dag=dag
+    )
 
-# DATA INGESTION TASK GROUP
-with TaskGroup(group_id='ingest_data', dag=dag) as ingest_group:
-    # Create ingestion tasks for each dataset
-    ingestion_tasks = []
-    for data_type, url in urls.items():
-        task = PythonOperator(
+    # DATA INGESTION TASK GROUP
+    with TaskGroup(group_id='ingest_data', dag=dag) as ingest_group:
+        # Create ingestion tasks for each dataset
+        ingestion_tasks = []
+        for data_type, url in urls.items():
+            task = PythonOperator(
+                task_id=f'download_{data_type}_data',
+                python_callable=download_dataset,
+                op_kwargs={'dataset_type': data_type, 'url': url},
+                dag=dag,
+            )
+            ingestion_tasks.append(task)
+
+    # Reference tables are optional: they download on their own branch, which
+    # only the cube consumes, and a failed download keeps the last known table
+    reference_tasks = [
+        PythonOperator(
             task_id=f'download_{data_type}_data',
-            python_callable=download_dataset,
+            python_callable=download_reference,
             op_kwargs={'dataset_type': data_type, 'url': url},
             dag=dag,
         )
-        ingestion_tasks.append(task)
-
-# DATA PROCESSING TASK GROUP
-with TaskGroup(group_id='process_data', dag=dag) as process_group:
-    # Create processing tasks for each dataset
-    processing_tasks = []
-    for data_type in urls.keys():
-        task = PythonOperator(
-            task_id=f'process_{data_type}_data',
-            python_callable=process_dataset,
-            op_kwargs={'dataset_type': data_type},
-            dag=dag,
-        )
-        processing_tasks.append(task)
+        for data_type, url in reference_urls.items()
+    ]
 
-# Add summary task
-summary_task = PythonOperator(
-    task_id='generate_summary',
-    python_callable=generate_pipeline_summary,
-    dag=dag
-)
+    # Validation between ingest and processing: bad data fails the run before any
+    # processed file, cube or matrix is rebuilt
+    validate_task = PythonOperator(
+        task_id='validate_data',
+        python_callable=validate_raw_data,
+        dag=dag,
+    )
+
+    # DATA PROCESSING TASK GROUP
+    with TaskGroup(group_id='process_data', dag=dag) as process_group:
+        # Create processing tasks for each dataset
+        processing_tasks = []
+        for data_type in urls.keys():
+            task = PythonOperator(
+                task_id=f'process_{data_type}_data',
+                python_callable=process_dataset,
+                op_kwargs={'dataset_type': data_type},
+                dag=dag,
+            )
+            processing_tasks.append(task)
+
+    # Add country cube task
+    cube_task = PythonOperator(
+        task_id='build_country_cube',
+        python_callable=build_country_cube,
+        dag=dag
+    )
+
+    # Add summary task
+    summary_task = PythonOperator(
+        task_id='generate_summary',
+        python_callable=generate_pipeline_summary,
+        dag=dag
+    )
 
-# Set up the task dependencies
-start >> ingest_group >> process_group >> summary_task >> end
+    # Set up the task dependencies
+    start >> ingest_group >> validate_task >> process_group >> cube_task >> summary_task >> end
+    start >> reference_tasks >> cube_task
 
 # Documentation
 dag.doc_md = """
@@ -207,17 +561,68 @@ dag.doc_md = """
 
 This DAG performs a complete ETL process for COVID-19 data from Johns Hopkins University CSSE:
 
-1. **Data Ingestion**: Downloads the latest COVID-19 datasets (confirmed cases, deaths, recovered)
-2. **Data Processing**: Cleans and processes the raw data
-3. **Summary Generation**: Creates a processing summary and logs the results
+1. **Data Ingestion**: Downloads the latest COVID-19 datasets (confirmed cases, deaths, recovered),
+   skipping sources whose ETag/Last-Modified or content hash did not change since the last run,
+   and publishes each download to the artifact store
+2. **Validation**: Checks the raw datasets for duplicate (country, province) keys, bad date
+   headers, non-numeric or negative counts, decreasing cumulative counts and dates missing
+   from some datasets, and fails the run before anything is processed if they are invalid
+3. **Data Processing**: Cleans and processes the raw data, appending only new date columns to
+   existing processed files
+4. **Country Cube**: Pre-aggregates provinces into country x date series for the dashboard,
+   writes memory-mappable matrices and the country population table
+5. **Summary Generation**: Writes the run manifest and logs artifact shapes, hashes and per-task
+   durations and throughput
 
 ## Data Sources
 - Confirmed cases: JHU CSSE GitHub repository
 - Deaths: JHU CSSE GitHub repository
 - Recovered cases: JHU CSSE GitHub repository
+- Country populations (per-capita comparisons): JHU CSSE UID lookup table. It is optional: it
+  downloads on its own branch that only the cube step waits for, and if it cannot be fetched
+  the last known population table is kept
+
+## Full refresh
+Past values revised upstream are only picked up by a full rebuild. Trigger the DAG with
+the config `{{"full_refresh": true}}` to reprocess every dataset from scratch.
+
+## Artifacts
+Tasks hand files to each other as references into a content-addressed store under
+`$AIRFLOW_HOME/data/artifacts/`: hash-named copies in `objects/`, the latest reference per
+name in `refs/`, and per-run task records plus `manifest.json` in `runs/<run_id>/`. Each
+output records the hashes of the inputs it was built from, so validation, processing and the
+cube are skipped when their inputs are byte-for-byte unchanged, even if an earlier run failed
+part-way. The summary step deletes objects that neither a reference nor one of the last 30
+runs points to, and the records of older runs.
+
+## Task layouts
+Set `COVID_DAG_MODE` in the scheduler and worker environment to choose how the steps above
+become Airflow tasks:
+- `fanout` (default): one task per download and per dataset, plus validation, cube and summary
+  tasks, passing artifact references over XCom
+- `single`: one `run_pipeline` task that runs every step in-process, downloading the
+  sources concurrently in threads; a retry re-runs it, skipping the steps whose inputs
+  are unchanged
+
+Both record the end-to-end latency of each run (from the DAG run's start to the summary) in
+the run manifest, and the summary compares it with the median of recent runs of each layout.
+
+## Validation
+Structural problems always fail the run. A few negative counts and downward revisions are
+normal in the JHU data, so they are only reported as warnings unless they exceed 0.1% / 1%
+of the counts. The latest report is written to `validation_report.json` in the processed
+data directory.
+
+## Large feeds
+Trigger with `{{"chunk_size": 500}}` to rebuild processed files in chunks of 500 rows,
+keeping memory bounded for feeds such as the US county series.
 
 ## Output
-Processed files are saved to: `$AIRFLOW_HOME/data/processed/`
+Processed files are saved to: `$AIRFLOW_HOME/data/processed/` as CSV, with a typed
+Feather copy (`*_processed.feather`) next to each one when pyarrow is installed.
+The country-level cube is saved as `country_cube.npz` in the same directory, and all
+numeric matrices are also written as memory-mappable `.npy` files (with an `index.json`
+sidecar) under `matrices/` for zero-copy dashboard loads.
 
 Created by: {owner}
 Last updated: {timestamp}
@@ -0,0 +1,364 @@
+"""
+Benchmarks of the pipeline and dashboard hot paths.
+
+Pipeline: the steps process_data() (and the DAG's process_dataset tasks) run
+for every dataset are timed in a scratch directory, on raw files rebuilt from
+the bundled data/processed CSVs and on synthetically scaled copies of them.
+A scale "RxD" has R times the rows (extra provinces) and D times the dates
+(the series continue after the last date).
+
+Dashboard: the pipeline first processes the bundled data into a scratch
+directory, so the dashboard reads the same outputs it does in production
+(Feather copies, country cube and memory-mapped matrices) rather than only
+the bundled CSVs. covid_dashboard.py is then pointed at that directory with
+COVID_PROCESSED_DIR and driven headlessly with Streamlit's AppTest, timing
+reruns for country switches, date-range changes and view switches.
+
+Results are written as JSON; pass an earlier results file with --baseline to
+compare medians and fail on regressions.
+
+    python benchmark.py --scales 1x1 10x1 --output bench.json
+    python benchmark.py --baseline bench.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import platform
+import statistics
+import tempfile
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from covid_data import (
+    DATASETS,
+    META_COLS,
+    PhaseTimer,
+    data_dirs,
+    processed_path,
+    process_source,
+    raw_path,
+    read_processed,
+    refresh_country_cube,
+)
+from covid_data.formats import JHU_DATE_FORMAT, date_columns
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BUNDLED_DIR = os.path.join(BASE_DIR, "data", "processed")
+DASHBOARD = os.path.join(BASE_DIR, "covid_dashboard.py")
+# Environment variable covid_dashboard.py reads its processed data directory from
+PROCESSED_DIR_ENV = "COVID_PROCESSED_DIR"
+
+DEFAULT_SCALES = ["1x1", "10x1", "1x10", "100x1"]
+DEFAULT_OUTPUT = "benchmark_results.json"
+
+# Two-digit JHU years past 2068 would parse as 19xx
+LAST_SYNTHETIC_DATE = pd.Timestamp("2068-12-31")
+
+# Countries visited by the country-switch scenario (twice: first visit, then revisit)
+SWITCH_COUNTRIES = ["US", "India", "China", "Germany", "Brazil"]
+# Start dates of the date-range scenario
+RANGE_STARTS = ["2020-06-01", "2021-01-01", "2021-07-01", "2022-01-01"]
+
+
+def parse_scale(scale):
+    """Return (row factor, date factor) of a scale such as '10x1'."""
+    try:
+        rows, dates = (int(part) for part in scale.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid scale {scale!r}, expected ROWSxDATES such as 10x1")
+    if rows < 1 or dates < 1:
+        raise argparse.ArgumentTypeError(f"Invalid scale {scale!r}, factors must be at least 1")
+    return scale, rows, dates
+
+
+def summarize(seconds):
+    return {
+        'seconds': [round(s, 4) for s in seconds],
+        'median': round(statistics.median(seconds), 4),
+        'min': round(min(seconds), 4),
+    }
+
+
+# Synthetic inputs
+def scale_frame(df, rows=1, dates=1):
+    """Return a raw-format frame with rows times the rows and dates times the date columns."""
+    date_cols = date_columns(df.columns)
+    values = df[date_cols].fillna(0).to_numpy(dtype=np.int64)
+
+    if dates > 1:
+        # Each extra block continues the cumulative series from its last value
+        last = values[:, -1:]
+        values = np.hstack([values + k * last for k in range(dates)])
+        index = pd.date_range(pd.to_datetime(date_cols[0], format=JHU_DATE_FORMAT), periods=values.shape[1])
+        if index[-1] > LAST_SYNTHETIC_DATE:
+            raise ValueError(f"{dates}x dates run past {LAST_SYNTHETIC_DATE.date()}, the last date JHU's format can express")
+        date_cols = [f"{d.month}/{d.day}/{d.year % 100:02d}" for d in index]
+
+    meta = df[META_COLS].reset_index(drop=True)
+    if rows > 1:
+        # Extra copies become provinces of their own so (country, province) keys stay unique
+        copies = []
+        for k in range(rows):
+            copy = meta.copy()
+            if k:
+                province = copy['Province/State'].astype(object).fillna(copy['Country/Region'].astype(str))
+                copy['Province/State'] = province.astype(str) + f" #{k}"
+            copies.append(copy)
+        meta = pd.concat(copies, ignore_index=True)
+        values = np.tile(values, (rows, 1))
+
+    return pd.concat([meta, pd.DataFrame(values, columns=date_cols)], axis=1)
+
+
+def write_raw_inputs(raw_dir, rows, dates):
+    """Write scaled raw files of every dataset; returns the (rows, dates) of the largest one."""
+    shape = (0, 0)
+    for dataset in DATASETS:
+        df = scale_frame(read_processed(processed_path(BUNDLED_DIR, dataset)), rows, dates)
+        df.to_csv(raw_path(raw_dir, dataset), index=False)
+        shape = max(shape, (len(df), len(df.columns) - len(META_COLS)))
+    return shape
+
+
+def drop_last_date(raw_dir):
+    """Remove the last date column of every raw file (to time appending it back)."""
+    for dataset in DATASETS:
+        path = raw_path(raw_dir, dataset)
+        df = pd.read_csv(path)
+        df.iloc[:, :-1].to_csv(path + ".full", index=False)
+        os.replace(path, path + ".last")
+        os.replace(path + ".full", path)
+
+
+def restore_last_date(raw_dir):
+    for dataset in DATASETS:
+        path = raw_path(raw_dir, dataset)
+        os.replace(path + ".last", path)
+
+
+# Pipeline benchmark
+def benchmark_pipeline(scale, rows, dates, repeat, chunk_size):
+    """Time the processing steps on one input scale; returns the result entries."""
+    work_dir = tempfile.mkdtemp(prefix=f"covid_bench_{scale}_")
+    try:
+        raw_dir, processed_dir = data_dirs(work_dir)
+        logger.info(f"Writing {scale} synthetic inputs to {raw_dir}...")
+        n_rows, n_dates = write_raw_inputs(raw_dir, rows, dates)
+        logger.info(f"Inputs: {n_rows} rows x {n_dates} dates per dataset")
+
+        runs = []
+        for _ in range(repeat):
+            timer = PhaseTimer(label=scale)
+
+            # Full rebuild of every dataset from a raw file one date short
+            drop_last_date(raw_dir)
+            shutil.rmtree(processed_dir)
+            os.makedirs(processed_dir)
+            with timer.phase("process full"):
+                for dataset in DATASETS:
+                    process_source(dataset, raw_dir, processed_dir, full_refresh=True)
+
+            # Incremental run appending the missing date column
+            restore_last_date(raw_dir)
+            with timer.phase("process append 1 date"):
+                for dataset in DATASETS:
+                    process_source(dataset, raw_dir, processed_dir)
+
+            # Incremental run with nothing new to append
+            with timer.phase("process no new dates"):
+                for dataset in DATASETS:
+                    process_source(dataset, raw_dir, processed_dir)
+
+            # Bounded-memory rebuild
+            with timer.phase("process streaming"):
+                for dataset in DATASETS:
+                    process_source(dataset, raw_dir, processed_dir, full_refresh=True, chunk_size=chunk_size)
+
+            with timer.phase("country cube"):
+                refresh_country_cube(processed_dir, updated=True)
+
+            runs.append(timer.as_dict()['phases'])
+
+        return [
+            {
+                'scale': scale,
+                'rows': n_rows,
+                'dates': n_dates,
+                'step': step,
+                **summarize([run[step] for run in runs]),
+            }
+            for step in runs[0]
+        ]
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+# Dashboard benchmark
+def timed_run(at, scenario, results, phases):
+    start = time.perf_counter()
+    at.run()
+    seconds = time.perf_counter() - start
+    if len(at.exception) or len(at.error):
+        raise RuntimeError(f"Dashboard failed during {scenario}: {[e.value for e in [*at.exception, *at.error]]}")
+    results.setdefault(scenario, []).append(seconds)
+    # Phase breakdown the dashboard recorded for its last rerun
+    phases[scenario] = at.session_state["rerun_timings"][-1]['phases']
+
+
+def prepare_dashboard_data(work_dir):
+    """Run the pipeline on the bundled data into work_dir; returns its processed directory."""
+    raw_dir, processed_dir = data_dirs(work_dir)
+    write_raw_inputs(raw_dir, 1, 1)
+    for dataset in DATASETS:
+        process_source(dataset, raw_dir, processed_dir, full_refresh=True)
+    refresh_country_cube(processed_dir, updated=True)
+    return processed_dir
+
+
+def benchmark_dashboard(repeat):
+    """Time dashboard reruns headlessly on freshly processed data; returns the result entries."""
+    from streamlit.testing.v1 import AppTest
+
+    work_dir = tempfile.mkdtemp(prefix="covid_bench_dashboard_")
+    previous_dir = os.environ.get(PROCESSED_DIR_ENV)
+    try:
+        logger.info(f"Processing the bundled data into {work_dir}...")
+        os.environ[PROCESSED_DIR_ENV] = prepare_dashboard_data(work_dir)
+
+        results, phases = {}, {}
+        at = AppTest.from_file(DASHBOARD, default_timeout=300)
+        timed_run(at, "cold start", results, phases)
+        timed_run(at, "rerun (no change)", results, phases)
+
+        countries = [c for c in SWITCH_COUNTRIES if c in at.sidebar.selectbox[0].options]
+        for scenario in ("country switch (first visit)", "country switch (revisit)"):
+            for country in countries:
+                at.sidebar.selectbox[0].set_value(country)
+                timed_run(at, scenario, results, phases)
+
+        for _ in range(repeat):
+            for start in RANGE_STARTS:
+                at.sidebar.date_input[0].set_value(datetime.strptime(start, "%Y-%m-%d").date())
+                timed_run(at, "date range change", results, phases)
+
+        views = at.radio(key="view").options
+        for _ in range(repeat):
+            for view in views:
+                at.radio(key="view").set_value(view)
+                timed_run(at, f"view: {view}", results, phases)
+
+        return [
+            {'scenario': scenario, **summarize(seconds), 'phases': phases[scenario]}
+            for scenario, seconds in results.items()
+        ]
+    finally:
+        if previous_dir is None:
+            os.environ.pop(PROCESSED_DIR_ENV, None)
+        else:
+            os.environ[PROCESSED_DIR_ENV] = previous_dir
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+# Regression comparison
+def result_key(entry):
+    if 'scenario' in entry:
+        return ('dashboard', entry['scenario'])
+    return ('pipeline', entry['scale'], entry['step'])
+
+
+def compare_results(results, baseline, tolerance):
+    """Log the median ratio of every result found in the baseline; returns the regressed keys."""
+    previous = {
+        result_key(entry): entry
+        for section in ('pipeline', 'dashboard')
+        for entry in baseline.get(section, [])
+    }
+    regressions = []
+    for section in ('pipeline', 'dashboard'):
+        for entry in results.get(section, []):
+            key = result_key(entry)
+            if key not in previous or not previous[key]['median']:
+                continue
+            ratio = entry['median'] / previous[key]['median']
+            entry['baseline_median'] = previous[key]['median']
+            entry['ratio'] = round(ratio, 3)
+            name = " / ".join(key[1:])
+            if ratio > tolerance:
+                regressions.append(name)
+                logger.warning(f"❌ {name}: {previous[key]['median']:.3f}s -> {entry['median']:.3f}s ({ratio:.2f}x)")
+            else:
+                logger.info(f"✅ {name}: {previous[key]['median']:.3f}s -> {entry['median']:.3f}s ({ratio:.2f}x)")
+    return regressions
+
+
+def environment():
+    versions = {'python': platform.python_version(), 'pandas': pd.__version__, 'numpy': np.__version__}
+    try:
+        import streamlit
+        versions['streamlit'] = streamlit.__version__
+    except ImportError:
+        pass
+    return {'platform': platform.platform(), 'cpu_count': os.cpu_count(), **versions}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the COVID-19 pipeline and dashboard")
+    parser.add_argument(
+        "--scales",
+        nargs="+",
+        type=parse_scale,
+        default=[parse_scale(scale) for scale in DEFAULT_SCALES],
+        help=f"input scales as ROWSxDATES factors of the bundled data (default: {' '.join(DEFAULT_SCALES)})",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement")
+    parser.add_argument("--chunk-size", type=int, default=500, help="row chunk size of the streaming step")
+    parser.add_argument("--skip-pipeline", action="store_true", help="only benchmark the dashboard")
+    parser.add_argument("--skip-dashboard", action="store_true", help="only benchmark the pipeline")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="JSON results file (default: %(default)s)")
+    parser.add_argument("--baseline", help="earlier results file to compare medians against")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=1.25,
+        help="median ratio over the baseline counted as a regression (default: %(default)s)",
+    )
+    args = parser.parse_args()
+
+    results = {
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'environment': environment(),
+        'repeat': args.repeat,
+    }
+
+    if not args.skip_pipeline:
+        results['pipeline'] = []
+        for scale, rows, dates in args.scales:
+            logger.info(f"Benchmarking pipeline at {scale}...")
+            results['pipeline'] += benchmark_pipeline(scale, rows, dates, args.repeat, args.chunk_size)
+
+    if not args.skip_dashboard:
+        logger.info("Benchmarking dashboard reruns...")
+        results['dashboard'] = benchmark_dashboard(args.repeat)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_results(results, json.load(f), args.tolerance)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    logger.info(f"✅ Benchmark results saved: {args.output}")
+
+    if regressions:
+        logger.error(f"❌ {len(regressions)} regression(s) over {args.tolerance}x the baseline")
+        sys.exit(1)
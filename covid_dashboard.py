@@ -1,11 +1,31 @@
 import os
+import time
 import pandas as pd
-import numpy as np
 import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
-from datetime import datetime
-import time  # Added for progress bar function
+
+from covid_data import (
+    CHART_WIDTH_PX,
+    MAP_LEVELS,
+    RANKED_METRICS,
+    CovidStore,
+    LRUCache,
+    PhaseTimer,
+    bar_budget,
+    cache_stats,
+    columnar_available,
+    export_bytes,
+    export_filename,
+    line_budget,
+    lttb,
+    lttb_long,
+    resample_mean,
+    timings_json,
+)
+
+# Time each phase of this rerun (shown in the sidebar's rerun timings panel)
+timer = PhaseTimer(label="rerun")
 
 # Set page configuration
 st.set_page_config(
@@ -87,41 +107,108 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
+# Processed data written by the pipeline; COVID_PROCESSED_DIR points the
+# dashboard at another pipeline output (e.g. a benchmark's scratch directory)
+PROCESSED_DIR = os.environ.get("COVID_PROCESSED_DIR") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "data", "processed"
+)
+
+# Number of reruns whose timings are kept per session for the JSON export
+RERUN_HISTORY = 50
+
+# Dashboard views; only the selected one is computed and rendered on a rerun
+VIEWS = ["Cases Over Time", "Daily New Cases", "Case Distribution", "Regional Data",
+         "Compare Countries", "Global Overview", "Map"]
+
+# Widgets inside the views, whose state must survive while their view is hidden
+VIEW_WIDGET_KEYS = [
+    "province_dataset", "compare_countries", "compare_series", "per_capita",
+    "ranking_metric", "top_n", "min_cases", "map_dataset", "map_level", "map_date",
+]
+
+# Number of built figures kept in memory, shared by all sessions
+FIGURE_CACHE_SIZE = 256
+
+# Map animation: days between frames and seconds each frame is shown
+MAP_FRAME_DAYS = 7
+MAP_FRAME_SECONDS = 0.3
+# Largest map marker, in pixels
+MAP_MARKER_PX = 50
+
+# Number of serialized exports kept in memory, shared by all sessions
+EXPORT_CACHE_SIZE = 16
+
+# Series offered in the country comparison, keyed by label
+COMPARISON_SERIES = {
+    "Cumulative Cases": "confirmed",
+    "Cumulative Deaths": "deaths",
+    "Daily Cases (7-Day Avg)": "avg7_daily_confirmed",
+    "Daily Deaths (7-Day Avg)": "avg7_daily_deaths",
+}
+
 # Header
 st.markdown("<h1 class='main-header'>🌍 COVID-19 Dashboard</h1>", unsafe_allow_html=True)
 
-# Add a custom progress bar for data loading
-def custom_progress_bar():
-    progress_container = st.empty()
-    for percent_complete in range(0, 101, 5):
-        progress_container.progress(percent_complete)
-        time.sleep(0.02)  # Short delay for visual effect
-    progress_container.empty()
+# Shared data-access layer: datasets are cached once per process as a read-only
+# resource (no per-rerun copies) and reloaded when the pipeline rewrites the
+# processed files rather than on a fixed TTL; the numeric matrices are
+# memory-mapped, so worker processes share them via the page cache
+@st.cache_resource
+def get_store():
+    return CovidStore(PROCESSED_DIR)
+
+# Built figures, keyed by everything they depend on (including the data version)
+@st.cache_resource
+def get_figure_cache():
+    return LRUCache(maxsize=FIGURE_CACHE_SIZE)
+
+def cached_figure(name, key, build):
+    with timer.phase(f"figure: {name}"):
+        return get_figure_cache().get_or_build((name,) + key, build)
+
+# Serialized exports, keyed by format and everything the exported frame depends on
+@st.cache_resource
+def get_export_cache():
+    return LRUCache(maxsize=EXPORT_CACHE_SIZE)
+
+def cached_export(fmt, key, build_frame):
+    with timer.phase(f"export: {fmt}"):
+        return get_export_cache().get_or_build((fmt,) + key, lambda: export_bytes(build_frame(), fmt))
 
-# Load data with caching
-@st.cache_data(ttl=3600)
+# The shared store is never modified; load() returns a view pinned to the
+# current data version, used for the rest of this rerun
 def load_data():
     try:
-        # Define paths based on file structure
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        processed_dir = os.path.join(base_dir, "data", "processed")
-        
-        # Load datasets
-        confirmed_df = pd.read_csv(os.path.join(processed_dir, "confirmed_processed.csv"))
-        deaths_df = pd.read_csv(os.path.join(processed_dir, "deaths_processed.csv"))
-        recovered_df = pd.read_csv(os.path.join(processed_dir, "recovered_processed.csv"))
-        
-        return {
-            'confirmed': confirmed_df,
-            'deaths': deaths_df,
-            'recovered': recovered_df
-        }
+        return get_store().load()
     except Exception as e:
         st.error(f"Error loading data: {e}")
         return None
 
-with st.spinner("Loading data..."):
-    custom_progress_bar()  # Show progress bar while loading
+# Reduce a series frame to what a chart of width_px can show: LTTB for lines,
+# period means for bars. Returns the frame to plot and a note if it was reduced.
+def downsample_for_chart(df, columns, kind, enabled, width_px=CHART_WIDTH_PX):
+    if not enabled:
+        return df, None
+    with timer.phase("downsample"):
+        if kind == "line":
+            reduced, changed = lttb(df, columns, line_budget(width_px))
+            note = f"{len(reduced)} of {len(df)} points per series (LTTB)" if changed else None
+        else:
+            reduced, period = resample_mean(df[['Date'] + columns], bar_budget(width_px))
+            note = f"{period} averages" if period else None
+    return reduced, note
+
+def show_downsample_note(note):
+    if note:
+        st.caption(f"Downsampled for display: {note}. Turn off \"Downsample long time series\" to plot every day.")
+
+# Streamlit drops the state of widgets that are not rendered in a rerun, so
+# re-assign the state of the view widgets to keep it across view switches
+for widget_key in VIEW_WIDGET_KEYS:
+    if widget_key in st.session_state:
+        st.session_state[widget_key] = st.session_state[widget_key]
+
+with st.spinner("Loading data..."), timer.phase("load"):
     data = load_data()
 
 if data is None:
@@ -129,25 +216,10 @@ if data is None:
     st.info("Please ensure data files are in the data/processed/ directory.")
     st.stop()
 
-# Process JHU CSSE data format
-def process_jhu_data(data):
-    # Extract metadata columns and date columns
-    meta_cols = ['Province/State', 'Country/Region', 'Lat', 'Long']
-    
-    confirmed_dates = [col for col in data['confirmed'].columns if col not in meta_cols]
-    deaths_dates = [col for col in data['deaths'].columns if col not in meta_cols]
-    recovered_dates = [col for col in data['recovered'].columns if col not in meta_cols]
-    
-    # Use the intersection of all datasets to ensure consistent dates
-    common_dates = sorted(set(confirmed_dates).intersection(set(deaths_dates)).intersection(set(recovered_dates)))
-    
-    # Get unique countries - we'll aggregate provinces together
-    countries = sorted(data['confirmed']['Country/Region'].unique())
-    
-    return meta_cols, common_dates, countries
-
 try:
-    meta_cols, date_columns, countries = process_jhu_data(data)
+    # The store carries the dates shared by all datasets (pre-parsed) and the sorted country list
+    date_index = data.date_index
+    countries = data.countries
     
     # Sidebar controls
     st.sidebar.header("Dashboard Controls")
@@ -163,21 +235,9 @@ try:
         index=countries.index(default_country)
     )
     
-    # Parse dates for date range selector
-    parsed_dates = []
-    for date_str in date_columns:
-        try:
-            # Handle JHU date format (e.g., "1/22/20")
-            parsed_date = pd.to_datetime(date_str, format='%m/%d/%y')
-            parsed_dates.append((date_str, parsed_date))
-        except:
-            continue
-    
-    parsed_dates.sort(key=lambda x: x[1])
-    
-    if parsed_dates:
-        min_date = parsed_dates[0][1]
-        max_date = parsed_dates[-1][1]
+    if len(date_index):
+        min_date = date_index[0]
+        max_date = date_index[-1]
         
         # Set default start date to Jan 22, 2020 if available
         default_start = pd.to_datetime("2020-01-22")
@@ -199,14 +259,9 @@ try:
         with col2:
             end_date = st.date_input("End Date", default_end, min_value=min_date, max_value=max_date)
         
-        # Filter dates based on selected range
-        selected_date_strs = []
-        for date_str, date_obj in parsed_dates:
-            if start_date <= date_obj.date() <= end_date:
-                selected_date_strs.append(date_str)
     else:
         st.warning("Could not parse date columns correctly")
-        selected_date_strs = date_columns[:30]  # Use first 30 dates as fallback
+        start_date = end_date = None  # Fall back to the full date range
     
     # Simple visualization options
     st.sidebar.subheader("Visualization Options")
@@ -219,70 +274,45 @@ try:
         index=0
     )
     
-    # Process data for selected country (aggregating provinces)
-    def get_country_data(df, country, date_cols):
-        # Filter rows for the selected country
-        country_data = df[df['Country/Region'] == country]
-        
-        if len(country_data) > 1:
-            # If multiple provinces, sum them up
-            aggregated = country_data[date_cols].sum(axis=0)
-            return aggregated.values
-        elif len(country_data) == 1:
-            # If only one entry, return its values
-            return country_data[date_cols].values[0]
-        else:
-            # No data for this country
-            return np.zeros(len(date_cols))
+    # Bound the points sent to the browser by chart width instead of date range
+    downsample = st.sidebar.checkbox(
+        "Downsample long time series",
+        True,
+        help="Plot about one point per few pixels (LTTB for lines, weekly/monthly means for bars)"
+    )
+
+    # Data cache status for this process (shared by all sessions)
+    with st.sidebar.expander("Data cache"):
+        stats = cache_stats()
+        st.caption(f"This rerun: cache {data.last_lookup} · hit rate {stats['hit_rate']:.0%}")
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Hits", stats['hits'])
+        col2.metric("Misses", stats['misses'])
+        col3.metric("Reloads", stats['reloads'])
+        for entry in stats['entries'].values():
+            st.caption(f"Loaded at {entry['loaded_at']} UTC")
+            st.table(pd.DataFrame(
+                [{"Load": name, "Seconds": f"{seconds:.3f}"} for name, seconds in entry['timings'].items()]
+            ))
+
+    # Inputs shared by the figures of the selected country; figures are only
+    # rebuilt when one of them (or the figure's own options) changes
+    view_key = (data.version, selected_country, start_date, end_date, downsample)
     
-    # Get data for the selected country
-    confirmed_values = get_country_data(data['confirmed'], selected_country, selected_date_strs)
-    deaths_values = get_country_data(data['deaths'], selected_country, selected_date_strs)
+    # Pre-aggregated cumulative, active, daily and 7-day average series for the
+    # selected country (daily values are precomputed with negative corrections
+    # clipped to 0; rolling averages are computed once for all countries)
+    with timer.phase("country series"):
+        plot_df = data.country_series(selected_country, start_date, end_date)
     
-    # Handle recovered data which might have fewer countries
-    if selected_country in data['recovered']['Country/Region'].values:
-        recovered_values = get_country_data(data['recovered'], selected_country, selected_date_strs)
-    else:
-        recovered_values = np.zeros(len(selected_date_strs))
-    
-    # Convert to proper dates for plotting
-    plot_dates = [pd.to_datetime(d, format='%m/%d/%y') for d in selected_date_strs]
-    
-    # Create plotting dataframe
-    plot_df = pd.DataFrame({
-        'Date': plot_dates,
-        'Confirmed': confirmed_values,
-        'Deaths': deaths_values,
-        'Recovered': recovered_values
-    })
-    
-    # Add active cases calculation
-    plot_df['Active'] = plot_df['Confirmed'] - plot_df['Deaths'] - plot_df['Recovered']
-    plot_df['Active'] = plot_df['Active'].clip(lower=0)  # Ensure no negative active cases
-    
-    # Calculate daily new cases
-    plot_df['Daily Confirmed'] = plot_df['Confirmed'].diff().fillna(plot_df['Confirmed'].iloc[0])
-    plot_df['Daily Deaths'] = plot_df['Deaths'].diff().fillna(plot_df['Deaths'].iloc[0])
-    plot_df['Daily Recovered'] = plot_df['Recovered'].diff().fillna(plot_df['Recovered'].iloc[0])
-    
-    # Replace negative daily values with 0 (data corrections can cause negative values)
-    plot_df['Daily Confirmed'] = plot_df['Daily Confirmed'].clip(lower=0)
-    plot_df['Daily Deaths'] = plot_df['Daily Deaths'].clip(lower=0)
-    plot_df['Daily Recovered'] = plot_df['Daily Recovered'].clip(lower=0)
-    
-    # Calculate 7-day rolling averages
-    if len(plot_df) >= 7:
-        plot_df['7-Day Avg (Confirmed)'] = plot_df['Daily Confirmed'].rolling(window=7).mean()
-        plot_df['7-Day Avg (Deaths)'] = plot_df['Daily Deaths'].rolling(window=7).mean()
-    
-    # Calculate key metrics for dashboard
-    latest_confirmed = int(plot_df['Confirmed'].iloc[-1])
-    latest_deaths = int(plot_df['Deaths'].iloc[-1])
-    latest_recovered = int(plot_df['Recovered'].iloc[-1])
-    latest_active = int(plot_df['Active'].iloc[-1])
-    
-    # Calculate mortality rate
-    mortality_rate = (latest_deaths / latest_confirmed * 100) if latest_confirmed > 0 else 0
+    with timer.phase("derived metrics"):
+        # Key metrics on the last selected date, looked up from the precomputed metrics
+        snapshot = data.country_snapshot(selected_country, end_date)
+        latest_confirmed = snapshot['confirmed']
+        latest_deaths = snapshot['deaths']
+        latest_recovered = snapshot['recovered']
+        latest_active = snapshot['active']
+        mortality_rate = snapshot['mortality_rate']
     
     # Main dashboard content
     st.markdown(f"<h2 class='sub-header'>COVID-19 Stats for {selected_country}</h2>", unsafe_allow_html=True)
@@ -322,82 +352,107 @@ try:
             </div>
         ''', unsafe_allow_html=True)
     
-    # Create tabs for different analyses
-    tabs = st.tabs(["Cases Over Time", "Daily New Cases", "Case Distribution", "Regional Data"])
+    # View selector for the different analyses: unlike st.tabs, which runs the
+    # body of every tab on each rerun, only the selected view is built
+    view = st.radio("View", VIEWS, horizontal=True, label_visibility="collapsed", key="view")
     
-    # Tab 1: Cumulative Cases
-    with tabs[0]:
+    # View 1: Cumulative Cases
+    if view == VIEWS[0]:
         st.subheader("Cumulative COVID-19 Cases")
         
-        # Create chart based on selected type (line or bar)
-        if chart_type == "Line":
-            cumulative_fig = px.line(
-                plot_df, x='Date', y=['Confirmed', 'Deaths', 'Recovered', 'Active'],
-                title=f"COVID-19 Cases in {selected_country}",
-                labels={'value': 'Number of Cases', 'variable': 'Type'},
-                color_discrete_map={
-                    'Confirmed': '#1E88E5', 
-                    'Deaths': '#E53935', 
-                    'Recovered': '#43A047',
-                    'Active': '#7E57C2'
-                },
-                log_y=use_log_scale
+        def build_cumulative_figure():
+            cumulative_df, cumulative_note = downsample_for_chart(
+                plot_df, ['Confirmed', 'Deaths', 'Recovered', 'Active'],
+                "line" if chart_type == "Line" else "bar", downsample
             )
-        else:  # Bar chart
-            cumulative_fig = px.bar(
-                plot_df, x='Date', y=['Confirmed', 'Deaths', 'Recovered', 'Active'],
-                title=f"COVID-19 Cases in {selected_country}",
-                labels={'value': 'Number of Cases', 'variable': 'Type'},
-                color_discrete_map={
-                    'Confirmed': '#1E88E5', 
-                    'Deaths': '#E53935', 
-                    'Recovered': '#43A047',
-                    'Active': '#7E57C2'
-                },
-                log_y=use_log_scale
+        
+            # Create chart based on selected type (line or bar)
+            if chart_type == "Line":
+                cumulative_fig = px.line(
+                    cumulative_df, x='Date', y=['Confirmed', 'Deaths', 'Recovered', 'Active'],
+                    title=f"COVID-19 Cases in {selected_country}",
+                    labels={'value': 'Number of Cases', 'variable': 'Type'},
+                    color_discrete_map={
+                        'Confirmed': '#1E88E5', 
+                        'Deaths': '#E53935', 
+                        'Recovered': '#43A047',
+                        'Active': '#7E57C2'
+                    },
+                    log_y=use_log_scale
+                )
+            else:  # Bar chart
+                cumulative_fig = px.bar(
+                    cumulative_df, x='Date', y=['Confirmed', 'Deaths', 'Recovered', 'Active'],
+                    title=f"COVID-19 Cases in {selected_country}",
+                    labels={'value': 'Number of Cases', 'variable': 'Type'},
+                    color_discrete_map={
+                        'Confirmed': '#1E88E5', 
+                        'Deaths': '#E53935', 
+                        'Recovered': '#43A047',
+                        'Active': '#7E57C2'
+                    },
+                    log_y=use_log_scale
+                )
+        
+            cumulative_fig.update_layout(
+                xaxis_title="Date",
+                yaxis_title="Number of Cases (Log Scale)" if use_log_scale else "Number of Cases",
+                yaxis_type="log" if use_log_scale else "linear",
+                legend_title="Case Type",
+                hovermode="x unified",
+                height=500
             )
+            return cumulative_fig, cumulative_note
         
-        cumulative_fig.update_layout(
-            xaxis_title="Date",
-            yaxis_title="Number of Cases (Log Scale)" if use_log_scale else "Number of Cases",
-            yaxis_type="log" if use_log_scale else "linear",
-            legend_title="Case Type",
-            hovermode="x unified",
-            height=500
+        cumulative_fig, cumulative_note = cached_figure(
+            "cumulative", view_key + (chart_type, use_log_scale), build_cumulative_figure
         )
         
-        st.plotly_chart(cumulative_fig, use_container_width=True)
+        with timer.phase("render: cumulative"):
+            st.plotly_chart(cumulative_fig, use_container_width=True)
+        show_downsample_note(cumulative_note)
     
-    # Tab 2: Daily New Cases
-    with tabs[1]:
+    # View 2: Daily New Cases
+    if view == VIEWS[1]:
         st.subheader("Daily New Cases")
         
         # Daily cases visualization
         col1, col2 = st.columns([2, 1])
         
         with col1:
-            # Bar chart for daily cases
-            daily_fig = px.bar(
-                plot_df, x='Date', y=['Daily Confirmed', 'Daily Deaths', 'Daily Recovered'],
-                title=f"Daily New Cases in {selected_country}",
-                labels={'value': 'Daily Cases', 'variable': 'Type'},
-                color_discrete_map={
-                    'Daily Confirmed': '#1E88E5',
-                    'Daily Deaths': '#E53935',
-                    'Daily Recovered': '#43A047'
-                },
-                barmode='group'
-            )
+            def build_daily_figure():
+                daily_df, daily_note = downsample_for_chart(
+                    plot_df, ['Daily Confirmed', 'Daily Deaths', 'Daily Recovered'], "bar", downsample,
+                    width_px=CHART_WIDTH_PX * 2 // 3
+                )
             
-            daily_fig.update_layout(
-                xaxis_title="Date",
-                yaxis_title="Number of Daily Cases",
-                legend_title="Case Type",
-                hovermode="x unified",
-                height=400
-            )
+                # Bar chart for daily cases
+                daily_fig = px.bar(
+                    daily_df, x='Date', y=['Daily Confirmed', 'Daily Deaths', 'Daily Recovered'],
+                    title=f"Daily New Cases in {selected_country}",
+                    labels={'value': 'Daily Cases', 'variable': 'Type'},
+                    color_discrete_map={
+                        'Daily Confirmed': '#1E88E5',
+                        'Daily Deaths': '#E53935',
+                        'Daily Recovered': '#43A047'
+                    },
+                    barmode='group'
+                )
+            
+                daily_fig.update_layout(
+                    xaxis_title="Date",
+                    yaxis_title="Number of Daily Cases",
+                    legend_title="Case Type",
+                    hovermode="x unified",
+                    height=400
+                )
+                return daily_fig, daily_note
+            
+            daily_fig, daily_note = cached_figure("daily", view_key, build_daily_figure)
             
-            st.plotly_chart(daily_fig, use_container_width=True)
+            with timer.phase("render: daily"):
+                st.plotly_chart(daily_fig, use_container_width=True)
+            show_downsample_note(daily_note)
         
         with col2:
             # Display summary statistics
@@ -417,38 +472,47 @@ try:
         if len(plot_df) >= 7 and '7-Day Avg (Confirmed)' in plot_df.columns:
             st.subheader("7-Day Rolling Average")
             
-            rolling_fig = go.Figure()
+            def build_rolling_figure():
+                rolling_bars_df, rolling_note = downsample_for_chart(plot_df, ['Daily Confirmed'], "bar", downsample)
+                rolling_line_df, _ = downsample_for_chart(plot_df, ['7-Day Avg (Confirmed)'], "line", downsample)
             
-            rolling_fig.add_trace(go.Bar(
-                x=plot_df['Date'],
-                y=plot_df['Daily Confirmed'],
-                name='Daily Confirmed',
-                marker_color='rgba(30, 136, 229, 0.3)',
-                hovertemplate='%{x}<br>Daily Cases: %{y:,.0f}<extra></extra>'
-            ))
+                rolling_fig = go.Figure()
             
-            rolling_fig.add_trace(go.Scatter(
-                x=plot_df['Date'],
-                y=plot_df['7-Day Avg (Confirmed)'],
-                mode='lines',
-                name='7-Day Average',
-                line=dict(color='#1E88E5', width=3),
-                hovertemplate='%{x}<br>7-Day Avg: %{y:,.1f}<extra></extra>'
-            ))
+                rolling_fig.add_trace(go.Bar(
+                    x=rolling_bars_df['Date'],
+                    y=rolling_bars_df['Daily Confirmed'],
+                    name='Daily Confirmed',
+                    marker_color='rgba(30, 136, 229, 0.3)',
+                    hovertemplate='%{x}<br>Daily Cases: %{y:,.0f}<extra></extra>'
+                ))
             
-            rolling_fig.update_layout(
-                title=f"7-Day Average of Daily Cases in {selected_country}",
-                xaxis_title="Date",
-                yaxis_title="Number of Cases",
-                legend_title="Type",
-                hovermode="x unified",
-                height=400
-            )
+                rolling_fig.add_trace(go.Scatter(
+                    x=rolling_line_df['Date'],
+                    y=rolling_line_df['7-Day Avg (Confirmed)'],
+                    mode='lines',
+                    name='7-Day Average',
+                    line=dict(color='#1E88E5', width=3),
+                    hovertemplate='%{x}<br>7-Day Avg: %{y:,.1f}<extra></extra>'
+                ))
+            
+                rolling_fig.update_layout(
+                    title=f"7-Day Average of Daily Cases in {selected_country}",
+                    xaxis_title="Date",
+                    yaxis_title="Number of Cases",
+                    legend_title="Type",
+                    hovermode="x unified",
+                    height=400
+                )
+                return rolling_fig, rolling_note
             
-            st.plotly_chart(rolling_fig, use_container_width=True)
+            rolling_fig, rolling_note = cached_figure("rolling average", view_key, build_rolling_figure)
             
-    # Tab 3: Case Distribution (New Tab for Pie Charts)
-    with tabs[2]:
+            with timer.phase("render: rolling average"):
+                st.plotly_chart(rolling_fig, use_container_width=True)
+            show_downsample_note(rolling_note)
+            
+    # View 3: Case Distribution (New View for Pie Charts)
+    if view == VIEWS[2]:
         st.subheader("COVID-19 Case Distribution")
         
         # Create data for pie charts - handle zero values
@@ -476,31 +540,36 @@ try:
                 distribution_df = distribution_df[distribution_df['Count'] > 0]
                 
                 if len(distribution_df) > 0:
-                    pie_fig = px.pie(
-                        distribution_df,
-                        names='Category',
-                        values='Count',
-                        title=f"Distribution in {selected_country}",
-                        color='Category',
-                        color_discrete_map={
-                            'Active': '#7E57C2',
-                            'Recovered': '#43A047',
-                            'Deaths': '#E53935'
-                        }
-                    )
+                    def build_distribution_pie():
+                        pie_fig = px.pie(
+                            distribution_df,
+                            names='Category',
+                            values='Count',
+                            title=f"Distribution in {selected_country}",
+                            color='Category',
+                            color_discrete_map={
+                                'Active': '#7E57C2',
+                                'Recovered': '#43A047',
+                                'Deaths': '#E53935'
+                            }
+                        )
                     
-                    pie_fig.update_layout(
-                        height=400,
-                        legend_title="Status",
-                    )
+                        pie_fig.update_layout(
+                            height=400,
+                            legend_title="Status",
+                        )
                     
-                    pie_fig.update_traces(
-                        textposition='inside',
-                        textinfo='percent+label',
-                        hovertemplate='<b>%{label}</b><br>Count: %{value:,.0f}<br>Percentage: %{percent:.1%}<extra></extra>'
-                    )
+                        pie_fig.update_traces(
+                            textposition='inside',
+                            textinfo='percent+label',
+                            hovertemplate='<b>%{label}</b><br>Count: %{value:,.0f}<br>Percentage: %{percent:.1%}<extra></extra>'
+                        )
+                        return pie_fig
+                    
+                    pie_fig = cached_figure("distribution pie", view_key, build_distribution_pie)
                     
-                    st.plotly_chart(pie_fig, use_container_width=True)
+                    with timer.phase("render: distribution pie"):
+                        st.plotly_chart(pie_fig, use_container_width=True)
                 else:
                     st.info("No distribution data available for pie chart")
             
@@ -529,31 +598,36 @@ try:
                     daily_dist_df = daily_dist_df[daily_dist_df['Count'] > 0]
                     
                     if len(daily_dist_df) > 0:
-                        daily_pie_fig = px.pie(
-                            daily_dist_df,
-                            names='Category',
-                            values='Count',
-                            title=f"Last {recent_days} Days Activity",
-                            color='Category',
-                            color_discrete_map={
-                                'New Cases': '#1E88E5',
-                                'New Deaths': '#E53935',
-                                'New Recoveries': '#43A047'
-                            }
-                        )
+                        def build_recent_activity_pie():
+                            daily_pie_fig = px.pie(
+                                daily_dist_df,
+                                names='Category',
+                                values='Count',
+                                title=f"Last {recent_days} Days Activity",
+                                color='Category',
+                                color_discrete_map={
+                                    'New Cases': '#1E88E5',
+                                    'New Deaths': '#E53935',
+                                    'New Recoveries': '#43A047'
+                                }
+                            )
                         
-                        daily_pie_fig.update_layout(
-                            height=400,
-                            legend_title="Type"
-                        )
+                            daily_pie_fig.update_layout(
+                                height=400,
+                                legend_title="Type"
+                            )
                         
-                        daily_pie_fig.update_traces(
-                            textposition='inside',
-                            textinfo='percent+label',
-                            hovertemplate='<b>%{label}</b><br>Count: %{value:,.0f}<br>Percentage: %{percent:.1%}<extra></extra>'
-                        )
+                            daily_pie_fig.update_traces(
+                                textposition='inside',
+                                textinfo='percent+label',
+                                hovertemplate='<b>%{label}</b><br>Count: %{value:,.0f}<br>Percentage: %{percent:.1%}<extra></extra>'
+                            )
+                            return daily_pie_fig
+                        
+                        daily_pie_fig = cached_figure("recent activity pie", view_key, build_recent_activity_pie)
                         
-                        st.plotly_chart(daily_pie_fig, use_container_width=True)
+                        with timer.phase("render: recent activity pie"):
+                            st.plotly_chart(daily_pie_fig, use_container_width=True)
                     else:
                         st.info("No distribution data available for recent activity pie chart")
                 else:
@@ -561,40 +635,23 @@ try:
         else:
             st.info("No case data available for distribution analysis")
     
-    # Tab 4: Regional Data
-    with tabs[3]:
+    # View 4: Regional Data
+    if view == VIEWS[3]:
         st.subheader("Regional Analysis")
         
-        # Get provinces data if available
-        provinces = data['confirmed'][data['confirmed']['Country/Region'] == selected_country]['Province/State'].dropna().unique()
+        # Provinces come from the (country, province) index of the province matrices
+        with timer.phase("provinces lookup"):
+            province_df = data.provinces(selected_country, end_date)
         
-        if len(provinces) > 1:
+        if len(province_df) > 1:
             # There are multiple provinces - show breakdown
             st.write(f"Provincial/State Breakdown for {selected_country}")
             
-            # Get latest date for the analysis
-            latest_date = selected_date_strs[-1]
-            
-            # Get confirmed cases for each province
-            province_data = []
-            for province in provinces:
-                province_row = data['confirmed'][(data['confirmed']['Country/Region'] == selected_country) & 
-                                            (data['confirmed']['Province/State'] == province)]
-                if len(province_row) > 0:
-                    cases = province_row[latest_date].values[0]
-                    province_data.append({
-                        'Province': province,
-                        'Cases': cases
-                    })
+            col1, col2 = st.columns(2)
             
-            if province_data:
-                province_df = pd.DataFrame(province_data)
-                province_df = province_df.sort_values('Cases', ascending=False)
-                
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    # Create pie chart for top provinces
+            with col1:
+                # Create pie chart for top provinces
+                def build_provinces_pie():
                     province_pie_fig = px.pie(
                         province_df.head(10),  # Show only top 10 provinces
                         names='Province',
@@ -603,43 +660,351 @@ try:
                     )
                     
                     province_pie_fig.update_layout(height=400)
+                    return province_pie_fig
+                
+                province_pie_fig = cached_figure("provinces pie", view_key, build_provinces_pie)
+                with timer.phase("render: provinces pie"):
                     st.plotly_chart(province_pie_fig, use_container_width=True)
+            
+            with col2:
+                # Show data table of provinces with all three datasets
+                st.write("Provincial Data")
+                with timer.phase("provinces lookup"):
+                    province_table = province_df.rename(columns={'Cases': 'Confirmed'})
+                    for dataset, column in [('deaths', 'Deaths'), ('recovered', 'Recovered')]:
+                        counts = data.provinces(selected_country, end_date, dataset=dataset)
+                        province_table[column] = province_table['Province'].map(
+                            dict(zip(counts['Province'], counts['Cases']))
+                        )
+                st.dataframe(province_table.head(20), height=400)
+            
+            # Province time series for any dataset over the selected range
+            st.subheader("Provincial Trends")
+            province_dataset = st.radio(
+                "Dataset",
+                ["Confirmed", "Deaths", "Recovered"],
+                horizontal=True,
+                key="province_dataset"
+            )
+            
+            with timer.phase("provinces lookup"):
+                province_series_df = data.province_series(
+                    selected_country, start_date, end_date, dataset=province_dataset.lower()
+                )
+            
+            if province_series_df.shape[1] > 1 and len(province_series_df) > 0:
+                # Plot the ten provinces with the highest counts at the end of the range
+                top_provinces = province_series_df.iloc[-1, 1:].sort_values(ascending=False).index[:10].tolist()
                 
-                with col2:
-                    # Show data table of provinces
-                    st.write("Provincial Data")
-                    st.dataframe(province_df.head(20), height=400)
+                def build_province_trends_figure():
+                    province_trend_df, province_trend_note = downsample_for_chart(
+                        province_series_df, top_provinces, "line", downsample
+                    )
+                
+                    province_trend_fig = px.line(
+                        province_trend_df, x='Date', y=top_provinces,
+                        title=f"{province_dataset} by Province/State in {selected_country} (Top {len(top_provinces)})",
+                        labels={'value': f"{province_dataset} Cases", 'variable': 'Province/State'},
+                        log_y=use_log_scale
+                    )
+                    
+                    province_trend_fig.update_layout(
+                        xaxis_title="Date",
+                        yaxis_title=f"Number of {province_dataset} Cases",
+                        hovermode="x unified",
+                        height=450
+                    )
+                    return province_trend_fig, province_trend_note
+                
+                province_trend_fig, province_trend_note = cached_figure(
+                    "province trends", view_key + (province_dataset, use_log_scale),
+                    build_province_trends_figure
+                )
+                with timer.phase("render: province trends"):
+                    st.plotly_chart(province_trend_fig, use_container_width=True)
+                show_downsample_note(province_trend_note)
+            else:
+                st.info(f"No provincial {province_dataset.lower()} data available for {selected_country}")
         else:
             st.info(f"No provincial/state data available for {selected_country}")
     
+    # View 5: Country Comparison
+    if view == VIEWS[4]:
+        st.subheader("Compare Countries")
+        
+        # Start with the selected country and the largest outbreaks on the end date
+        # (defaults go through session state, which also keeps the choices while
+        # another view is shown)
+        if "compare_countries" not in st.session_state:
+            st.session_state["compare_countries"] = list(dict.fromkeys(
+                [selected_country] + data.leaderboard('confirmed', end_date, 4)['Country'].tolist()
+            ))
+        compare_countries = st.multiselect("Countries to compare", countries, key="compare_countries")
+        
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            compare_label = st.radio("Series", list(COMPARISON_SERIES), horizontal=True, key="compare_series")
+        with col2:
+            per_capita = st.checkbox(
+                "Per 100,000 people",
+                disabled=data.population is None,
+                help="Needs the population table written by the pipeline",
+                key="per_capita"
+            )
+        
+        if compare_countries:
+            # All selected countries come out of the cube in one batched lookup
+            with timer.phase("comparison series"):
+                compare_df = data.compare(
+                    compare_countries, [COMPARISON_SERIES[compare_label]],
+                    start_date, end_date, per_capita=per_capita
+                )
+            value_column = compare_df.columns[-1]
+            
+            def build_comparison_figure():
+                compare_plot_df, compare_note = compare_df, None
+                if downsample:
+                    with timer.phase("downsample"):
+                        compare_plot_df, reduced = lttb_long(compare_df, value_column, line_budget())
+                        if reduced:
+                            compare_note = f"{line_budget()} points per country (LTTB)"
+            
+                comparison_fig = px.line(
+                    compare_plot_df, x='Date', y=value_column, color='Country',
+                    title=f"{compare_label}{' per 100,000 People' if per_capita else ''}",
+                    labels={value_column: compare_label},
+                    log_y=use_log_scale,
+                    # WebGL keeps the chart responsive with dozens of traces
+                    render_mode='webgl' if len(compare_countries) > 10 else 'auto'
+                )
+                
+                comparison_fig.update_layout(
+                    xaxis_title="Date",
+                    legend_title="Country",
+                    hovermode="x unified" if len(compare_countries) <= 10 else "closest",
+                    height=500
+                )
+                return comparison_fig, compare_note
+            
+            comparison_fig, compare_note = cached_figure(
+                "comparison",
+                (data.version, tuple(compare_countries), compare_label, per_capita,
+                 start_date, end_date, use_log_scale, downsample),
+                build_comparison_figure
+            )
+            with timer.phase("render: comparison"):
+                st.plotly_chart(comparison_fig, use_container_width=True)
+            show_downsample_note(compare_note)
+            
+            if per_capita and compare_df['Country'].nunique() < len(compare_countries):
+                st.caption("Countries without a known population are not shown per capita.")
+        else:
+            st.info("Select at least one country to compare")
+    
+    # View 6: Global Overview
+    if view == VIEWS[5]:
+        st.subheader("Global Leaderboard")
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            ranking_metric = st.selectbox(
+                "Rank countries by",
+                list(RANKED_METRICS),
+                format_func=RANKED_METRICS.get,
+                key="ranking_metric"
+            )
+        with col2:
+            st.session_state.setdefault("top_n", 10)
+            top_n = st.slider("Number of countries", min_value=5, max_value=50, key="top_n")
+        with col3:
+            # Rates of tiny outbreaks are noisy, so small countries can be left out
+            st.session_state.setdefault("min_cases", 1000)
+            min_cases = st.number_input("Minimum confirmed cases", min_value=0, step=100, key="min_cases")
+        
+        # Rankings come from the precomputed per-date index, so any date is a row lookup
+        ranking_date = date_index[data.date_position(end_date)] if len(date_index) else None
+        with timer.phase("leaderboard"):
+            leaderboard_df = data.leaderboard(ranking_metric, end_date, top_n, min_cases)
+        
+        if len(leaderboard_df) > 0:
+            st.write(f"Top {len(leaderboard_df)} countries by {RANKED_METRICS[ranking_metric].lower()} "
+                     f"on {ranking_date:%B %d, %Y} (end of the selected date range)")
+            
+            col1, col2 = st.columns([3, 2])
+            
+            with col1:
+                def build_leaderboard_figure():
+                    leaderboard_fig = px.bar(
+                        leaderboard_df,
+                        x=RANKED_METRICS[ranking_metric],
+                        y='Country',
+                        orientation='h',
+                        title=f"Top Countries by {RANKED_METRICS[ranking_metric]}",
+                        color_discrete_sequence=['#1E88E5']
+                    )
+                    
+                    leaderboard_fig.update_layout(
+                        yaxis=dict(autorange="reversed", title=""),
+                        height=max(400, 25 * len(leaderboard_df))
+                    )
+                    return leaderboard_fig
+                
+                leaderboard_fig = cached_figure(
+                    "leaderboard", (data.version, ranking_metric, ranking_date, top_n, min_cases),
+                    build_leaderboard_figure
+                )
+                with timer.phase("render: leaderboard"):
+                    st.plotly_chart(leaderboard_fig, use_container_width=True)
+            
+            with col2:
+                st.dataframe(
+                    leaderboard_df.style.format({
+                        'Confirmed': '{:,.0f}',
+                        'Deaths': '{:,.0f}',
+                        'Mortality Rate (%)': '{:.2f}',
+                        '7-Day Growth (%)': '{:.1f}'
+                    }),
+                    height=max(400, 25 * len(leaderboard_df)),
+                    hide_index=True,
+                    use_container_width=True
+                )
+        else:
+            st.info("No countries match the selected filters on this date")
+    
+    # View 7: Map of cases by location
+    if view == VIEWS[6]:
+        st.subheader("Cases by Location")
+        
+        col1, col2, col3 = st.columns([2, 2, 1])
+        with col1:
+            map_dataset = st.radio("Dataset", ["Confirmed", "Deaths", "Recovered"], horizontal=True, key="map_dataset")
+        with col2:
+            # Coarser levels send fewer points to the browser
+            st.session_state.setdefault("map_level", "Countries")
+            map_level = st.selectbox("Detail", list(MAP_LEVELS), key="map_level")
+        
+        # A one-day range has nothing to slide or animate over (and a slider
+        # cannot have equal bounds), so that day is shown directly
+        single_day = start_date == end_date
+        with col3:
+            play = not single_day and st.button(
+                "▶ Play", help=f"Animate from the chosen date to the end date, {MAP_FRAME_DAYS} days per frame"
+            )
+        
+        if single_day:
+            map_date = end_date
+        else:
+            # Keep the map date inside the selected range
+            chosen_date = st.session_state.get("map_date")
+            if chosen_date is None or not start_date <= chosen_date <= end_date:
+                st.session_state["map_date"] = end_date
+            map_date = st.slider("Date", min_value=start_date, max_value=end_date, key="map_date", format="YYYY-MM-DD")
+        
+        dataset_key, level_key = map_dataset.lower(), MAP_LEVELS[map_level]
+        
+        # Marker sizes are scaled to the largest count at the end of the range,
+        # so sizes stay comparable from one animation frame to the next
+        with timer.phase("map snapshot"):
+            max_cases = max(data.map_snapshot(end_date, dataset_key, level_key)['Cases'].max(), 1)
+        
+        def build_map_figure(snapshot, date):
+            map_fig = go.Figure(go.Scattergeo(
+                lat=snapshot['Lat'],
+                lon=snapshot['Long'],
+                text=snapshot['Location'],
+                customdata=snapshot[['Cases', 'Locations']],
+                hovertemplate="<b>%{text}</b><br>%{customdata[0]:,} cases<br>%{customdata[1]} location(s)<extra></extra>",
+                marker=dict(
+                    size=snapshot['Cases'],
+                    sizemode='area',
+                    sizeref=2 * max_cases / MAP_MARKER_PX ** 2,
+                    sizemin=2,
+                    color='#d62728',
+                    opacity=0.6,
+                    line=dict(width=0.5, color='white')
+                )
+            ))
+            map_fig.update_layout(
+                title=f"{map_dataset} Cases on {date:%Y-%m-%d} ({map_level}, {len(snapshot)} points)",
+                geo=dict(projection_type='natural earth', showcountries=True, showland=True, landcolor='#f0f0f0'),
+                margin=dict(l=0, r=0, t=50, b=0),
+                height=550
+            )
+            return map_fig
+        
+        map_placeholder = st.empty()
+        if play:
+            # Frames are built one at a time as the animation reaches them (and
+            # not kept in the figure cache), so nothing is materialized up front
+            first_date = map_date if map_date < end_date else start_date
+            frame_dates = [date.date() for date in pd.date_range(first_date, end_date, freq=f"{MAP_FRAME_DAYS}D")]
+            if frame_dates[-1] != end_date:
+                frame_dates.append(end_date)
+            with timer.phase("render: map animation"):
+                for date, snapshot in data.map_frames(frame_dates, dataset_key, level_key):
+                    map_placeholder.plotly_chart(build_map_figure(snapshot, date), use_container_width=True)
+                    time.sleep(MAP_FRAME_SECONDS)
+        else:
+            map_fig = cached_figure(
+                "map", (data.version, dataset_key, level_key, map_date, end_date),
+                lambda: build_map_figure(data.map_snapshot(map_date, dataset_key, level_key), map_date)
+            )
+            with timer.phase("render: map"):
+                map_placeholder.plotly_chart(map_fig, use_container_width=True)
+    
     # Data table view
     st.markdown("<h2 class='sub-header'>Detailed Data</h2>", unsafe_allow_html=True)
     
-    with st.expander("View Raw Data Table"):
-        st.dataframe(
-            plot_df.style.format({
-                'Confirmed': '{:,.0f}',
-                'Deaths': '{:,.0f}',
-                'Recovered': '{:,.0f}',
-                'Active': '{:,.0f}',
-                'Daily Confirmed': '{:,.0f}',
-                'Daily Deaths': '{:,.0f}',
-                'Daily Recovered': '{:,.0f}',
-                '7-Day Avg (Confirmed)': '{:,.1f}',
-                '7-Day Avg (Deaths)': '{:,.1f}'
-            }),
-            height=300,
-            use_container_width=True
-        )
-        
-        # Download option
-        csv = plot_df.to_csv(index=False)
-        st.download_button(
-            label="Download Data as CSV",
-            data=csv,
-            file_name=f"covid19_data_{selected_country}.csv",
-            mime="text/csv"
-        )
+    # The styled table is only built while it is shown (an expander would run
+    # its body on every rerun, open or not)
+    if st.toggle("View Raw Data Table", key="show_table"):
+        with timer.phase("render: data table"):
+            st.dataframe(
+                plot_df.style.format({
+                    'Confirmed': '{:,.0f}',
+                    'Deaths': '{:,.0f}',
+                    'Recovered': '{:,.0f}',
+                    'Active': '{:,.0f}',
+                    'Daily Confirmed': '{:,.0f}',
+                    'Daily Deaths': '{:,.0f}',
+                    'Daily Recovered': '{:,.0f}',
+                    '7-Day Avg (Confirmed)': '{:,.1f}',
+                    '7-Day Avg (Deaths)': '{:,.1f}'
+                }),
+                height=300,
+                use_container_width=True
+            )
+    
+    # Download options: exports are serialized only once requested, then served
+    # from the shared export cache until the country, range or data change
+    export_key = (data.version, selected_country, start_date, end_date)
+    bulk_key = (data.version,)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("Prepare CSV export"):
+            st.session_state["csv_export"] = export_key
+        if st.session_state.get("csv_export") == export_key:
+            st.download_button(
+                label="Download Data as CSV",
+                data=cached_export("csv", export_key, lambda: plot_df),
+                file_name=export_filename(selected_country, "csv", start_date, end_date),
+                mime="text/csv"
+            )
+    with col2:
+        if st.button(
+            "Prepare all-countries export",
+            disabled=not columnar_available(),
+            help="Every country's full history in one Parquet file (needs pyarrow)"
+        ):
+            st.session_state["bulk_export"] = bulk_key
+        if st.session_state.get("bulk_export") == bulk_key:
+            st.download_button(
+                label="Download All Countries as Parquet",
+                data=cached_export("parquet", bulk_key, data.all_series),
+                file_name=export_filename("all_countries", "parquet"),
+                mime="application/vnd.apache.parquet"
+            )
 
 except Exception as e:
     st.error(f"Error processing data: {str(e)}")
@@ -647,4 +1012,38 @@ except Exception as e:
 
 # Footer
 st.markdown("---")
-st.markdown(f"<div class='footer'>© 2025 COVID-19 Dashboard | Data from JHU CSSE<br>Last updated: {current_time} UTC<br>Created by: {current_user}</div>", unsafe_allow_html=True)
\ No newline at end of file
+st.markdown(f"<div class='footer'>© 2025 COVID-19 Dashboard | Data from JHU CSSE<br>Last updated: {current_time} UTC<br>Created by: {current_user}</div>", unsafe_allow_html=True)
+
+# Rerun timings: the last RERUN_HISTORY reruns of this session, exportable as JSON
+rerun_history = st.session_state.setdefault("rerun_timings", [])
+rerun_history.append({
+    **timer.as_dict(),
+    'figure_cache': get_figure_cache().stats(),
+    'export_cache': get_export_cache().stats(),
+})
+del rerun_history[:-RERUN_HISTORY]
+
+if st.sidebar.checkbox("Show rerun timings", False):
+    with st.sidebar.expander("Rerun timings", expanded=True):
+        st.caption(f"This rerun took {rerun_history[-1]['total']:.3f}s")
+        st.table(pd.DataFrame(
+            [{"Phase": name, "Seconds": f"{seconds:.3f}"}
+             for name, seconds in rerun_history[-1]['phases'].items()]
+        ))
+        figure_stats = get_figure_cache().stats()
+        st.caption(
+            f"Figure cache: {figure_stats['size']}/{figure_stats['maxsize']} figures, "
+            f"{figure_stats['hits']} hits, {figure_stats['misses']} misses "
+            f"({figure_stats['hit_rate']:.0%} hit rate), {figure_stats['evictions']} evicted"
+        )
+        export_stats = get_export_cache().stats()
+        st.caption(
+            f"Export cache: {export_stats['size']}/{export_stats['maxsize']} exports, "
+            f"{export_stats['hits']} hits, {export_stats['misses']} misses"
+        )
+        st.download_button(
+            label=f"Download timings of last {len(rerun_history)} rerun(s) (JSON)",
+            data=timings_json(rerun_history),
+            file_name="covid19_rerun_timings.json",
+            mime="application/json"
+        )
@@ -0,0 +1,194 @@
+"""
+Shared data helpers for the COVID-19 pipeline scripts, Airflow DAG and dashboard.
+"""
+from covid_data.artifacts import (
+    ArtifactStore,
+    csv_shape,
+    file_sha256,
+)
+from covid_data.config import (
+    DAG_MODES,
+    DATASETS,
+    REFERENCE_URLS,
+    URLS,
+    artifact_dir,
+    dag_mode,
+    data_dirs,
+    population_path,
+    processed_path,
+    raw_path,
+    validation_report_path,
+)
+from covid_data.cube import (
+    CUBE_FILENAME,
+    CountryCube,
+    load_processed_frames,
+    write_country_cube,
+)
+from covid_data.downsampling import (
+    CHART_WIDTH_PX,
+    bar_budget,
+    line_budget,
+    lttb,
+    lttb_long,
+    resample_mean,
+)
+from covid_data.exports import (
+    EXPORT_FORMATS,
+    export_bytes,
+    export_filename,
+)
+from covid_data.formats import (
+    KEY_COLS,
+    META_COLS,
+    ChunkedProcessedWriter,
+    columnar_available,
+    columnar_path,
+    read_processed,
+    to_typed_frame,
+    write_processed,
+)
+from covid_data.geo import (
+    MAP_LEVELS,
+    LocationSnapshots,
+)
+from covid_data.ingest import (
+    ChecksumMismatch,
+    create_session,
+    download_file,
+    fetch_all,
+    fetch_if_changed,
+    fetch_source,
+    is_retryable,
+    load_ingest_state,
+)
+from covid_data.memo import (
+    LRUCache,
+)
+from covid_data.metrics import (
+    DerivedMetrics,
+    rolling_mean,
+)
+from covid_data.matrices import (
+    ProvinceMatrix,
+    load_cube_mmap,
+    load_province_matrix_mmap,
+    load_ranking_mmap,
+    write_matrices,
+)
+from covid_data.ranking import (
+    RANKED_METRICS,
+    RankingIndex,
+)
+from covid_data.population import (
+    load_population,
+    process_population,
+)
+from covid_data.processing import (
+    append_new_dates,
+    process_full,
+    process_raw_file,
+    process_streaming,
+)
+from covid_data.pipeline import (
+    process_all,
+    process_source,
+    refresh_country_cube,
+    refresh_population,
+)
+from covid_data.store import (
+    CovidStore,
+    FileBackend,
+    MmapBackend,
+    cache_stats,
+    clear_cache,
+)
+from covid_data.timing import (
+    PhaseTimer,
+    timings_json,
+)
+from covid_data.validation import (
+    ValidationFailed,
+    validate_files,
+    validate_frames,
+    validate_raw,
+)
+
+__all__ = [
+    "ArtifactStore",
+    "csv_shape",
+    "file_sha256",
+    "DAG_MODES",
+    "DATASETS",
+    "REFERENCE_URLS",
+    "URLS",
+    "artifact_dir",
+    "dag_mode",
+    "data_dirs",
+    "population_path",
+    "processed_path",
+    "raw_path",
+    "validation_report_path",
+    "CUBE_FILENAME",
+    "CountryCube",
+    "load_processed_frames",
+    "write_country_cube",
+    "CHART_WIDTH_PX",
+    "bar_budget",
+    "line_budget",
+    "lttb",
+    "lttb_long",
+    "resample_mean",
+    "EXPORT_FORMATS",
+    "export_bytes",
+    "export_filename",
+    "KEY_COLS",
+    "META_COLS",
+    "ChunkedProcessedWriter",
+    "columnar_available",
+    "columnar_path",
+    "read_processed",
+    "to_typed_frame",
+    "write_processed",
+    "MAP_LEVELS",
+    "LocationSnapshots",
+    "ChecksumMismatch",
+    "create_session",
+    "download_file",
+    "fetch_all",
+    "fetch_if_changed",
+    "fetch_source",
+    "is_retryable",
+    "load_ingest_state",
+    "LRUCache",
+    "DerivedMetrics",
+    "rolling_mean",
+    "ProvinceMatrix",
+    "load_cube_mmap",
+    "load_province_matrix_mmap",
+    "load_ranking_mmap",
+    "write_matrices",
+    "RANKED_METRICS",
+    "RankingIndex",
+    "load_population",
+    "process_population",
+    "append_new_dates",
+    "process_full",
+    "process_raw_file",
+    "process_streaming",
+    "process_all",
+    "process_source",
+    "refresh_country_cube",
+    "refresh_population",
+    "CovidStore",
+    "FileBackend",
+    "MmapBackend",
+    "cache_stats",
+    "clear_cache",
+    "PhaseTimer",
+    "timings_json",
+    "ValidationFailed",
+    "validate_files",
+    "validate_frames",
+    "validate_raw",
+]
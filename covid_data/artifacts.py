@@ -0,0 +1,216 @@
+"""
+Content-addressed artifact store for passing files between pipeline tasks.
+
+Tasks publish the files they produce (raw downloads, processed datasets, the
+country cube) under a name such as ``raw/confirmed``. The file is copied to
+``objects/<sha256[:2]>/<sha256><ext>`` unless an object with that hash is
+already stored, and a small reference, the file's hash, size, shape and any
+task metadata (e.g. the hashes of the inputs it was built from), is written
+to ``refs/<name>.json``. Downstream tasks receive references instead of
+paths, read the immutable object the reference points to, and can skip their
+work when the inputs recorded in their last output match the current ones.
+
+Each task also records its duration and bytes processed under
+``runs/<run_id>/``; write_manifest() collects the references and task
+records of a run into ``runs/<run_id>/manifest.json``, and manifests() reads
+them back, e.g. to compare run latencies.
+
+Objects are never rewritten, so every changed download, processed file and
+cube adds one. gc() deletes the objects no reference and none of the last
+runs' manifests point to, along with older run records.
+
+Every reference and record is its own file replaced atomically, so tasks
+running in parallel never write the same file.
+"""
+import os
+import time
+import shutil
+import uuid
+import hashlib
+import logging
+from datetime import datetime, timezone
+
+from covid_data.io import read_json, write_json
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+MANIFEST_FILENAME = "manifest.json"
+
+# Runs whose records and artifacts gc() keeps by default
+KEEP_RUNS = 30
+# Files younger than this are never collected: a task may be between storing
+# an object and publishing the reference to it
+GC_GRACE_SECONDS = 3600
+
+
+def file_sha256(path, chunk_size=CHUNK_SIZE):
+    """Return the SHA-256 hex digest of a file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def csv_shape(path):
+    """Return (data rows, columns) of a CSV file without parsing its values."""
+    with open(path, "rb") as f:
+        header = f.readline()
+        rows = sum(chunk.count(b"\n") for chunk in iter(lambda: f.read(CHUNK_SIZE), b""))
+    # The header split ignores quoting, which JHU column names do not use
+    return rows, len(header.rstrip(b"\r\n").split(b","))
+
+
+class ArtifactStore:
+    """Hash-named copies of pipeline files, named references to them and per-run task records."""
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+
+    def _ref_path(self, name):
+        return os.path.join(self.root, "refs", f"{name}.json")
+
+    def _run_dir(self, run_id):
+        # Airflow run ids contain ':' and '+', which some filesystems reject
+        safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in str(run_id))
+        return os.path.join(self.root, "runs", safe)
+
+    def object_path(self, sha256, ext=""):
+        return os.path.join(self.root, "objects", sha256[:2], sha256 + ext)
+
+    def publish(self, name, path, **metadata):
+        """Store a file under name and return its reference (a JSON-friendly dict).
+
+        CSV files also get their row and column counts; metadata is stored
+        with the reference as given.
+        """
+        sha256 = file_sha256(path)
+        ext = os.path.splitext(path)[1]
+        object_file = self.object_path(sha256, ext)
+        stored = os.path.exists(object_file)
+        if not stored:
+            # A unique temporary name, as another task may be storing the same content
+            os.makedirs(os.path.dirname(object_file), exist_ok=True)
+            tmp_file = f"{object_file}.{uuid.uuid4().hex}.tmp"
+            shutil.copyfile(path, tmp_file)
+            os.replace(tmp_file, object_file)
+
+        ref = {
+            'name': name,
+            'sha256': sha256,
+            'path': object_file,
+            'source': os.path.abspath(path),
+            'bytes': os.path.getsize(object_file),
+            'published_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        }
+        if ext == ".csv":
+            ref['rows'], ref['columns'] = csv_shape(object_file)
+        ref.update(metadata)
+
+        os.makedirs(os.path.dirname(self._ref_path(name)), exist_ok=True)
+        write_json(self._ref_path(name), ref)
+        logger.info(f"✅ Published {name} ({sha256[:12]}, {ref['bytes'] / 1024:.0f} KB{', already stored' if stored else ''})")
+        return ref
+
+    def ref(self, name):
+        """Return the latest reference published under name, or None."""
+        return read_json(self._ref_path(name))
+
+    def resolve(self, ref):
+        """Return the stored file of a reference, checking that it still exists."""
+        if not os.path.exists(ref['path']):
+            raise FileNotFoundError(f"Artifact {ref['name']} ({ref['sha256'][:12]}) is missing: {ref['path']}")
+        return ref['path']
+
+    def record_task(self, run_id, task_id, **metrics):
+        """Record a task's metrics (duration, bytes processed, ...) for a run."""
+        run_dir = os.path.join(self._run_dir(run_id), "tasks")
+        os.makedirs(run_dir, exist_ok=True)
+        record = {'task_id': task_id, 'recorded_at': datetime.now(timezone.utc).isoformat(timespec='seconds'), **metrics}
+        write_json(os.path.join(run_dir, f"{task_id}.json"), record)
+        return record
+
+    def write_manifest(self, run_id, names, **metadata):
+        """Collect the references of names and the task records of a run into the run's manifest.
+
+        metadata (e.g. the DAG layout and end-to-end latency) is stored at the
+        top level of the manifest.
+        """
+        task_dir = os.path.join(self._run_dir(run_id), "tasks")
+        tasks = {}
+        if os.path.isdir(task_dir):
+            for filename in sorted(os.listdir(task_dir)):
+                record = read_json(os.path.join(task_dir, filename))
+                if record:
+                    tasks[record['task_id']] = record
+
+        manifest = {
+            'run_id': run_id,
+            'written_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            **metadata,
+            'artifacts': {name: self.ref(name) for name in names},
+            'tasks': tasks,
+        }
+        os.makedirs(self._run_dir(run_id), exist_ok=True)
+        write_json(os.path.join(self._run_dir(run_id), MANIFEST_FILENAME), manifest)
+        return manifest
+
+    def manifests(self):
+        """Return the manifests of all recorded runs, oldest first."""
+        runs_dir = os.path.join(self.root, "runs")
+        if not os.path.isdir(runs_dir):
+            return []
+        # Ordered by file time: written_at only has second resolution
+        paths = [os.path.join(runs_dir, name, MANIFEST_FILENAME) for name in os.listdir(runs_dir)]
+        paths = sorted((path for path in paths if os.path.exists(path)), key=lambda path: os.stat(path).st_mtime_ns)
+        return [manifest for manifest in map(read_json, paths) if manifest]
+
+    def gc(self, keep_runs=KEEP_RUNS, grace_seconds=GC_GRACE_SECONDS):
+        """Delete objects and run records that are no longer needed; returns what was removed.
+
+        Kept: every object a reference points to, the records and objects of
+        the last keep_runs runs with a manifest, runs still in progress (no
+        manifest yet) and anything modified in the last grace_seconds.
+        """
+        cutoff = time.time() - grace_seconds
+        runs_dir = os.path.join(self.root, "runs")
+
+        # Runs past the newest keep_runs lose their records
+        removed_runs = 0
+        manifests = self.manifests()
+        for manifest in manifests[:max(len(manifests) - keep_runs, 0)]:
+            run_dir = self._run_dir(manifest['run_id'])
+            if os.path.getmtime(os.path.join(run_dir, MANIFEST_FILENAME)) < cutoff:
+                shutil.rmtree(run_dir, ignore_errors=True)
+                removed_runs += 1
+
+        # Objects reachable from the current references and the remaining manifests
+        reachable = set()
+        refs_dir = os.path.join(self.root, "refs")
+        for dirpath, _, filenames in os.walk(refs_dir):
+            for filename in filenames:
+                ref = read_json(os.path.join(dirpath, filename)) if filename.endswith(".json") else None
+                if ref:
+                    reachable.add(os.path.abspath(ref['path']))
+        if os.path.isdir(runs_dir):
+            for manifest in self.manifests():
+                reachable.update(
+                    os.path.abspath(ref['path']) for ref in manifest.get('artifacts', {}).values() if ref
+                )
+
+        removed_objects, freed = 0, 0
+        for dirpath, _, filenames in os.walk(os.path.join(self.root, "objects")):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                if path in reachable or os.path.getmtime(path) >= cutoff:
+                    continue
+                freed += os.path.getsize(path)
+                os.remove(path)
+                removed_objects += 1
+
+        logger.info(
+            f"✅ Artifact gc: removed {removed_objects} object(s) ({freed / 1024 / 1024:.1f} MB) "
+            f"and {removed_runs} old run record(s)"
+        )
+        return {'objects': removed_objects, 'bytes': freed, 'runs': removed_runs}
@@ -0,0 +1,76 @@
+"""
+Data sources and directory layout shared by the scripts, the DAG and the dashboard.
+"""
+import os
+
+JHU_TIME_SERIES_URL = (
+    "https://raw.githubusercontent.com/CSSEGISandData/COVID-19/master/"
+    "csse_covid_19_data/csse_covid_19_time_series"
+)
+
+# URLs for downloading COVID-19 datasets
+URLS = {
+    "confirmed": f"{JHU_TIME_SERIES_URL}/time_series_covid19_confirmed_global.csv",
+    "deaths": f"{JHU_TIME_SERIES_URL}/time_series_covid19_deaths_global.csv",
+    "recovered": f"{JHU_TIME_SERIES_URL}/time_series_covid19_recovered_global.csv",
+}
+DATASETS = list(URLS)
+
+# Airflow DAG layouts, chosen with the COVID_DAG_MODE environment variable:
+# one task per step and dataset, or the whole pipeline in a single task
+DAG_MODES = ("fanout", "single")
+DAG_MODE_ENV = "COVID_DAG_MODE"
+
+# Reference data downloaded next to the time series (country populations for
+# per-capita figures); it is not one of the processed datasets
+REFERENCE_URLS = {
+    "population": (
+        "https://raw.githubusercontent.com/CSSEGISandData/COVID-19/master/"
+        "csse_covid_19_data/UID_ISO_FIPS_LookUp_Table.csv"
+    ),
+}
+
+
+def dag_mode(default="fanout"):
+    """Return the DAG layout set in COVID_DAG_MODE (default "fanout")."""
+    mode = os.environ.get(DAG_MODE_ENV, default).strip().lower()
+    if mode not in DAG_MODES:
+        raise ValueError(f"Unknown {DAG_MODE_ENV} {mode!r}, expected one of {', '.join(DAG_MODES)}")
+    return mode
+
+
+def data_dirs(base_dir, create=True):
+    """Return the (raw, processed) data directories under base_dir."""
+    raw_dir = os.path.join(base_dir, "data", "raw")
+    processed_dir = os.path.join(base_dir, "data", "processed")
+
+    if create:
+        for path in (raw_dir, processed_dir):
+            os.makedirs(path, exist_ok=True)
+
+    return raw_dir, processed_dir
+
+
+def artifact_dir(base_dir):
+    """Return the directory of the content-addressed artifact store under base_dir."""
+    return os.path.join(base_dir, "data", "artifacts")
+
+
+def raw_path(raw_dir, dataset_type):
+    """Return the raw CSV path of a dataset."""
+    return os.path.join(raw_dir, f"{dataset_type}.csv")
+
+
+def processed_path(processed_dir, dataset_type):
+    """Return the processed CSV path of a dataset."""
+    return os.path.join(processed_dir, f"{dataset_type}_processed.csv")
+
+
+def population_path(processed_dir):
+    """Return the path of the processed country population table."""
+    return os.path.join(processed_dir, "population.csv")
+
+
+def validation_report_path(processed_dir):
+    """Return the path of the latest raw data validation report."""
+    return os.path.join(processed_dir, "validation_report.json")
@@ -0,0 +1,152 @@
+"""
+Country x date cube of the JHU CSSE series, aggregated over provinces.
+
+The dashboard used to mask the full province-level frame and sum the matching
+rows for every dataset on every rerun. The cube does that aggregation once, at
+pipeline time, for all countries and stores the cumulative, active and daily
+series as dense (country, date) arrays so a country lookup is a single row
+index. The date axis is stored pre-parsed, so a date range maps to a slice via
+searchsorted instead of parsing JHU date strings on every rerun.
+"""
+import os
+import logging
+
+import numpy as np
+import pandas as pd
+
+from covid_data.config import DATASETS, processed_path
+from covid_data.formats import JHU_DATE_FORMAT, date_columns, read_processed
+
+logger = logging.getLogger(__name__)
+
+CUBE_FILENAME = "country_cube.npz"
+METRICS = [
+    'confirmed', 'deaths', 'recovered', 'active',
+    'daily_confirmed', 'daily_deaths', 'daily_recovered',
+]
+
+
+def parse_jhu_dates(dates):
+    """Parse JHU date headers (e.g. "1/22/20") into a DatetimeIndex in one vectorized call."""
+    return pd.to_datetime(pd.Index(dates, dtype=object), format=JHU_DATE_FORMAT)
+
+
+def common_date_columns(frames):
+    """Return the date columns shared by all datasets, in chronological order."""
+    shared = None
+    for df in frames.values():
+        dates = date_columns(df.columns)
+        if shared is None:
+            shared = dates
+        else:
+            available = set(dates)
+            shared = [d for d in shared if d in available]
+
+    parsed = parse_jhu_dates(shared)
+    return [shared[i] for i in np.argsort(parsed.values, kind='stable')]
+
+
+def aggregate_by_country(df, countries, dates):
+    """Sum province rows per country and return a (country, date) int64 array."""
+    grouped = df.groupby('Country/Region', observed=True)[dates].sum()
+    return grouped.reindex(countries, fill_value=0).to_numpy(dtype=np.int64)
+
+
+class CountryCube:
+    """Dense per-country metric arrays sharing one country axis and one date axis."""
+
+    def __init__(self, countries, dates, metrics, date_index=None):
+        self.countries = list(countries)
+        self.dates = list(dates)
+        self.metrics = metrics
+        self.date_index = pd.DatetimeIndex(
+            parse_jhu_dates(self.dates) if date_index is None else date_index
+        )
+        self._rows = {country: i for i, country in enumerate(self.countries)}
+
+    def __contains__(self, country):
+        return country in self._rows
+
+    @classmethod
+    def from_frames(cls, frames):
+        """Build the cube from processed confirmed/deaths/recovered frames."""
+        countries = sorted(frames['confirmed']['Country/Region'].astype(str).unique())
+        dates = common_date_columns(frames)
+
+        metrics = {
+            key: aggregate_by_country(frames[key], countries, dates)
+            for key in DATASETS
+        }
+        metrics['active'] = np.clip(
+            metrics['confirmed'] - metrics['deaths'] - metrics['recovered'], 0, None
+        )
+        # Data corrections can make cumulative series dip, so negative daily values are clipped
+        for key in DATASETS:
+            metrics[f'daily_{key}'] = np.clip(np.diff(metrics[key], axis=1, prepend=0), 0, None)
+
+        return cls(countries, dates, metrics)
+
+    def row(self, country):
+        """Return the row of a country on the country axis, or None if unknown."""
+        return self._rows.get(country)
+
+    def series(self, country, metric):
+        """Return the full date series of one metric for a country (zeros if unknown)."""
+        row = self.row(country)
+        if row is None:
+            return np.zeros(len(self.dates), dtype=np.int64)
+        return self.metrics[metric][row]
+
+    def date_slice(self, start=None, end=None):
+        """Return the slice of the date axis between start and end, both inclusive.
+
+        A missing bound leaves that side of the axis open.
+        """
+        lo = 0 if start is None else self.date_index.searchsorted(pd.Timestamp(start), side='left')
+        hi = len(self.date_index) if end is None else \
+            self.date_index.searchsorted(pd.Timestamp(end), side='right')
+        return slice(int(lo), int(hi))
+
+    def save(self, path):
+        """Write the cube as an uncompressed .npz archive."""
+        np.savez(
+            path,
+            countries=np.array(self.countries, dtype=str),
+            dates=np.array(self.dates, dtype=str),
+            date_index=self.date_index.values.astype('datetime64[D]'),
+            **self.metrics,
+        )
+        return path
+
+    @classmethod
+    def load(cls, path):
+        """Read a cube written by save()."""
+        with np.load(path, allow_pickle=False) as archive:
+            metrics = {metric: archive[metric] for metric in METRICS}
+            # Cubes written before the date axis was stored get it parsed on load
+            date_index = archive['date_index'] if 'date_index' in archive.files else None
+            return cls(
+                archive['countries'].tolist(), archive['dates'].tolist(), metrics, date_index
+            )
+
+
+def load_processed_frames(processed_dir):
+    """Load every processed dataset ({dataset: DataFrame})."""
+    return {
+        key: read_processed(processed_path(processed_dir, key))
+        for key in DATASETS
+    }
+
+
+def write_country_cube(processed_dir, frames=None, cube=None):
+    """Build the country cube from the processed datasets and save it next to them.
+
+    Pass frames (or the cube itself) when they are already loaded to skip
+    reading the datasets again.
+    """
+    if cube is None:
+        cube = CountryCube.from_frames(frames if frames is not None else load_processed_frames(processed_dir))
+    cube_file = os.path.join(processed_dir, CUBE_FILENAME)
+    cube.save(cube_file)
+    logger.info(f"✅ Country cube saved: {cube_file}")
+    return cube_file
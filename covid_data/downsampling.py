@@ -0,0 +1,126 @@
+"""
+Downsampling of long daily series before they are sent to Plotly.
+
+A chart cannot show more points than it has pixels, but every daily point
+ends up in the figure JSON the browser downloads and renders. Two strategies
+keep the payload bounded by the chart width instead of the date range:
+
+- Lines use Largest-Triangle-Three-Buckets (LTTB), which keeps the points
+  that shape the curve (peaks, dips, trend changes) and drops the rest.
+- Bars are resampled to weekly, monthly or quarterly means, the shortest
+  period that fits, so bar heights stay comparable to daily values.
+
+Series that already fit are returned unchanged.
+"""
+import numpy as np
+import pandas as pd
+
+# Default chart width in pixels, and the pixel budgets per line point and per bar
+CHART_WIDTH_PX = 1000
+PX_PER_LINE_POINT = 2
+PX_PER_BAR = 4
+
+# Resampling periods tried for bars, shortest first
+RESAMPLE_RULES = [('W', 7, 'weekly'), ('MS', 30, 'monthly'), ('QS', 91, 'quarterly')]
+
+
+def line_budget(width_px=CHART_WIDTH_PX):
+    """Return the number of points per line trace a chart of width_px can show."""
+    return max(3, int(width_px // PX_PER_LINE_POINT))
+
+
+def bar_budget(width_px=CHART_WIDTH_PX):
+    """Return the number of bars per trace a chart of width_px can show."""
+    return max(1, int(width_px // PX_PER_BAR))
+
+
+def lttb_indices(values, n_out):
+    """Return the positions of the n_out points LTTB keeps from a series (all if it fits)."""
+    return lttb_indices_2d(np.asarray(values)[None, :], n_out)[0]
+
+
+def lttb_indices_2d(values, n_out):
+    """Run LTTB on every row of a (series, point) array at once; returns (series, n_out) positions."""
+    k, n = values.shape
+    if n_out >= n or n_out < 3:
+        return np.tile(np.arange(n), (k, 1))
+
+    y = np.nan_to_num(np.asarray(values, dtype=np.float64))
+    x = np.arange(n, dtype=np.float64)
+    rows = np.arange(k)
+
+    # n_out - 2 buckets between the first and last point, which are always kept
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    selected = np.empty((k, n_out), dtype=np.intp)
+    selected[:, 0], selected[:, -1] = 0, n - 1
+
+    a = np.zeros(k, dtype=np.intp)
+    for i in range(n_out - 2):
+        lo, hi = edges[i], max(edges[i + 1], edges[i] + 1)
+        next_lo = hi
+        next_hi = max(edges[i + 2] if i + 2 < len(edges) else n, next_lo + 1)
+        avg_x = x[next_lo:next_hi].mean()
+        avg_y = y[:, next_lo:next_hi].mean(axis=1)
+
+        # Keep the point forming the largest triangle with the last kept point
+        # and the average of the next bucket
+        x_a, y_a = x[a][:, None], y[rows, a][:, None]
+        area = np.abs(
+            (x_a - avg_x) * (y[:, lo:hi] - y_a) - (x_a - x[lo:hi]) * (avg_y[:, None] - y_a)
+        )
+        a = lo + np.argmax(area, axis=1)
+        selected[:, i + 1] = a
+
+    return selected
+
+
+def lttb(df, columns, n_out):
+    """Downsample wide-format series with LTTB; returns (frame, downsampled).
+
+    Each column gets an equal share of the n_out point budget and the frame
+    keeps the union of the rows chosen for any column, so all traces still
+    share one x axis.
+    """
+    if len(df) <= n_out or not columns:
+        return df, False
+
+    per_column = max(3, n_out // len(columns))
+    keep = np.unique(np.concatenate([lttb_indices(df[col].to_numpy(), per_column) for col in columns]))
+    return df.iloc[keep].reset_index(drop=True), True
+
+
+def lttb_long(df, value, n_out, by='Country', x='Date'):
+    """Downsample long-format series (one group per trace) with LTTB; returns (frame, downsampled).
+
+    All groups are downsampled together on a (group, date) pivot of the values.
+    """
+    if df.empty:
+        return df, False
+
+    groups = df[by].unique()
+    wide = df.pivot(index=x, columns=by, values=value)[groups]
+    if len(wide) <= n_out:
+        return df, False
+
+    values = wide.to_numpy().T
+    keep = lttb_indices_2d(values, n_out)
+    downsampled = pd.DataFrame({
+        x: wide.index.to_numpy()[keep].ravel(),
+        by: np.repeat(groups, keep.shape[1]),
+        value: np.take_along_axis(values, keep, axis=1).ravel(),
+    })
+    return downsampled, True
+
+
+def resample_mean(df, n_out, x='Date'):
+    """Resample daily series to the shortest period that fits n_out rows; returns (frame, period).
+
+    period is None when the frame already fits.
+    """
+    if len(df) <= n_out:
+        return df, None
+
+    for rule, days, period in RESAMPLE_RULES:
+        if len(df) / days <= n_out or rule == RESAMPLE_RULES[-1][0]:
+            resampled = df.set_index(x).resample(rule).mean(numeric_only=True).reset_index()
+            return resampled, period
@@ -0,0 +1,34 @@
+"""
+Downloadable exports of the dashboard series.
+
+Serializing a frame costs far more than displaying it, so exports are only
+built when someone asks for one; callers cache the bytes by the inputs of
+the exported frame (data version, country, date range).
+
+Parquet needs pyarrow (see formats.columnar_available()); CSV always works.
+"""
+import io
+
+# MIME type and file extension of each export format
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+
+def export_bytes(df, fmt='csv'):
+    """Serialize a frame (without its index) to CSV or Parquet bytes."""
+    if fmt == 'csv':
+        return df.to_csv(index=False).encode('utf-8')
+    if fmt == 'parquet':
+        buffer = io.BytesIO()
+        df.to_parquet(buffer, index=False)
+        return buffer.getvalue()
+    raise ValueError(f"Unknown export format: {fmt} (expected one of {', '.join(EXPORT_FORMATS)})")
+
+
+def export_filename(name, fmt='csv', start=None, end=None):
+    """Return the download file name of an export, e.g. covid19_data_China_2021-01-01_2021-01-31.csv."""
+    parts = ["covid19_data", str(name).replace(' ', '_')]
+    parts += [str(date) for date in (start, end) if date is not None]
+    return f"{'_'.join(parts)}.{EXPORT_FORMATS[fmt][1]}"
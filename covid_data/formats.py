@@ -0,0 +1,234 @@
+"""
+Typed columnar storage for the processed JHU CSSE time series.
+
+The processed CSVs are wide (1,100+ date columns) and pandas has to re-parse
+and re-infer every column on load. Next to each CSV we also write an
+uncompressed Feather (Arrow IPC) file with the same layout but compact dtypes:
+categorical country/province, float coordinates and int32 counts. Readers
+prefer it when it is present. Feather is used rather than Parquet because
+Parquet's per-column metadata makes 1,100-column frames no faster to load
+than the CSV itself.
+
+ChunkedProcessedWriter writes the same two files one row chunk at a time for
+inputs too large to hold in memory. Its Feather copy stores country/province
+as plain strings (dictionaries cannot differ between record batches), and
+read_processed() restores the categorical dtypes on load.
+
+Date columns are recognised by their headers parsing as JHU dates, so feeds
+with more metadata columns than the global series (e.g. the US county
+series with UID, iso2, Admin2, Combined_Key, ...) keep those as metadata.
+"""
+import os
+import logging
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Metadata columns of the JHU CSSE global time series
+META_COLS = ['Province/State', 'Country/Region', 'Lat', 'Long']
+CATEGORY_COLS = ['Province/State', 'Country/Region']
+# Columns identifying a row of the global series
+KEY_COLS = ['Province/State', 'Country/Region']
+# Coordinates (the US county series calls the longitude Long_)
+COORD_COLS = ['Lat', 'Long', 'Long_']
+
+INT32_MAX = np.iinfo(np.int32).max
+
+JHU_DATE_FORMAT = '%m/%d/%y'
+
+
+def is_date_column(col):
+    """Return True if a column header is a JHU date (e.g. "1/22/20")."""
+    try:
+        datetime.strptime(str(col), JHU_DATE_FORMAT)
+    except ValueError:
+        return False
+    return True
+
+
+def date_columns(columns):
+    """Return the date columns among columns, in their original order."""
+    return [col for col in columns if is_date_column(col)]
+
+
+def meta_columns(columns):
+    """Return the metadata (non-date) columns among columns, in their original order."""
+    return [col for col in columns if not is_date_column(col)]
+
+
+def columnar_available():
+    """Return True if pyarrow (needed for Feather files) is installed."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def columnar_path(csv_path):
+    """Return the Feather path that sits next to a processed CSV."""
+    return os.path.splitext(csv_path)[0] + ".feather"
+
+
+def count_dtype_for(max_value):
+    """Return the narrowest count dtype used for storage that holds max_value."""
+    return 'int32' if max_value <= INT32_MAX else 'int64'
+
+
+def to_typed_frame(df, count_dtype=None, categorical=True, text_cols=()):
+    """Cast a processed wide frame to compact dtypes for columnar storage.
+
+    Country/province, any text metadata and the columns in text_cols become
+    categorical (or plain strings with categorical=False), other metadata
+    stays numeric.
+    """
+    meta_cols = meta_columns(df.columns)
+    date_cols = date_columns(df.columns)
+
+    meta = df[meta_cols].copy()
+    for col in meta_cols:
+        if col in COORD_COLS:
+            meta[col] = meta[col].astype('float64')
+        elif col in CATEGORY_COLS or col in text_cols or not pd.api.types.is_numeric_dtype(meta[col]):
+            # Missing values stay missing instead of becoming the string "nan"
+            text = meta[col].astype(object).where(meta[col].notna(), None)
+            meta[col] = text.astype('category') if categorical else text
+
+    counts = df[date_cols].fillna(0)
+    # Counts fit comfortably in int32; keep int64 if a feed ever outgrows it
+    if count_dtype is None:
+        count_dtype = count_dtype_for(0 if counts.empty else counts.max().max())
+    counts = counts.astype(count_dtype)
+
+    return pd.concat([meta, counts], axis=1)
+
+
+def write_processed(df, processed_file, columnar=True):
+    """Save a processed frame as CSV and, when possible, as typed Feather."""
+    df.to_csv(processed_file, index=False)
+
+    if columnar and columnar_available():
+        columnar_file = columnar_path(processed_file)
+        typed = to_typed_frame(df).reset_index(drop=True)
+        typed.to_feather(columnar_file, compression='uncompressed')
+        logger.info(f"✅ Columnar copy saved: {columnar_file}")
+    elif columnar:
+        logger.warning("pyarrow is not installed, skipping Feather output")
+
+    return processed_file
+
+
+def read_processed(processed_file):
+    """Load a processed dataset, preferring its Feather copy when it is up to date."""
+    columnar_file = columnar_path(processed_file)
+
+    if os.path.exists(columnar_file) and columnar_available():
+        # Ignore a Feather copy that is older than a hand-edited CSV
+        if not os.path.exists(processed_file) or \
+                os.path.getmtime(columnar_file) >= os.path.getmtime(processed_file):
+            df = pd.read_feather(columnar_file)
+            # Files written chunk by chunk store country/province as plain strings
+            for col in CATEGORY_COLS:
+                if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+                    df[col] = df[col].astype('category')
+            return df
+
+    return pd.read_csv(processed_file)
+
+
+class ChunkedProcessedWriter:
+    """Write a processed dataset to CSV (and typed Feather) one row chunk at a time.
+
+    Output goes to temporary files that replace the real ones on close(), so
+    readers never see a partially written dataset. Every record batch has to
+    share one schema, so it is built up front rather than inferred from the
+    first chunk (whose provinces may all be missing): counts use count_dtype,
+    country/province and the columns in text_cols are strings, and other
+    metadata is float64 so a chunk with missing values still fits.
+    """
+
+    def __init__(self, processed_file, count_dtype='int64', columnar=True, text_cols=()):
+        self.processed_file = processed_file
+        self.columnar_file = columnar_path(processed_file)
+        self.count_dtype = count_dtype
+        self.text_cols = list(text_cols)
+        self.columnar = columnar and columnar_available()
+        self.rows = 0
+        self._csv = None
+        self._arrow = None
+        self._arrow_sink = None
+        self._schema = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def write(self, chunk):
+        """Append a chunk of processed rows."""
+        if self._csv is None:
+            self._csv = open(self.processed_file + ".tmp", "w", newline="")
+            chunk.to_csv(self._csv, index=False)
+        else:
+            chunk.to_csv(self._csv, index=False, header=False)
+
+        if self.columnar:
+            import pyarrow as pa
+
+            typed = to_typed_frame(chunk, count_dtype=self.count_dtype, categorical=False,
+                                   text_cols=self.text_cols)
+            if self._arrow is None:
+                self._schema = self._arrow_schema(chunk.columns)
+                self._arrow_sink = pa.OSFile(self.columnar_file + ".tmp", "wb")
+                self._arrow = pa.ipc.new_file(self._arrow_sink, self._schema)
+            batch = pa.RecordBatch.from_pandas(typed, schema=self._schema, preserve_index=False)
+            self._arrow.write_batch(batch)
+
+        self.rows += len(chunk)
+
+    def _arrow_schema(self, columns):
+        import pyarrow as pa
+
+        count_type = pa.from_numpy_dtype(np.dtype(self.count_dtype))
+        fields = []
+        for col in columns:
+            if is_date_column(col):
+                fields.append(pa.field(col, count_type))
+            elif col in CATEGORY_COLS or col in self.text_cols:
+                fields.append(pa.field(col, pa.string()))
+            else:
+                fields.append(pa.field(col, pa.float64()))
+        return pa.schema(fields)
+
+    def _close_handles(self):
+        if self._csv is not None:
+            self._csv.close()
+        if self._arrow is not None:
+            self._arrow.close()
+            self._arrow_sink.close()
+
+    def close(self):
+        """Finish writing and move the files into place."""
+        self._close_handles()
+        if self._csv is not None:
+            os.replace(self.processed_file + ".tmp", self.processed_file)
+        if self._arrow is not None:
+            os.replace(self.columnar_file + ".tmp", self.columnar_file)
+            logger.info(f"✅ Columnar copy saved: {self.columnar_file}")
+        elif os.path.exists(self.columnar_file):
+            # Do not leave a stale Feather copy next to the new CSV
+            os.remove(self.columnar_file)
+
+    def abort(self):
+        """Discard everything written so far."""
+        self._close_handles()
+        for path in (self.processed_file + ".tmp", self.columnar_file + ".tmp"):
+            if os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,141 @@
+"""
+Per-location snapshots for the map view.
+
+Every row of a processed dataset is a location with a Lat/Long and one count
+per date, and ProvinceMatrix already holds those counts as a (row, date)
+matrix (memory-mapped when the pipeline wrote it). LocationSnapshots turns
+it into map points at a chosen level of detail:
+
+- 'locations': every row with coordinates
+- 'countries': one point per country, at its country-level row's position
+  (e.g. metropolitan France, not the mean with its overseas territories) or
+  the mean of its provinces if it has none
+- a grid size in degrees: one point per grid cell, at the mean of its locations
+
+Each level is aggregated for all dates at once, on first use, into a
+(point, date) matrix, so the map for any date (or any frame of an animation)
+is one column of it and the browser never receives more points than the
+level has.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Map levels of detail, coarsest first: 'countries', 'locations' or a grid size in degrees
+MAP_LEVELS = {
+    'World (20° grid)': 20.0,
+    'Regions (5° grid)': 5.0,
+    'Countries': 'countries',
+    'Locations': 'locations',
+}
+
+# Countries named in the label of a grid cell before the rest are counted
+CELL_LABEL_COUNTRIES = 3
+
+
+def _cell_label(countries):
+    names = sorted(set(countries))
+    label = ", ".join(names[:CELL_LABEL_COUNTRIES])
+    if len(names) > CELL_LABEL_COUNTRIES:
+        label += f" +{len(names) - CELL_LABEL_COUNTRIES} more"
+    return label
+
+
+class MapLevel:
+    """Points of one map level: labels, coordinates and a (point, date) matrix of counts."""
+
+    def __init__(self, labels, lat, lon, locations, values):
+        self.labels = labels
+        self.lat = lat
+        self.lon = lon
+        self.locations = locations
+        self.values = values
+
+
+class LocationSnapshots:
+    """Counts of one dataset by location and date, aggregated per map level on first use."""
+
+    def __init__(self, matrix):
+        self.matrix = matrix
+        meta = matrix.meta
+        self.lat = pd.to_numeric(meta['Lat'], errors='coerce').to_numpy(dtype=np.float64)
+        self.lon = pd.to_numeric(meta['Long'], errors='coerce').to_numpy(dtype=np.float64)
+        self.countries = meta['Country/Region'].astype(str).to_numpy()
+        self.provinces = meta['Province/State'].astype(object).fillna('').astype(str).to_numpy()
+
+        # Rows without a position (NaN, or 0/0 for e.g. cruise ships) cannot be
+        # mapped on their own; at country level they still count for their country
+        self.mapped = ~np.isnan(self.lat) & ~np.isnan(self.lon) & ((self.lat != 0) | (self.lon != 0))
+        self._levels = {}
+        self._lock = threading.Lock()
+
+    def level(self, level):
+        """Return the MapLevel of 'locations', 'countries' or a grid size in degrees."""
+        with self._lock:
+            if level not in self._levels:
+                points = self._aggregate(level)
+                points.values.setflags(write=False)
+                self._levels[level] = points
+            return self._levels[level]
+
+    def _aggregate(self, level):
+        if level == 'countries':
+            has_position = pd.Series(self.mapped).groupby(self.countries).transform('any').to_numpy()
+            rows = np.flatnonzero(has_position)
+            codes, _ = pd.factorize(self.countries[rows])
+        elif level == 'locations':
+            rows = np.flatnonzero(self.mapped)
+            codes = np.arange(len(rows))
+        else:
+            rows = np.flatnonzero(self.mapped)
+            cells = pd.MultiIndex.from_arrays([np.floor(self.lat[rows] / level), np.floor(self.lon[rows] / level)])
+            codes, _ = pd.factorize(cells)
+
+        # Sum each point's rows in one pass: sort rows by point, then reduce runs
+        values = np.asarray(self.matrix.values)[rows].astype(np.int64)
+        order = np.argsort(codes, kind='stable')
+        bounds = np.r_[np.flatnonzero(np.r_[True, np.diff(codes[order]) != 0]), len(order)]
+        sums = np.add.reduceat(values[order], bounds[:-1], axis=0) if len(order) else values
+
+        # Points sit at the mean position of their mapped rows
+        mapped = self.mapped[rows]
+        locations = np.bincount(codes, weights=mapped).astype(np.int64)
+        lat = np.bincount(codes, weights=np.where(mapped, self.lat[rows], 0)) / locations
+        lon = np.bincount(codes, weights=np.where(mapped, self.lon[rows], 0)) / locations
+
+        if level == 'locations':
+            labels = np.array([
+                f"{province}, {country}" if province else country
+                for province, country in zip(self.provinces[rows], self.countries[rows])
+            ])
+        else:
+            sorted_countries = self.countries[rows][order]
+            labels = np.array([
+                _cell_label(sorted_countries[lo:hi]) for lo, hi in zip(bounds[:-1], bounds[1:])
+            ])
+
+        if level == 'countries':
+            country_rows = mapped & (self.provinces[rows] == '')
+            lat[codes[country_rows]] = self.lat[rows][country_rows]
+            lon[codes[country_rows]] = self.lon[rows][country_rows]
+
+        return MapLevel(labels, lat, lon, locations, sums)
+
+    def snapshot(self, position, level='countries'):
+        """Return the points of a level with a count on a date position (Location, Lat, Long, Locations, Cases)."""
+        points = self.level(level)
+        cases = points.values[:, position]
+        keep = cases > 0
+        return pd.DataFrame({
+            'Location': points.labels[keep],
+            'Lat': points.lat[keep],
+            'Long': points.lon[keep],
+            'Locations': points.locations[keep],
+            'Cases': cases[keep],
+        })
+
+    def frames(self, positions, level='countries'):
+        """Yield (position, snapshot) for each date position, building each frame only when asked for."""
+        for position in positions:
+            yield position, self.snapshot(position, level)
@@ -0,0 +1,297 @@
+"""
+Streaming, conditional downloads of the JHU CSSE source files.
+
+Responses are streamed to a ``.part`` file in fixed-size chunks, hashed on the
+fly and renamed over the raw file only once complete and verified, so a
+failed transfer never leaves a half-written raw file behind and large sources
+never sit in memory. An interrupted transfer is resumed with a Range request
+on the next attempt, guarded by If-Range so a file that changed upstream in
+the meantime is fetched from scratch.
+
+Every successful download records the source's ETag, Last-Modified header and
+SHA-256 in a small JSON sidecar next to the raw file. The next run sends them
+back as If-None-Match / If-Modified-Since, so an unchanged source comes back
+as 304 Not Modified and is neither re-downloaded nor re-processed. Servers
+that ignore those headers are caught by comparing the content hash.
+
+Completed downloads are checked against the size the server announced. A
+server that ignores the conditional headers but sends back the recorded
+strong ETag is re-sending the version already held, so that body must also
+match the recorded SHA-256. Callers that know a source's hash in advance can
+pass expected_sha256; otherwise a new version is only checked for size.
+
+Each raw file has its own sidecar so parallel download tasks never write to a
+shared state file.
+
+fetch_all() downloads several sources concurrently from a thread pool over
+one keep-alive session, retrying each source with exponential backoff, so
+ingestion takes about as long as the slowest source rather than the sum of
+all of them.
+"""
+import os
+import re
+import time
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from covid_data.io import read_json, write_json
+
+logger = logging.getLogger(__name__)
+
+# (connect, read) timeouts: the read timeout applies to each chunk, not the whole transfer
+REQUEST_TIMEOUT = (10, 60)
+CHUNK_SIZE = 64 * 1024
+RETRIES = 3
+BACKOFF_SECONDS = 1.0
+# HTTP statuses worth retrying: rate limiting and server errors (other 4xx are permanent)
+RETRY_STATUSES = {429} | set(range(500, 600))
+
+
+class ChecksumMismatch(requests.RequestException):
+    """Raised when a download does not match its expected size or SHA-256."""
+
+
+def state_path(raw_file):
+    """Return the path of the ingest state sidecar for a raw file."""
+    return raw_file + ".ingest.json"
+
+
+def load_ingest_state(raw_file):
+    """Return the recorded state of a raw file, or an empty dict."""
+    return read_json(state_path(raw_file), default={})
+
+
+def save_ingest_state(raw_file, state):
+    """Atomically write the state sidecar for a raw file."""
+    write_json(state_path(raw_file), state)
+
+
+def _discard_part(part_file):
+    for path in (part_file, part_file + ".json"):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _resume_validator(response):
+    """Return a validator usable in If-Range (strong ETag or Last-Modified)."""
+    etag = response.headers.get('ETag')
+    if etag and not etag.startswith('W/'):
+        return etag
+    return response.headers.get('Last-Modified')
+
+
+def _expected_size(response):
+    """Return the full size of the file being transferred, if the server states it."""
+    if response.status_code == 206:
+        match = re.search(r'/(\d+)$', response.headers.get('Content-Range', ''))
+        return int(match.group(1)) if match else None
+    # Content-Length is the encoded size when the body is compressed in transit
+    if response.headers.get('Content-Encoding', 'identity') == 'identity':
+        length = response.headers.get('Content-Length')
+        return int(length) if length and length.isdigit() else None
+    return None
+
+
+def create_session(pool_size=10):
+    """Return a session whose keep-alive pool can serve pool_size concurrent downloads."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def download_file(url, dest, headers=None, expected_sha256=None,
+                  timeout=REQUEST_TIMEOUT, chunk_size=CHUNK_SIZE, session=None, known=None):
+    """Stream url into dest, resuming an interrupted transfer when possible.
+
+    Returns (response, sha256_hex). A 304 response writes nothing and returns
+    None for the hash. Raises ChecksumMismatch if the completed file has the
+    wrong size or does not match expected_sha256. known is the recorded state
+    (etag, sha256) of the version held in dest: a response with that strong
+    ETag must match that SHA-256.
+    """
+    part_file = dest + ".part"
+    request_headers = dict(headers or {})
+    digest = hashlib.sha256()
+
+    # Resume an interrupted transfer of the same version of the file
+    offset = os.path.getsize(part_file) if os.path.exists(part_file) else 0
+    validator = (read_json(part_file + ".json") or {}).get('validator')
+    if offset and validator:
+        request_headers.pop('If-None-Match', None)
+        request_headers.pop('If-Modified-Since', None)
+        request_headers['Range'] = f"bytes={offset}-"
+        request_headers['If-Range'] = validator
+        # Byte offsets only line up with the unencoded representation
+        request_headers['Accept-Encoding'] = 'identity'
+
+    http = session or requests
+    with http.get(url, headers=request_headers, timeout=timeout, stream=True) as response:
+        if response.status_code == 304:
+            return response, None
+
+        if response.status_code == 416 and 'Range' in request_headers:
+            # The partial file no longer fits the source, start over
+            _discard_part(part_file)
+            return download_file(url, dest, headers, expected_sha256, timeout, chunk_size, session, known)
+
+        response.raise_for_status()
+
+        # The server ignored If-None-Match but is sending the version we hold
+        etag = response.headers.get('ETag')
+        if not expected_sha256 and known and etag and not etag.startswith('W/') and etag == known.get('etag'):
+            expected_sha256 = known.get('sha256')
+
+        if response.status_code == 206:
+            logger.info(f"Resuming download of {url} at byte {offset}")
+            with open(part_file, "rb") as f:
+                for chunk in iter(lambda: f.read(chunk_size), b""):
+                    digest.update(chunk)
+            mode = "ab"
+        else:
+            write_json(part_file + ".json", {'url': url, 'validator': _resume_validator(response)})
+            mode = "wb"
+
+        with open(part_file, mode) as f:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                f.write(chunk)
+                digest.update(chunk)
+
+        expected_size = _expected_size(response)
+
+    # A short body keeps the partial file so the next attempt can resume it
+    size = os.path.getsize(part_file)
+    if expected_size is not None and size != expected_size:
+        raise ChecksumMismatch(f"Incomplete download of {url}: {size} of {expected_size} bytes")
+
+    sha256 = digest.hexdigest()
+    if expected_sha256 and sha256 != expected_sha256.lower():
+        _discard_part(part_file)
+        raise ChecksumMismatch(f"SHA-256 mismatch for {url}: got {sha256}, expected {expected_sha256}")
+
+    os.replace(part_file, dest)
+    _discard_part(part_file)
+    return response, sha256
+
+
+def fetch_if_changed(url, raw_file, expected_sha256=None, timeout=REQUEST_TIMEOUT, session=None):
+    """Download url to raw_file unless it is unchanged since the last run.
+
+    Returns True if raw_file now holds new content and False if the previous
+    download is still current. Request errors propagate to the caller.
+    """
+    previous = load_ingest_state(raw_file)
+
+    # Only ask for a conditional response if we still have the file it refers to
+    known = previous if os.path.exists(raw_file) and previous.get('url') == url else {}
+    headers = {}
+    if known.get('etag'):
+        headers['If-None-Match'] = known['etag']
+    if known.get('last_modified'):
+        headers['If-Modified-Since'] = known['last_modified']
+
+    response, sha256 = download_file(
+        url, raw_file, headers=headers, expected_sha256=expected_sha256,
+        timeout=timeout, session=session, known=known
+    )
+    if response.status_code == 304:
+        logger.info(f"Unchanged since last run (304 Not Modified): {url}")
+        return False
+
+    changed = sha256 != previous.get('sha256')
+    if not changed:
+        logger.info(f"Unchanged since last run (same SHA-256): {url}")
+
+    save_ingest_state(raw_file, {
+        'url': url,
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+        'sha256': sha256,
+        'fetched_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+    })
+    return changed
+
+
+def is_retryable(error):
+    """Return True if a failed request may succeed when repeated.
+
+    Connection errors, timeouts, incomplete transfers (which resume) and
+    429/5xx responses are retried; other HTTP errors such as 404 fail at once.
+    """
+    if isinstance(error, (requests.ConnectionError, requests.Timeout, ChecksumMismatch)):
+        return True
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code in RETRY_STATUSES
+    return False
+
+
+def fetch_source(url, raw_file, retries=RETRIES, backoff=BACKOFF_SECONDS, **kwargs):
+    """Run fetch_if_changed with retries and return timing stats for the source.
+
+    Failed attempts that may succeed when repeated (see is_retryable()) are
+    retried after backoff, 2 * backoff, 4 * backoff, ... seconds; an
+    interrupted transfer resumes from its partial file. The
+    returned dict has the keys changed, attempts, seconds, bytes and error
+    (None on success).
+    """
+    stats = {'url': url, 'changed': False, 'attempts': 0, 'seconds': 0.0, 'bytes': 0, 'error': None}
+    start = time.perf_counter()
+
+    for attempt in range(retries + 1):
+        stats['attempts'] = attempt + 1
+        try:
+            stats['changed'] = fetch_if_changed(url, raw_file, **kwargs)
+            stats['bytes'] = os.path.getsize(raw_file) if stats['changed'] else 0
+            stats['error'] = None
+            break
+        except requests.RequestException as e:
+            stats['error'] = str(e)
+            if not is_retryable(e):
+                logger.error(f"❌ {url} failed permanently ({e}), not retrying")
+                break
+            if attempt < retries:
+                delay = backoff * 2 ** attempt
+                logger.warning(f"Attempt {attempt + 1} for {url} failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    stats['seconds'] = round(time.perf_counter() - start, 3)
+    return stats
+
+
+def fetch_all(urls, raw_dir, max_workers=None, session=None, **kwargs):
+    """Fetch every source in urls ({name: url}) concurrently into raw_dir/<name>.csv.
+
+    Returns {name: stats} as produced by fetch_source(). Errors are recorded in
+    the stats rather than raised so one failing source does not cancel the rest.
+    """
+    max_workers = max_workers or len(urls) or 1
+    own_session = session is None
+    session = session or create_session(pool_size=max_workers)
+    start = time.perf_counter()
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {
+                name: pool.submit(
+                    fetch_source, url, os.path.join(raw_dir, f"{name}.csv"), session=session, **kwargs
+                )
+                for name, url in urls.items()
+            }
+            results = {name: future.result() for name, future in futures.items()}
+    finally:
+        if own_session:
+            session.close()
+
+    elapsed = time.perf_counter() - start
+    sequential = sum(stats['seconds'] for stats in results.values())
+    logger.info(
+        f"Fetched {len(results)} sources in {elapsed:.2f}s "
+        f"(sum of per-source times {sequential:.2f}s)"
+    )
+    return results
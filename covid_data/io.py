@@ -0,0 +1,35 @@
+"""
+Atomic JSON files shared by the pipeline modules.
+
+State sidecars, artifact references, run manifests, the validation report and
+the matrix index are small JSON files that other tasks (or the dashboard) may
+read while they are being replaced. write_json() writes to a uniquely named
+temporary file next to the target and renames it over the target, so readers
+see either the old or the new file, never a partial one, and two writers never
+share a temporary file.
+"""
+import os
+import json
+import uuid
+
+
+def write_json(path, data, indent=2):
+    """Atomically replace path with data serialized as JSON."""
+    tmp_file = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(tmp_file, "w") as f:
+            json.dump(data, f, indent=indent)
+        os.replace(tmp_file, path)
+    except BaseException:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+
+
+def read_json(path, default=None):
+    """Return the JSON content of path, or default if it is missing or unreadable."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
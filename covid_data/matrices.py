@@ -0,0 +1,185 @@
+"""
+Memory-mappable numeric matrices of the processed data.
+
+The pipeline writes every numeric matrix as a plain ``.npy`` file under
+``data/processed/matrices/``: one (row, date) matrix per dataset at province
+level, one (country, date) matrix per country cube metric and one (date,
+rank) country ordering per leaderboard metric. The axis labels
+(countries, provinces, coordinates, dates) go into a JSON sidecar,
+``index.json``, which is written last.
+
+Readers open the matrices with ``np.load(mmap_mode='r')``. The arrays are then
+read-only views of the OS page cache, so several dashboard worker processes
+share a single copy of the data and handing arrays around never copies them.
+Files are replaced with os.replace() and never rewritten in place, so a
+reader that still maps an old version keeps a valid mapping.
+"""
+import os
+import json
+import logging
+
+import numpy as np
+import pandas as pd
+
+from covid_data.cube import CountryCube, METRICS, load_processed_frames
+from covid_data.formats import META_COLS, count_dtype_for, date_columns
+from covid_data.io import write_json
+from covid_data.metrics import DerivedMetrics
+from covid_data.ranking import RankingIndex
+
+logger = logging.getLogger(__name__)
+
+MATRIX_DIRNAME = "matrices"
+INDEX_FILENAME = "index.json"
+
+
+def matrix_dir(processed_dir):
+    """Return the directory holding the memory-mappable matrices."""
+    return os.path.join(processed_dir, MATRIX_DIRNAME)
+
+
+def index_path(processed_dir):
+    """Return the path of the sidecar index of the matrices."""
+    return os.path.join(matrix_dir(processed_dir), INDEX_FILENAME)
+
+
+def _save_npy(path, array):
+    tmp_file = path + ".tmp.npy"
+    np.save(tmp_file, np.ascontiguousarray(array))
+    os.replace(tmp_file, path)
+
+
+def _json_values(series):
+    """Return a column as a JSON-friendly list with missing values as None."""
+    return [None if pd.isna(value) else value for value in series.tolist()]
+
+
+class ProvinceMatrix:
+    """Province-level counts of one dataset: row metadata, date labels and a (row, date) matrix.
+
+    Rows are looked up through a sorted (country, province) MultiIndex built on
+    first use, so selecting a country's provinces is a binary search instead of
+    a scan of every row. Country-level rows have the province ''.
+    """
+
+    def __init__(self, meta, dates, values):
+        self.meta = meta
+        self.dates = list(dates)
+        self.values = values
+        self._date_positions = {date: i for i, date in enumerate(self.dates)}
+        self._index = None
+        self._index_rows = None
+
+    @classmethod
+    def from_frame(cls, df):
+        dates = date_columns(df.columns)
+        meta = df[[col for col in META_COLS if col in df.columns]].reset_index(drop=True)
+        return cls(meta, dates, df[dates].to_numpy())
+
+    def date_position(self, date_col):
+        """Return the column position of a date label (KeyError if the dataset lacks it)."""
+        return self._date_positions[date_col]
+
+    @property
+    def index(self):
+        """Sorted (country, province) MultiIndex of the rows."""
+        if self._index is None:
+            keys = pd.MultiIndex.from_arrays(
+                [
+                    self.meta['Country/Region'].astype(str).to_numpy(),
+                    self.meta['Province/State'].astype(object).fillna('').astype(str).to_numpy(),
+                ],
+                names=['Country/Region', 'Province/State'],
+            )
+            self._index, self._index_rows = keys.sort_values(return_indexer=True)
+        return self._index
+
+    def province_rows(self, country):
+        """Return (row positions, province names) of a country's provinces, in name order."""
+        index = self.index
+        try:
+            loc = index.get_loc(country)
+        except KeyError:
+            return np.array([], dtype=np.intp), []
+
+        provinces = index.get_level_values('Province/State')[loc]
+        keep = np.asarray(provinces != '')
+        return self._index_rows[loc][keep], list(provinces[keep])
+
+
+def write_matrices(processed_dir, cube=None, frames=None):
+    """Write the province and country matrices plus their index; returns the index path."""
+    if frames is None:
+        frames = load_processed_frames(processed_dir)
+    if cube is None:
+        cube = CountryCube.from_frames(frames)
+
+    out_dir = matrix_dir(processed_dir)
+    os.makedirs(out_dir, exist_ok=True)
+
+    datasets = {}
+    for key, df in frames.items():
+        provinces = ProvinceMatrix.from_frame(df)
+        counts = np.nan_to_num(provinces.values)
+        max_count = counts.max() if counts.size else 0
+        _save_npy(os.path.join(out_dir, f"{key}.npy"), counts.astype(count_dtype_for(max_count)))
+        datasets[key] = {
+            'dates': provinces.dates,
+            **{col: _json_values(provinces.meta[col]) for col in provinces.meta.columns},
+        }
+
+    for metric in METRICS:
+        _save_npy(os.path.join(out_dir, f"country_{metric}.npy"), cube.metrics[metric])
+
+    ranking = RankingIndex.from_metrics(cube, DerivedMetrics.from_cube(cube))
+    for metric, order in ranking.orders.items():
+        _save_npy(os.path.join(out_dir, f"rank_{metric}.npy"), order)
+
+    # The index goes last: readers treat it as the marker of a complete set
+    index = {
+        'countries': cube.countries,
+        'dates': cube.dates,
+        'date_index': [date.strftime('%Y-%m-%d') for date in cube.date_index],
+        'datasets': datasets,
+        'rankings': list(ranking.orders),
+    }
+    write_json(index_path(processed_dir), index, indent=None)
+
+    logger.info(f"✅ Memory-mappable matrices saved: {out_dir}")
+    return index_path(processed_dir)
+
+
+def _load_index(processed_dir):
+    with open(index_path(processed_dir)) as f:
+        return json.load(f)
+
+
+def load_cube_mmap(processed_dir):
+    """Return a CountryCube whose metric arrays are read-only memory maps."""
+    index = _load_index(processed_dir)
+    metrics = {
+        metric: np.load(os.path.join(matrix_dir(processed_dir), f"country_{metric}.npy"), mmap_mode='r')
+        for metric in METRICS
+    }
+    date_index = pd.DatetimeIndex(np.array(index['date_index'], dtype='datetime64[D]'))
+    return CountryCube(index['countries'], index['dates'], metrics, date_index)
+
+
+def load_province_matrix_mmap(processed_dir, dataset):
+    """Return the ProvinceMatrix of a dataset with its counts memory-mapped."""
+    index = _load_index(processed_dir)['datasets'][dataset]
+    meta = pd.DataFrame({col: index[col] for col in META_COLS if col in index})
+    values = np.load(os.path.join(matrix_dir(processed_dir), f"{dataset}.npy"), mmap_mode='r')
+    return ProvinceMatrix(meta, index['dates'], values)
+
+
+def load_ranking_mmap(processed_dir, cube, derived):
+    """Return the RankingIndex with memory-mapped orders, or None if none was written."""
+    metrics = _load_index(processed_dir).get('rankings')
+    if not metrics:
+        return None
+    orders = {
+        metric: np.load(os.path.join(matrix_dir(processed_dir), f"rank_{metric}.npy"), mmap_mode='r')
+        for metric in metrics
+    }
+    return RankingIndex(cube, derived, orders)
@@ -0,0 +1,89 @@
+"""
+Derived per-country metrics computed for all countries at once.
+
+The dashboard used to compute 7-day rolling averages and the mortality rate
+for the selected country only, on every rerun. DerivedMetrics computes them
+over the whole (country, date) cube in a few NumPy operations: rolling means
+come from a cumulative sum along the date axis (the difference of two cumsum
+columns is a window sum), so the cost does not depend on the window length.
+The result shares the cube's country and date axes, and a country or date
+range lookup is a plain slice.
+
+Rolling averages cover the full history, so the first days of a selected
+date range use the days before it; the first ROLLING_WINDOW - 1 days of the
+history are NaN. The 7-day growth is the percentage change of confirmed
+cases over ROLLING_WINDOW days, NaN where there were no cases to grow from.
+"""
+import numpy as np
+
+ROLLING_WINDOW = 7
+
+# Cube metrics that get a rolling average, keyed by the derived metric name
+ROLLING_SOURCES = {
+    'avg7_daily_confirmed': 'daily_confirmed',
+    'avg7_daily_deaths': 'daily_deaths',
+}
+DERIVED_METRICS = list(ROLLING_SOURCES) + ['mortality_rate', 'growth_7d']
+
+
+def rolling_mean(values, window=ROLLING_WINDOW):
+    """Return the trailing mean over window dates along axis 1 (NaN until a full window)."""
+    cumsum = np.cumsum(values, axis=1, dtype=np.int64)
+    result = np.full(values.shape, np.nan)
+    if values.shape[1] >= window:
+        window_sums = cumsum[:, window - 1:].copy()
+        window_sums[:, 1:] -= cumsum[:, :-window]
+        result[:, window - 1:] = window_sums / window
+    return result
+
+
+def mortality_rate(confirmed, deaths):
+    """Return deaths as a percentage of confirmed cases (0 where there are no cases)."""
+    confirmed = confirmed.astype(np.float64)
+    rate = np.zeros(confirmed.shape)
+    np.divide(deaths, confirmed, out=rate, where=confirmed > 0)
+    return rate * 100
+
+
+def growth_rate(values, window=ROLLING_WINDOW):
+    """Return the percentage change over window dates along axis 1 (NaN without a base)."""
+    values = values.astype(np.float64)
+    result = np.full(values.shape, np.nan)
+    if values.shape[1] > window:
+        base = values[:, :-window]
+        np.divide(values[:, window:] - base, base, out=result[:, window:], where=base > 0)
+    return result * 100
+
+
+def derive_metrics(metrics):
+    """Compute every derived metric from a dict of cube metric arrays."""
+    derived = {
+        name: rolling_mean(metrics[source])
+        for name, source in ROLLING_SOURCES.items()
+    }
+    derived['mortality_rate'] = mortality_rate(metrics['confirmed'], metrics['deaths'])
+    derived['growth_7d'] = growth_rate(metrics['confirmed'])
+    return derived
+
+
+class DerivedMetrics:
+    """Rolling averages and mortality rate as (country, date) arrays on a cube's axes."""
+
+    def __init__(self, cube, metrics):
+        self.cube = cube
+        self.metrics = metrics
+
+    @classmethod
+    def from_cube(cls, cube):
+        return cls(cube, derive_metrics(cube.metrics))
+
+    def series(self, country, metric):
+        """Return the full date series of one derived metric for a country.
+
+        An unknown country gets the values of an all-zero series, like CountryCube.series().
+        """
+        row = self.cube.row(country)
+        if row is None:
+            zeros = np.zeros((1, len(self.cube.dates)), dtype=np.int64)
+            return derive_metrics({name: zeros for name in self.cube.metrics})[metric][0]
+        return self.metrics[metric][row]
@@ -0,0 +1,141 @@
+"""
+Pipeline steps shared by data_preprocessing.py and the Airflow DAG.
+"""
+import os
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+from covid_data.config import population_path, processed_path, raw_path
+from covid_data.cube import CUBE_FILENAME, CountryCube, load_processed_frames, write_country_cube
+from covid_data.matrices import index_path, write_matrices
+from covid_data.population import process_population
+from covid_data.processing import process_raw_file
+
+logger = logging.getLogger(__name__)
+
+
+def process_source(dataset_type, raw_dir, processed_dir, changed=True, full_refresh=False,
+                   chunk_size=None, track_memory=False, raw_file=None):
+    """Process one downloaded dataset unless its source is unchanged.
+
+    raw_file overrides the file read (e.g. a stored artifact) instead of the
+    dataset's file in raw_dir. Returns (processed_file, updated) where
+    updated tells whether any date column was written.
+    """
+    raw_file = raw_file or raw_path(raw_dir, dataset_type)
+    processed_file = processed_path(processed_dir, dataset_type)
+
+    # Nothing to do if the source did not change and its output exists
+    if not full_refresh and not changed and os.path.exists(processed_file):
+        logger.info(f"⏭️ {dataset_type} unchanged, skipping processing")
+        return processed_file, False
+
+    if not os.path.exists(raw_file):
+        raise FileNotFoundError(f"Raw file not found: {raw_file}")
+
+    logger.info(f"Processing {raw_file}...")
+
+    # Remove empty columns and save (CSV plus typed Feather copy); only new
+    # date columns are parsed and appended unless a full refresh was requested,
+    # and a chunk size streams the file in bounded memory
+    written_dates = process_raw_file(
+        raw_file, processed_file,
+        incremental=not full_refresh,
+        chunk_size=chunk_size,
+        track_memory=track_memory,
+    )
+    logger.info(f"✅ Processed data saved: {processed_file} ({len(written_dates)} date columns written)")
+    return processed_file, bool(written_dates)
+
+
+def _timed_process_source(dataset_type, raw_dir, processed_dir, **kwargs):
+    """Run process_source() and return its outcome as stats, recording errors instead of raising."""
+    start = time.perf_counter()
+    stats = {'processed_file': None, 'updated': False, 'error': None}
+    try:
+        stats['processed_file'], stats['updated'] = process_source(dataset_type, raw_dir, processed_dir, **kwargs)
+    except Exception as e:
+        stats['error'] = str(e)
+    stats['seconds'] = time.perf_counter() - start
+    return stats
+
+
+def process_all(dataset_types, raw_dir, processed_dir, changed=None, workers=1, **kwargs):
+    """Process several datasets, in parallel worker processes if workers > 1.
+
+    changed maps dataset types to their change flags (missing means changed);
+    other keyword arguments go to process_source(). Returns {dataset_type:
+    stats} with processed_file, updated, seconds and error. Errors are
+    recorded in the stats rather than raised so one failing dataset does not
+    cancel the rest.
+
+    Parsing and writing the CSVs is CPU-bound pandas work that holds the GIL,
+    hence processes rather than threads.
+    """
+    changed = changed or {}
+    workers = max(1, min(workers or 1, len(dataset_types)))
+    start = time.perf_counter()
+
+    if workers == 1:
+        results = {
+            key: _timed_process_source(key, raw_dir, processed_dir, changed=changed.get(key, True), **kwargs)
+            for key in dataset_types
+        }
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                key: pool.submit(
+                    _timed_process_source, key, raw_dir, processed_dir, changed=changed.get(key, True), **kwargs
+                )
+                for key in dataset_types
+            }
+            results = {key: future.result() for key, future in futures.items()}
+
+    for key, stats in results.items():
+        if stats['error']:
+            logger.error(f"❌ Error processing {key}: {stats['error']}")
+        else:
+            logger.info(f"{key} processed in {stats['seconds']:.2f}s")
+
+    elapsed = time.perf_counter() - start
+    sequential = sum(stats['seconds'] for stats in results.values())
+    logger.info(
+        f"Processed {len(results)} datasets with {workers} worker(s) in {elapsed:.2f}s "
+        f"(sum of per-dataset times {sequential:.2f}s)"
+    )
+    return results
+
+
+def refresh_country_cube(processed_dir, updated=True):
+    """Rebuild the country cube and memory-mappable matrices if any dataset was updated."""
+    cube_file = os.path.join(processed_dir, CUBE_FILENAME)
+    if not updated and os.path.exists(cube_file) and os.path.exists(index_path(processed_dir)):
+        logger.info("⏭️ No dataset changed, keeping existing country cube")
+        return cube_file
+
+    # Both outputs come from one read of the datasets and one cube build
+    frames = load_processed_frames(processed_dir)
+    cube = CountryCube.from_frames(frames)
+    write_country_cube(processed_dir, cube=cube)
+    write_matrices(processed_dir, cube=cube, frames=frames)
+    return cube_file
+
+
+def refresh_population(raw_dir, processed_dir, changed=True):
+    """Rebuild the country population table from the downloaded JHU lookup table.
+
+    Populations are optional reference data: if the lookup table was never
+    downloaded nothing is written and None is returned.
+    """
+    raw_file = raw_path(raw_dir, "population")
+    out_file = population_path(processed_dir)
+    if not os.path.exists(raw_file):
+        logger.warning(f"⏭️ No population lookup table at {raw_file}, per-capita figures unavailable")
+        return None
+
+    if not changed and os.path.exists(out_file):
+        logger.info("⏭️ Population lookup table unchanged, keeping existing table")
+        return out_file
+
+    return process_population(raw_file, processed_dir)
@@ -0,0 +1,46 @@
+"""
+Country populations for per-capita figures.
+
+The JHU CSSE UID lookup table lists a population for every country, province
+and US county. Only the country-level rows (no province, no county) are kept,
+keyed by the same Country/Region names as the time series.
+"""
+import os
+import logging
+
+import pandas as pd
+
+from covid_data.config import population_path
+
+logger = logging.getLogger(__name__)
+
+LOOKUP_COLUMNS = ['Admin2', 'Province_State', 'Country_Region', 'Population']
+
+
+def process_population(raw_file, processed_dir):
+    """Write the country population table from the raw JHU lookup table; returns its path."""
+    lookup = pd.read_csv(raw_file, usecols=LOOKUP_COLUMNS)
+    countries = lookup[lookup['Admin2'].isna() & lookup['Province_State'].isna()]
+
+    population = (
+        countries.dropna(subset=['Population'])
+        .drop_duplicates('Country_Region')
+        .rename(columns={'Country_Region': 'Country/Region'})
+        [['Country/Region', 'Population']]
+        .astype({'Population': 'int64'})
+    )
+
+    out_file = population_path(processed_dir)
+    tmp_file = out_file + ".tmp"
+    population.to_csv(tmp_file, index=False)
+    os.replace(tmp_file, out_file)
+    logger.info(f"✅ Population table saved: {out_file} ({len(population)} countries)")
+    return out_file
+
+
+def load_population(processed_dir):
+    """Return populations as a Series indexed by country, or None if the table is missing."""
+    path = population_path(processed_dir)
+    if not os.path.exists(path):
+        return None
+    return pd.read_csv(path, index_col='Country/Region')['Population']
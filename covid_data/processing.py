@@ -0,0 +1,228 @@
+"""
+Processing of raw JHU CSSE files into the processed datasets.
+
+The raw files only ever grow by one date column per day, so by default the
+processed dataset is extended in place: only the date columns it does not
+have yet are parsed from the raw file and appended. A full rebuild happens
+when there is no processed file yet, when the set of (country, province) rows
+changed, when dates disappeared from the source, or when asked for
+explicitly. JHU occasionally revises past values; those revisions are only
+picked up by a full refresh.
+
+For feeds too large to load at once (e.g. the US county series),
+process_streaming() rebuilds the processed dataset in two bounded-memory
+passes over row chunks: the first finds the all-empty columns and the
+largest count, the second writes the kept columns chunk by chunk.
+
+Date columns are the ones whose header parses as a JHU date; everything
+else is metadata, so feeds with extra metadata columns such as the US
+county series (UID, iso2, Admin2, Combined_Key, ...) are handled too.
+"""
+import os
+import time
+import logging
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+import pandas as pd
+
+from covid_data.formats import (
+    COORD_COLS,
+    KEY_COLS,
+    ChunkedProcessedWriter,
+    count_dtype_for,
+    date_columns,
+    meta_columns,
+    read_processed,
+    write_processed,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_ROWS = 500
+
+
+def _key_columns(columns):
+    """Return the columns identifying a row: province and country, or all non-coordinate metadata."""
+    if all(col in columns for col in KEY_COLS):
+        return list(KEY_COLS)
+    return [col for col in meta_columns(columns) if col not in COORD_COLS]
+
+
+def _row_keys(df, key_cols):
+    """Return the key of every row, with missing values as ''."""
+    keys = df[key_cols].astype(object).fillna('').astype(str)
+    return list(keys.itertuples(index=False, name=None))
+
+
+def process_full(raw_file, processed_file):
+    """Rebuild the processed dataset from the whole raw file."""
+    df = pd.read_csv(raw_file)
+
+    # Remove empty columns
+    df.dropna(axis=1, how="all", inplace=True)
+
+    write_processed(df, processed_file)
+    return date_columns(df.columns)
+
+
+def append_new_dates(raw_file, processed_file):
+    """Append raw date columns missing from the processed dataset.
+
+    Returns the list of appended dates (empty if already up to date), or None
+    if the processed dataset cannot be extended and needs a full rebuild.
+    """
+    if not os.path.exists(processed_file):
+        return None
+
+    # Decide from the headers alone; the processed data is only loaded to append
+    raw_columns = pd.read_csv(raw_file, nrows=0).columns.tolist()
+    existing_columns = pd.read_csv(processed_file, nrows=0).columns.tolist()
+
+    raw_dates = set(date_columns(raw_columns))
+    existing_dates = set(date_columns(existing_columns))
+    if not raw_dates.issuperset(existing_dates):
+        logger.info(f"Dates were removed from {raw_file}, rebuilding")
+        return None
+
+    new_dates = [col for col in date_columns(raw_columns) if col not in existing_dates]
+    if not new_dates:
+        return []
+
+    key_cols = _key_columns(raw_columns)
+    new_part = pd.read_csv(raw_file, usecols=key_cols + new_dates)
+
+    # Dates the source lists but has no values for yet are not new
+    new_part = new_part[key_cols + new_part[new_dates].dropna(axis=1, how="all").columns.tolist()]
+    new_dates = [col for col in new_dates if col in new_part.columns]
+    if not new_dates:
+        return []
+
+    existing = read_processed(processed_file)
+    if _row_keys(new_part, key_cols) != _row_keys(existing, key_cols):
+        logger.info(f"Rows changed in {raw_file}, rebuilding")
+        return None
+
+    new_part = new_part[new_dates]
+    combined = pd.concat([existing.reset_index(drop=True), new_part], axis=1)
+
+    # Keep the source's column order in case a previously empty date got data
+    combined = combined[[col for col in raw_columns if col in combined.columns]]
+
+    write_processed(combined, processed_file)
+    return list(new_part.columns)
+
+
+def _scan_columns(raw_file, chunk_size):
+    """First pass: return the columns holding any value, the largest count and the text metadata columns.
+
+    A metadata column is text if any chunk holds non-numeric values in it,
+    so the writer's schema does not depend on what the first chunk holds.
+    """
+    non_empty = None
+    max_count = 0
+    text_cols = set()
+
+    for chunk in pd.read_csv(raw_file, chunksize=chunk_size):
+        has_values = chunk.notna().any()
+        non_empty = has_values if non_empty is None else non_empty | has_values
+
+        chunk_max = chunk[date_columns(chunk.columns)].max().max()
+        if pd.notna(chunk_max):
+            max_count = max(max_count, chunk_max)
+
+        text_cols.update(
+            col for col in meta_columns(chunk.columns)
+            if not pd.api.types.is_numeric_dtype(chunk[col])
+        )
+
+    if non_empty is None:
+        return pd.read_csv(raw_file, nrows=0).columns.tolist(), max_count, text_cols
+    return non_empty[non_empty].index.tolist(), max_count, text_cols
+
+
+def _max_rss_mb():
+    """Return the peak resident set size of this process in MB, if known."""
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return round(max_rss / (1024 ** 2 if os.uname().sysname == 'Darwin' else 1024), 2)
+
+
+def process_streaming(raw_file, processed_file, chunk_size=DEFAULT_CHUNK_ROWS, track_memory=False):
+    """Rebuild the processed dataset reading and writing chunk_size rows at a time.
+
+    Returns a stats dict with rows, chunks, kept and dropped column counts,
+    the written date columns, wall time and the process's peak RSS. With
+    track_memory the peak of Python/NumPy allocations made during this call
+    is traced as well (tracemalloc slows pandas down considerably, so it is
+    opt-in).
+    """
+    start = time.perf_counter()
+    start_tracing = track_memory and not tracemalloc.is_tracing()
+    if start_tracing:
+        tracemalloc.start()
+    elif track_memory:
+        tracemalloc.reset_peak()
+
+    try:
+        keep, max_count, text_cols = _scan_columns(raw_file, chunk_size)
+
+        chunks = 0
+        with ChunkedProcessedWriter(processed_file, count_dtype=count_dtype_for(max_count),
+                                    text_cols=text_cols) as writer:
+            for chunk in pd.read_csv(raw_file, usecols=keep, chunksize=chunk_size):
+                writer.write(chunk[keep])
+                chunks += 1
+
+        total_columns = len(pd.read_csv(raw_file, nrows=0).columns)
+        traced_peak = tracemalloc.get_traced_memory()[1] if track_memory else None
+    finally:
+        if start_tracing:
+            tracemalloc.stop()
+
+    stats = {
+        'rows': writer.rows,
+        'chunks': chunks,
+        'columns': len(keep),
+        'dropped_columns': total_columns - len(keep),
+        'date_columns': date_columns(keep),
+        'seconds': round(time.perf_counter() - start, 3),
+        'max_rss_mb': _max_rss_mb(),
+        'peak_traced_mb': None if traced_peak is None else round(traced_peak / 1024 ** 2, 2),
+    }
+    memory = f"max RSS {stats['max_rss_mb']} MB"
+    if track_memory:
+        memory += f", traced peak {stats['peak_traced_mb']} MB"
+    logger.info(
+        f"Streamed {stats['rows']} rows in {chunks} chunk(s) of {chunk_size} "
+        f"({stats['dropped_columns']} empty columns dropped) in {stats['seconds']}s, {memory}"
+    )
+    return stats
+
+
+def process_raw_file(raw_file, processed_file, incremental=True, chunk_size=None,
+                     track_memory=False):
+    """Process a raw dataset, appending only new date columns when possible.
+
+    With chunk_size set the dataset is always rebuilt by process_streaming(),
+    since appending needs the existing processed dataset in memory.
+
+    Returns the list of date columns that were (re)written.
+    """
+    if chunk_size:
+        stats = process_streaming(raw_file, processed_file, chunk_size, track_memory)
+        return stats['date_columns']
+
+    if incremental:
+        added = append_new_dates(raw_file, processed_file)
+        if added is not None:
+            logger.info(f"Appended {len(added)} new date column(s) to {processed_file}")
+            return added
+
+    return process_full(raw_file, processed_file)
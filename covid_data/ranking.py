@@ -0,0 +1,76 @@
+"""
+Per-date country rankings for the global leaderboard.
+
+Ranking all countries by a metric on a date would mean sorting one column of
+a (country, date) array on every rerun. RankingIndex sorts every date once:
+for each ranked metric it keeps a (date, rank) array of country rows, largest
+value first, so the top N countries on any date are the first N entries of
+one row. Countries without a value (NaN, e.g. no 7-day growth base) rank last.
+
+The pipeline writes the index next to the memory-mappable matrices
+(``rank_{metric}.npy``); when those files are missing it is built in memory
+from the cube and derived metrics.
+"""
+import numpy as np
+import pandas as pd
+
+# Ranked metrics and their leaderboard column names
+RANKED_METRICS = {
+    'confirmed': 'Confirmed',
+    'deaths': 'Deaths',
+    'mortality_rate': 'Mortality Rate (%)',
+    'growth_7d': '7-Day Growth (%)',
+}
+
+
+def rank_order(values):
+    """Return the (date, rank) array of row positions sorting each date column descending."""
+    keys = np.where(np.isnan(values), -np.inf, values) if values.dtype.kind == 'f' else values
+    order = np.argsort(-keys.T.astype(np.float64), axis=1, kind='stable')
+    return order.astype(np.int16 if values.shape[0] <= np.iinfo(np.int16).max else np.int32)
+
+
+def metric_arrays(cube, derived):
+    """Return the (country, date) arrays of the ranked metrics."""
+    return {
+        metric: cube.metrics[metric] if metric in cube.metrics else derived.metrics[metric]
+        for metric in RANKED_METRICS
+    }
+
+
+class RankingIndex:
+    """Countries in descending order of each ranked metric, for every date."""
+
+    def __init__(self, cube, derived, orders):
+        self.cube = cube
+        self.derived = derived
+        self.orders = orders
+
+    @classmethod
+    def from_metrics(cls, cube, derived):
+        arrays = metric_arrays(cube, derived)
+        return cls(cube, derived, {metric: rank_order(arrays[metric]) for metric in RANKED_METRICS})
+
+    def top(self, metric, position, n=10, min_confirmed=0):
+        """Return the top n countries by metric at a date position as a DataFrame.
+
+        Countries with fewer than min_confirmed cases on that date are skipped,
+        which keeps tiny outbreaks off the mortality and growth rankings.
+        """
+        rows = np.asarray(self.orders[metric][position])
+        if min_confirmed:
+            rows = rows[self.cube.metrics['confirmed'][rows, position] >= min_confirmed]
+
+        arrays = metric_arrays(self.cube, self.derived)
+        values = arrays[metric][rows, position]
+        if values.dtype.kind == 'f':
+            rows = rows[~np.isnan(values)]
+        rows = rows[:n]
+
+        leaderboard = pd.DataFrame({
+            'Rank': np.arange(1, len(rows) + 1),
+            'Country': [self.cube.countries[row] for row in rows],
+        })
+        for name, column in RANKED_METRICS.items():
+            leaderboard[column] = arrays[name][rows, position]
+        return leaderboard
@@ -0,0 +1,494 @@
+"""
+Read access to the processed COVID-19 data.
+
+CovidStore is the one place the dashboard, scripts and DAG read processed
+data through. It delegates storage to a backend object and keeps what the
+backend loaded in a process-wide cache, keyed by the backend and invalidated
+when the backend's version (file modification times) changes, so every
+store instance and every dashboard session in a process shares one copy.
+
+A backend provides:
+
+- ``cache_key()``: hashable identity of the data source
+- ``version()``: value that changes whenever the underlying data changes
+- ``load_cube(frames_loader)``: the CountryCube
+- ``load_frames()``: the province-level frames ({dataset: DataFrame})
+- ``load_province_matrix(dataset, frames_loader)``: a ProvinceMatrix
+- ``load_ranking(cube, derived)``: the RankingIndex of the leaderboard
+- ``load_population()``: country populations (a Series), or None
+
+``frames_loader`` is a callable returning the (lazily loaded) frames, for
+backends that derive the cube or matrices from them.
+
+MmapBackend, the default, serves the cube, province matrices and rankings as read-only
+memory maps of the pipeline's ``.npy`` files and falls back to FileBackend
+behaviour while those files are missing or older than the processed data.
+
+Derived metrics (rolling averages, mortality rate) and the map points of each
+dataset are computed for all countries on first use and cached with the rest,
+so they are recomputed only when the data version changes.
+
+CovidStore.load() returns a view pinned to one cached entry, so a caller
+(e.g. one dashboard rerun) reads a single data version throughout while other
+callers move on to newer ones.
+
+Cached data is shared, never copied: arrays are marked read-only, and
+callers must treat the frames as immutable too. cache_stats() reports hits,
+misses, version-triggered reloads and how long each load took.
+"""
+import os
+import time
+import threading
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from covid_data.config import DATASETS, population_path, processed_path
+from covid_data.cube import CUBE_FILENAME, CountryCube
+from covid_data.formats import columnar_path, read_processed
+from covid_data.geo import LocationSnapshots
+from covid_data.matrices import (
+    ProvinceMatrix,
+    index_path,
+    load_cube_mmap,
+    load_province_matrix_mmap,
+    load_ranking_mmap,
+)
+from covid_data.metrics import DerivedMetrics
+from covid_data.population import load_population
+from covid_data.ranking import RankingIndex
+
+# Column names of the per-country series, keyed by cube metric
+SERIES_COLUMNS = {
+    'confirmed': 'Confirmed',
+    'deaths': 'Deaths',
+    'recovered': 'Recovered',
+    'active': 'Active',
+    'daily_confirmed': 'Daily Confirmed',
+    'daily_deaths': 'Daily Deaths',
+    'daily_recovered': 'Daily Recovered',
+}
+# Column names of the derived per-country series, keyed by derived metric
+DERIVED_COLUMNS = {
+    'avg7_daily_confirmed': '7-Day Avg (Confirmed)',
+    'avg7_daily_deaths': '7-Day Avg (Deaths)',
+}
+PER_CAPITA = 100_000
+
+
+class FileBackend:
+    """Processed CSV/Feather files and the country cube in one directory."""
+
+    def __init__(self, processed_dir):
+        self.processed_dir = os.path.abspath(processed_dir)
+
+    def cache_key(self):
+        return ('files', self.processed_dir)
+
+    def _dataset_files(self):
+        return [
+            path
+            for key in DATASETS
+            for path in (processed_path(self.processed_dir, key),
+                         columnar_path(processed_path(self.processed_dir, key)))
+        ]
+
+    def version(self):
+        paths = self._dataset_files() + [
+            os.path.join(self.processed_dir, CUBE_FILENAME),
+            population_path(self.processed_dir),
+        ]
+        return tuple(
+            os.stat(path).st_mtime_ns if os.path.exists(path) else None
+            for path in paths
+        )
+
+    def load_frames(self):
+        return {
+            key: read_processed(processed_path(self.processed_dir, key))
+            for key in DATASETS
+        }
+
+    def _is_fresh(self, path):
+        """Return True if path exists and is at least as new as every processed file."""
+        newest_input = max(
+            (os.path.getmtime(p) for p in self._dataset_files() if os.path.exists(p)),
+            default=0
+        )
+        return os.path.exists(path) and os.path.getmtime(path) >= newest_input
+
+    def load_cube(self, frames_loader):
+        """Load the pipeline's cube, or build one from the frames if it is missing or stale."""
+        cube_file = os.path.join(self.processed_dir, CUBE_FILENAME)
+        if self._is_fresh(cube_file):
+            return CountryCube.load(cube_file)
+        return CountryCube.from_frames(frames_loader())
+
+    def load_province_matrix(self, dataset, frames_loader):
+        return ProvinceMatrix.from_frame(frames_loader()[dataset])
+
+    def load_ranking(self, cube, derived):
+        return RankingIndex.from_metrics(cube, derived)
+
+    def load_population(self):
+        return load_population(self.processed_dir)
+
+
+class MmapBackend(FileBackend):
+    """FileBackend that memory-maps the pipeline's .npy matrices when they are current."""
+
+    def cache_key(self):
+        return ('mmap', self.processed_dir)
+
+    def version(self):
+        index_file = index_path(self.processed_dir)
+        index_mtime = os.stat(index_file).st_mtime_ns if os.path.exists(index_file) else None
+        return super().version() + (index_mtime,)
+
+    def load_cube(self, frames_loader):
+        if self._is_fresh(index_path(self.processed_dir)):
+            return load_cube_mmap(self.processed_dir)
+        return super().load_cube(frames_loader)
+
+    def load_province_matrix(self, dataset, frames_loader):
+        if self._is_fresh(index_path(self.processed_dir)):
+            return load_province_matrix_mmap(self.processed_dir, dataset)
+        return super().load_province_matrix(dataset, frames_loader)
+
+    def load_ranking(self, cube, derived):
+        ranking = None
+        if self._is_fresh(index_path(self.processed_dir)):
+            ranking = load_ranking_mmap(self.processed_dir, cube, derived)
+        return ranking or super().load_ranking(cube, derived)
+
+
+def _freeze(array):
+    """Mark a shared array read-only so no caller can modify the cached copy."""
+    array.setflags(write=False)
+    return array
+
+
+class _Entry:
+    """Data loaded from one backend version; frames and matrices are read on first use."""
+
+    def __init__(self, backend, version):
+        self.backend = backend
+        self.version = version
+        self.loaded_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        self.timings = {}
+        self._frames = None
+        self._derived = None
+        self._ranking = None
+        self._population = None
+        self._population_loaded = False
+        self._province_matrices = {}
+        self._locations = {}
+        self._lock = threading.RLock()
+
+        start = time.perf_counter()
+        self.cube = backend.load_cube(self.frames)
+        for array in self.cube.metrics.values():
+            _freeze(array)
+        self.timings['cube'] = time.perf_counter() - start
+
+    def frames(self):
+        with self._lock:
+            if self._frames is None:
+                start = time.perf_counter()
+                self._frames = self.backend.load_frames()
+                self.timings['frames'] = time.perf_counter() - start
+            return self._frames
+
+    def derived(self):
+        with self._lock:
+            if self._derived is None:
+                start = time.perf_counter()
+                derived = DerivedMetrics.from_cube(self.cube)
+                for array in derived.metrics.values():
+                    _freeze(array)
+                self._derived = derived
+                self.timings['derived metrics'] = time.perf_counter() - start
+            return self._derived
+
+    def ranking(self):
+        with self._lock:
+            if self._ranking is None:
+                start = time.perf_counter()
+                ranking = self.backend.load_ranking(self.cube, self.derived())
+                for order in ranking.orders.values():
+                    _freeze(order)
+                self._ranking = ranking
+                self.timings['ranking'] = time.perf_counter() - start
+            return self._ranking
+
+    def population(self):
+        with self._lock:
+            if not self._population_loaded:
+                self._population = self.backend.load_population()
+                self._population_loaded = True
+            return self._population
+
+    def province_matrix(self, dataset):
+        with self._lock:
+            if dataset not in self._province_matrices:
+                start = time.perf_counter()
+                matrix = self.backend.load_province_matrix(dataset, self.frames)
+                _freeze(matrix.values)
+                self._province_matrices[dataset] = matrix
+                self.timings[f'province_matrix:{dataset}'] = time.perf_counter() - start
+            return self._province_matrices[dataset]
+
+    def locations(self, dataset):
+        with self._lock:
+            if dataset not in self._locations:
+                self._locations[dataset] = LocationSnapshots(self.province_matrix(dataset))
+            return self._locations[dataset]
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0, 'reloads': 0}
+_STAT_KEYS = {'hit': 'hits', 'miss': 'misses', 'reload': 'reloads'}
+
+
+def clear_cache():
+    """Drop all data cached in this process and reset its statistics."""
+    with _cache_lock:
+        _cache.clear()
+        _stats.update(hits=0, misses=0, reloads=0)
+
+
+def cache_stats():
+    """Return hit/miss/reload counters and per-source load timings (seconds)."""
+    with _cache_lock:
+        stats = dict(_stats)
+        stats['entries'] = {
+            repr(key): {
+                'loaded_at': entry.loaded_at,
+                'timings': {name: round(seconds, 4) for name, seconds in entry.timings.items()},
+            }
+            for key, entry in _cache.items()
+        }
+    lookups = stats['hits'] + stats['misses'] + stats['reloads']
+    stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+    return stats
+
+
+class CovidStore:
+    """Country and province level access to the processed datasets.
+
+    load() returns a view of the store pinned to one loaded data version;
+    the store it is called on is never modified, so one instance can be
+    shared by threads and dashboard sessions. A store that was not loaded
+    looks up the latest data on every access.
+    """
+
+    def __init__(self, processed_dir=None, backend=None):
+        if backend is None:
+            if processed_dir is None:
+                raise ValueError("CovidStore needs a processed_dir or a backend")
+            backend = MmapBackend(processed_dir)
+        self.backend = backend
+        self._entry = None
+        self.last_lookup = None
+
+    def load(self, force=False):
+        """Return a view of the latest data: a new store pinned to the loaded version.
+
+        The view's last_lookup is 'hit', 'miss' (first load) or 'reload' (the
+        backend's data changed, or force was given). Everything read through
+        the view comes from that one version, even if the pipeline rewrites
+        the data meanwhile.
+        """
+        key = self.backend.cache_key()
+        version = self.backend.version()
+
+        with _cache_lock:
+            entry = _cache.get(key)
+            if entry is None:
+                lookup = 'miss'
+            elif force or entry.version != version:
+                lookup = 'reload'
+            else:
+                lookup = 'hit'
+            _stats[_STAT_KEYS[lookup]] += 1
+
+            if lookup != 'hit':
+                entry = _Entry(self.backend, version)
+                _cache[key] = entry
+
+        view = CovidStore(backend=self.backend)
+        view._entry = entry
+        view.last_lookup = lookup
+        return view
+
+    def _loaded(self):
+        return self._entry if self._entry is not None else self.load()._entry
+
+    @property
+    def version(self):
+        """Version of the loaded data; changes whenever the pipeline rewrites it."""
+        return self._loaded().version
+
+    @property
+    def cube(self):
+        return self._loaded().cube
+
+    @property
+    def frames(self):
+        """Province-level processed frames keyed by dataset."""
+        return self._loaded().frames()
+
+    @property
+    def metrics(self):
+        """Rolling averages and mortality rate of all countries, computed once per data version."""
+        return self._loaded().derived()
+
+    @property
+    def population(self):
+        """Country populations (a Series indexed by country), or None if not available."""
+        return self._loaded().population()
+
+    @property
+    def countries(self):
+        return self.cube.countries
+
+    @property
+    def dates(self):
+        """Date column names shared by all datasets, in chronological order."""
+        return self.cube.dates
+
+    @property
+    def date_index(self):
+        return self.cube.date_index
+
+    def date_position(self, date=None):
+        """Return the date axis position of a date (latest on or before it), or the last one."""
+        cube = self.cube
+        if date is None:
+            return len(cube.dates) - 1
+        if isinstance(date, str) and date in cube.dates:
+            return cube.dates.index(date)
+        position = cube.date_index.searchsorted(pd.Timestamp(date), side='right') - 1
+        return max(int(position), 0)
+
+    def date_column(self, date=None):
+        """Return the date column for a date (latest on or before it), or the last one."""
+        return self.cube.dates[self.date_position(date)]
+
+    def country_series(self, country, start=None, end=None):
+        """Return the country's cumulative, active, daily and 7-day average series between start and end."""
+        cube = self.cube
+        derived = self.metrics
+        window = cube.date_slice(start, end)
+
+        series = pd.DataFrame({'Date': cube.date_index[window]})
+        for metric, column in SERIES_COLUMNS.items():
+            series[column] = cube.series(country, metric)[window]
+        for metric, column in DERIVED_COLUMNS.items():
+            series[column] = derived.series(country, metric)[window]
+        return series
+
+    def country_snapshot(self, country, date=None):
+        """Return every cube and derived metric of a country on a date (latest on or before it)."""
+        cube = self.cube
+        derived = self.metrics
+        position = self.date_position(date)
+
+        snapshot = {metric: int(cube.series(country, metric)[position]) for metric in SERIES_COLUMNS}
+        snapshot.update(
+            (metric, float(derived.series(country, metric)[position])) for metric in derived.metrics
+        )
+        return snapshot
+
+    def compare(self, countries, metrics=('confirmed',), start=None, end=None, per_capita=False):
+        """Return several countries' series in long form: Date, Country and one column per metric.
+
+        metrics are cube or derived metric names. All countries are read with
+        one fancy index per metric rather than one lookup per country. With
+        per_capita, values are per PER_CAPITA inhabitants and countries
+        without a known population are left out.
+        """
+        cube = self.cube
+        derived = self.metrics
+        window = cube.date_slice(start, end)
+        countries = [country for country in countries if country in cube]
+
+        scale = None
+        if per_capita:
+            if self.population is None:
+                raise ValueError("Per-capita series need the population table (population.csv)")
+            population = self.population.reindex(countries)
+            countries = [country for country, people in population.items() if people > 0]
+            scale = PER_CAPITA / population[countries].to_numpy(dtype=np.float64)[:, None]
+
+        rows = [cube.row(country) for country in countries]
+        dates = cube.date_index[window]
+
+        comparison = pd.DataFrame({
+            'Date': np.tile(dates, len(rows)),
+            'Country': np.repeat(countries, len(dates)),
+        })
+        columns = {**SERIES_COLUMNS, **DERIVED_COLUMNS}
+        for metric in metrics:
+            source = cube.metrics if metric in cube.metrics else derived.metrics
+            values = np.asarray(source[metric])[rows, window]
+            if scale is not None:
+                values = values * scale
+            comparison[columns[metric]] = values.ravel()
+        return comparison
+
+    def all_series(self, start=None, end=None):
+        """Return every country's series between start and end in long form (Date, Country, one column per series)."""
+        return self.compare(self.countries, [*SERIES_COLUMNS, *DERIVED_COLUMNS], start, end)
+
+    def leaderboard(self, metric='confirmed', date=None, n=10, min_confirmed=0):
+        """Return the top n countries by a ranked metric on a date (latest on or before it)."""
+        return self._loaded().ranking().top(metric, self.date_position(date), n, min_confirmed)
+
+    def province_matrix(self, dataset):
+        """Return the ProvinceMatrix (row metadata and counts) of a dataset."""
+        return self._loaded().province_matrix(dataset)
+
+    def provinces(self, country, date=None, dataset='confirmed'):
+        """Return each province's count on a date, largest first (empty if none)."""
+        matrix = self.province_matrix(dataset)
+        position = matrix.date_position(self.date_column(date))
+        rows, provinces = matrix.province_rows(country)
+
+        province_df = pd.DataFrame({
+            'Province': provinces,
+            'Cases': np.asarray(matrix.values)[rows, position],
+        })
+        return province_df.sort_values('Cases', ascending=False, ignore_index=True, kind='stable')
+
+    def locations(self, dataset='confirmed'):
+        """Return the LocationSnapshots (map points per level and date) of a dataset."""
+        return self._loaded().locations(dataset)
+
+    def map_snapshot(self, date=None, dataset='confirmed', level='countries'):
+        """Return the map points of a level on a date (latest on or before it) with a count."""
+        locations = self.locations(dataset)
+        return locations.snapshot(locations.matrix.date_position(self.date_column(date)), level)
+
+    def map_frames(self, dates, dataset='confirmed', level='countries'):
+        """Lazily yield (date, map points) for each date, one frame at a time."""
+        locations = self.locations(dataset)
+        for date in dates:
+            position = locations.matrix.date_position(self.date_column(date))
+            yield date, locations.snapshot(position, level)
+
+    def province_series(self, country, start=None, end=None, dataset='confirmed'):
+        """Return a country's province series between start and end: a Date column plus one column per province."""
+        matrix = self.province_matrix(dataset)
+        rows, provinces = matrix.province_rows(country)
+
+        window = self.cube.date_slice(start, end)
+        dates = self.cube.dates[window]
+        positions = [matrix.date_position(date) for date in dates]
+
+        values = np.asarray(matrix.values)[np.ix_(rows, positions)]
+        series = pd.DataFrame(values.T, columns=provinces)
+        series.insert(0, 'Date', self.cube.date_index[window])
+        return series
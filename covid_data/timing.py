@@ -0,0 +1,53 @@
+"""
+Wall-clock timing of named phases, e.g. the stages of one dashboard rerun.
+
+    timer = PhaseTimer()
+    with timer.phase('load'):
+        data = store.load()
+    timer.as_dict()  # {'started_at': ..., 'total': ..., 'phases': {'load': 0.012}}
+
+A phase entered more than once (e.g. in a loop) accumulates its time.
+"""
+import json
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+
+class PhaseTimer:
+    """Collects the duration of named phases in seconds, in first-seen order."""
+
+    def __init__(self, label=None):
+        self.label = label
+        self.started_at = datetime.now(timezone.utc).isoformat(timespec='milliseconds')
+        self.phases = {}
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def total(self):
+        """Seconds since the timer was created."""
+        return time.perf_counter() - self._start
+
+    def as_dict(self):
+        return {
+            'label': self.label,
+            'started_at': self.started_at,
+            'total': round(self.total(), 4),
+            'phases': {name: round(seconds, 4) for name, seconds in self.phases.items()},
+        }
+
+
+def timings_json(timers):
+    """Serialize PhaseTimers (or their as_dict() results) as a JSON document."""
+    runs = [t.as_dict() if isinstance(t, PhaseTimer) else t for t in timers]
+    return json.dumps({'runs': runs}, indent=2)
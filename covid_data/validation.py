@@ -0,0 +1,195 @@
+"""
+Validation of the raw JHU CSSE files before they are processed.
+
+Each dataset is checked as one (row, date) matrix, with every check a single
+vectorized pass over it:
+
+- duplicate (country, province) keys
+- date headers that do not parse as JHU dates
+- days missing from the daily sequence of dates
+- count cells that are not numbers
+- negative counts
+- cumulative counts that decrease from one date to the next
+
+Across datasets, the dates that survive processing (columns that are not
+entirely empty) must be the same in every dataset, so the country cube never
+has to drop dates one dataset lacks.
+
+Structural problems (duplicate keys, bad date headers, non-numeric cells,
+mismatched dates) are always errors. JHU does publish a few negative counts
+and downward revisions, so those only become errors above a share of the
+cells. A missing day only merges two days into one daily value, so date gaps
+are warnings. validate_raw() returns a compact report; callers reject the run if
+report['ok'] is false, before any processed file is rewritten.
+"""
+import os
+import re
+import logging
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from covid_data.config import raw_path, validation_report_path
+from covid_data.formats import JHU_DATE_FORMAT, KEY_COLS, date_columns, meta_columns
+from covid_data.io import write_json
+
+logger = logging.getLogger(__name__)
+
+# Largest share of count cells that may be negative, or lower than the day before
+MAX_NEGATIVE_SHARE = 0.001
+MAX_DECREASE_SHARE = 0.01
+
+# Headers made of digits and separators that are meant as dates (e.g. "13/45/20", "2020-01-22")
+DATE_LIKE = re.compile(r'[\d/.-]+')
+
+# Offending keys or dates listed per check in the report
+REPORT_EXAMPLES = 5
+
+
+class ValidationFailed(Exception):
+    """Raised when raw data fails validation; report holds the full validation report."""
+
+    def __init__(self, report):
+        super().__init__("; ".join(report['errors']))
+        self.report = report
+
+
+def _row_labels(df, rows):
+    keys = df[KEY_COLS].astype(object).fillna('').astype(str).to_numpy()[rows]
+    return [f"{province}, {country}" if province else country for province, country in keys]
+
+
+def check_frame(df):
+    """Run the per-dataset checks on a raw frame; returns counts and a few examples per check."""
+    date_cols = date_columns(df.columns)
+    bad_dates = [col for col in meta_columns(df.columns) if DATE_LIKE.fullmatch(str(col))]
+    parsed = pd.to_datetime(pd.Index(date_cols, dtype=object), format=JHU_DATE_FORMAT)
+
+    # Counts in chronological order, as floats so missing cells are NaN
+    order = np.argsort(parsed.values, kind='stable')
+    counts = df[[date_cols[i] for i in order]]
+
+    # Days between the first and last date that have no column
+    if len(parsed):
+        calendar = pd.date_range(parsed.min(), parsed.max(), freq='D')
+        missing_dates = calendar.difference(parsed)
+    else:
+        missing_dates = pd.DatetimeIndex([])
+    if all(pd.api.types.is_numeric_dtype(dtype) for dtype in counts.dtypes):
+        values = counts.to_numpy(dtype=np.float64)
+        non_numeric = np.zeros(values.shape, dtype=bool)
+    else:
+        # Only columns pandas could not read as numbers need coercing
+        raw_missing = counts.isna().to_numpy()
+        values = counts.apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+        non_numeric = np.isnan(values) & ~raw_missing
+
+    duplicates = df.duplicated(KEY_COLS, keep=False).to_numpy()
+    negative = values < 0
+    with np.errstate(invalid='ignore'):
+        decreasing = np.diff(values, axis=1) < 0
+    cells = max(values.size, 1)
+
+    # Dates processing keeps (all-empty columns are dropped)
+    kept_dates = [date_cols[i] for i, keep in zip(order, ~np.isnan(values).all(axis=0)) if keep]
+
+    return {
+        'rows': len(df),
+        'dates': len(date_cols),
+        'kept_dates': kept_dates,
+        'duplicate_keys': int(duplicates.sum()),
+        'duplicate_examples': sorted(set(_row_labels(df, np.flatnonzero(duplicates))))[:REPORT_EXAMPLES],
+        'unparsed_dates': len(bad_dates),
+        'unparsed_examples': bad_dates[:REPORT_EXAMPLES],
+        'missing_dates': len(missing_dates),
+        'missing_examples': [f"{d.month}/{d.day}/{d.year % 100:02d}" for d in missing_dates[:REPORT_EXAMPLES]],
+        'non_numeric_values': int(non_numeric.sum()),
+        'negative_values': int(negative.sum()),
+        'negative_share': float(negative.sum() / cells),
+        'negative_examples': _row_labels(df, np.flatnonzero(negative.any(axis=1)))[:REPORT_EXAMPLES],
+        'decreasing_values': int(decreasing.sum()),
+        'decreasing_share': float(decreasing.sum() / cells),
+        'decreasing_rows': int(decreasing.any(axis=1).sum()),
+    }
+
+
+def validate_frames(frames, max_negative_share=MAX_NEGATIVE_SHARE, max_decrease_share=MAX_DECREASE_SHARE):
+    """Validate raw frames ({dataset: DataFrame}); returns the report (ok, errors, warnings, datasets)."""
+    errors, warnings, datasets = [], [], {}
+
+    for key, df in frames.items():
+        stats = check_frame(df)
+        datasets[key] = stats
+        if stats['duplicate_keys']:
+            errors.append(f"{key}: {stats['duplicate_keys']} rows with duplicate keys {stats['duplicate_examples']}")
+        if stats['unparsed_dates']:
+            errors.append(f"{key}: {stats['unparsed_dates']} unparseable date columns {stats['unparsed_examples']}")
+        if stats['non_numeric_values']:
+            errors.append(f"{key}: {stats['non_numeric_values']} non-numeric counts")
+        if stats['missing_dates']:
+            warnings.append(f"{key}: {stats['missing_dates']} days missing from the dates {stats['missing_examples']}")
+
+        for check, share, limit in [
+            ('negative_values', stats['negative_share'], max_negative_share),
+            ('decreasing_values', stats['decreasing_share'], max_decrease_share),
+        ]:
+            if not stats[check]:
+                continue
+            message = f"{key}: {stats[check]} {check.replace('_', ' ')} ({share:.3%} of counts, limit {limit:.3%})"
+            (errors if share > limit else warnings).append(message)
+
+    # Every dataset must end up with the same dates
+    kept = {key: set(stats.pop('kept_dates')) for key, stats in datasets.items()}
+    shared = set.intersection(*kept.values()) if kept else set()
+    for key, dates in kept.items():
+        extra = sorted(dates - shared, key=lambda d: pd.to_datetime(d, format=JHU_DATE_FORMAT))
+        datasets[key]['unshared_dates'] = len(extra)
+        if extra:
+            errors.append(f"{key}: {len(extra)} dates missing from other datasets {extra[:REPORT_EXAMPLES]}")
+
+    return {
+        'ok': not errors,
+        'checked_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'errors': errors,
+        'warnings': warnings,
+        'datasets': datasets,
+    }
+
+
+def validate_raw(raw_dir, dataset_types, processed_dir=None, raise_on_error=False, **limits):
+    """Validate the raw files of several datasets in raw_dir; returns the report (see validate_files())."""
+    return validate_files(
+        {key: raw_path(raw_dir, key) for key in dataset_types},
+        processed_dir=processed_dir, raise_on_error=raise_on_error, **limits
+    )
+
+
+def validate_files(raw_files, processed_dir=None, raise_on_error=False, **limits):
+    """Validate raw files ({dataset: path}); returns the report.
+
+    With processed_dir the report is also written to validation_report.json
+    there. Errors and warnings are logged; with raise_on_error a failed
+    validation raises ValidationFailed once the report is written.
+    """
+    frames = {}
+    for key, raw_file in raw_files.items():
+        if not os.path.exists(raw_file):
+            raise FileNotFoundError(f"Raw file not found: {raw_file}")
+        frames[key] = pd.read_csv(raw_file)
+
+    report = validate_frames(frames, **limits)
+
+    for message in report['warnings']:
+        logger.warning(f"⚠️ {message}")
+    for message in report['errors']:
+        logger.error(f"❌ {message}")
+    if report['ok']:
+        logger.info(f"✅ Raw data valid: {len(frames)} datasets, {len(report['warnings'])} warning(s)")
+
+    if processed_dir is not None:
+        write_json(validation_report_path(processed_dir), report)
+
+    if raise_on_error and not report['ok']:
+        raise ValidationFailed(report)
+    return report
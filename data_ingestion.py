@@ -1,31 +1,27 @@
 import os
-import requests
 
-RAW_DATA_PATH = os.path.join(os.getcwd(), "data", "raw")
-os.makedirs(RAW_DATA_PATH, exist_ok=True)
+from covid_data import REFERENCE_URLS, URLS, data_dirs, fetch_all
 
-urls = {
-    "confirmed": "https://raw.githubusercontent.com/CSSEGISandData/COVID-19/master/csse_covid_19_data/csse_covid_19_time_series/time_series_covid19_confirmed_global.csv",
-    "deaths": "https://raw.githubusercontent.com/CSSEGISandData/COVID-19/master/csse_covid_19_data/csse_covid_19_time_series/time_series_covid19_deaths_global.csv",
-    "recovered": "https://raw.githubusercontent.com/CSSEGISandData/COVID-19/master/csse_covid_19_data/csse_covid_19_time_series/time_series_covid19_recovered_global.csv"
-}
+RAW_DATA_PATH, _ = data_dirs(os.getcwd())
 
 def download_data():
-    for key, url in urls.items():
-        raw_file = os.path.join(RAW_DATA_PATH, f"{key}.csv")
-        print(f"Downloading {key} data to {raw_file}...")
+    sources = {**URLS, **REFERENCE_URLS}
+    print(f"Downloading {len(sources)} datasets to {RAW_DATA_PATH}...")
 
-        try:
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            
-            with open(raw_file, "wb") as f:
-                f.write(response.content)
+    # All sources are fetched concurrently over one keep-alive session, with retries;
+    # sources unchanged since the last run are skipped
+    results = fetch_all(sources, RAW_DATA_PATH)
 
-            print(f"✅ Successfully downloaded: {raw_file}")
+    for key, stats in results.items():
+        raw_file = os.path.join(RAW_DATA_PATH, f"{key}.csv")
+        if stats['error']:
+            print(f"❌ Failed to download {key} after {stats['attempts']} attempts: {stats['error']}")
+        elif stats['changed']:
+            print(f"✅ Successfully downloaded: {raw_file} ({stats['bytes'] / 1024:.0f} KB in {stats['seconds']:.2f}s)")
+        else:
+            print(f"⏭️ Unchanged since last run: {raw_file} ({stats['seconds']:.2f}s)")
 
-        except requests.RequestException as e:
-            print(f"❌ Failed to download {key}: {e}")
+    return results
 
 if __name__ == "__main__":
     download_data()
@@ -1,66 +1,121 @@
 import os
-import pandas as pd
-import requests
+import sys
+import argparse
 import logging
 
+from covid_data import (
+    REFERENCE_URLS,
+    URLS,
+    data_dirs,
+    fetch_all,
+    process_all,
+    refresh_country_cube,
+    refresh_population,
+    validate_raw,
+)
+
 # Set up logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
-# Define file paths
+# Define file paths (directories are created if they don't exist)
 BASE_DIR = os.getcwd()
-RAW_DATA_PATH = os.path.join(BASE_DIR, "data", "raw")
-PROCESSED_DATA_PATH = os.path.join(BASE_DIR, "data", "processed")
-
-# Ensure directories exist
-os.makedirs(RAW_DATA_PATH, exist_ok=True)
-os.makedirs(PROCESSED_DATA_PATH, exist_ok=True)
-
-# URLs for downloading COVID-19 datasets
-urls = {
-    "confirmed": "https://raw.githubusercontent.com/CSSEGISandData/COVID-19/master/csse_covid_19_data/csse_covid_19_time_series/time_series_covid19_confirmed_global.csv",
-    "deaths": "https://raw.githubusercontent.com/CSSEGISandData/COVID-19/master/csse_covid_19_data/csse_covid_19_time_series/time_series_covid19_deaths_global.csv",
-    "recovered": "https://raw.githubusercontent.com/CSSEGISandData/COVID-19/master/csse_covid_19_data/csse_covid_19_time_series/time_series_covid19_recovered_global.csv"
-}
+RAW_DATA_PATH, PROCESSED_DATA_PATH = data_dirs(BASE_DIR)
 
-# Function to download data if missing
+# Function to download data that changed since the last run
 def download_data():
-    for key, url in urls.items():
-        raw_file = os.path.join(RAW_DATA_PATH, f"{key}.csv")
-        
-        if not os.path.exists(raw_file):  # Download only if file is missing
-            logging.info(f"Downloading {key} data...")
-            try:
-                response = requests.get(url, timeout=10)
-                response.raise_for_status()
-                with open(raw_file, "wb") as f:
-                    f.write(response.content)
-                logging.info(f"✅ Successfully downloaded {key}.csv")
-            except requests.RequestException as e:
-                logging.error(f"❌ Failed to download {key}: {e}")
+    # Fetch all sources (and the population lookup table) concurrently;
+    # unchanged sources are not downloaded again
+    results = fetch_all({**URLS, **REFERENCE_URLS}, RAW_DATA_PATH)
 
-# Function to process data
-def process_data():
-    download_data()  # Ensure data is available
+    changed = {}
+    for key, stats in results.items():
+        if stats['error']:
+            logging.error(f"❌ Failed to download {key}: {stats['error']}")
+        elif stats['changed']:
+            logging.info(f"✅ Successfully downloaded {key}.csv in {stats['seconds']:.2f}s")
+        changed[key] = stats['changed']
+    return changed
 
-    for key in urls.keys():
-        raw_file = os.path.join(RAW_DATA_PATH, f"{key}.csv")
-        processed_file = os.path.join(PROCESSED_DATA_PATH, f"{key}_processed.csv")
+# Function to process data
+def process_data(full_refresh=False, chunk_size=None, track_memory=False, workers=1, validate=True):
+    changed = download_data()  # Ensure data is available and current
 
+    # Reject invalid raw data before any processed file is rewritten
+    if validate and (full_refresh or any(changed.get(key, False) for key in URLS)):
         try:
-            logging.info(f"Processing {raw_file}...")
-            df = pd.read_csv(raw_file)
-            
-            # Example cleaning: Removing empty columns
-            df.dropna(axis=1, how="all", inplace=True)
+            report = validate_raw(RAW_DATA_PATH, list(URLS), PROCESSED_DATA_PATH)
+        except Exception as e:
+            logging.error(f"❌ Error validating raw data: {e}")
+            return False
+        if not report['ok']:
+            logging.error("❌ Raw data failed validation, nothing was processed")
+            return False
 
-            # Save processed data
-            df.to_csv(processed_file, index=False)
-            logging.info(f"✅ Processed data saved: {processed_file}")
+    # Datasets are independent, so with workers > 1 they are processed in
+    # parallel processes; each dataset's wall time is logged either way
+    results = process_all(
+        list(URLS), RAW_DATA_PATH, PROCESSED_DATA_PATH,
+        changed={key: changed.get(key, False) for key in URLS},
+        workers=workers,
+        full_refresh=full_refresh,
+        chunk_size=chunk_size,
+        track_memory=track_memory,
+    )
+    updated = any(stats['updated'] for stats in results.values())
 
-        except Exception as e:
-            logging.error(f"❌ Error in data processing: {e}")
+    # Pre-aggregate country-level series for the dashboard
+    try:
+        refresh_country_cube(PROCESSED_DATA_PATH, updated=updated or full_refresh)
+    except Exception as e:
+        logging.error(f"❌ Error building country cube: {e}")
+
+    # Country populations for per-capita comparisons in the dashboard
+    try:
+        refresh_population(RAW_DATA_PATH, PROCESSED_DATA_PATH, changed=changed.get('population', False))
+    except Exception as e:
+        logging.error(f"❌ Error processing population table: {e}")
+
+    return True
 
 if __name__ == "__main__":
-    process_data()
+    parser = argparse.ArgumentParser(description="Download and process COVID-19 data")
+    parser.add_argument(
+        "--full-refresh",
+        action="store_true",
+        help="rebuild processed files from scratch instead of appending new dates",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=None,
+        help="stream raw files in chunks of this many rows to bound memory use",
+    )
+    parser.add_argument(
+        "--track-memory",
+        action="store_true",
+        help="trace peak allocations while streaming (slow, for diagnostics)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="process datasets in parallel in this many worker processes",
+    )
+    parser.add_argument(
+        "--skip-validation",
+        action="store_true",
+        help="process raw files without validating them first",
+    )
+    args = parser.parse_args()
+
+    completed = process_data(
+        full_refresh=args.full_refresh,
+        chunk_size=args.chunk_size,
+        track_memory=args.track_memory,
+        workers=args.workers,
+        validate=not args.skip_validation,
+    )
 
+    if not completed:
+        sys.exit(1)
     logging.info("✅ Data processing complete.")
\ No newline at end of file
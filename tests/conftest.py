@@ -0,0 +1,49 @@
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class FixedETagHandler(QuietHandler):
+    """Ignores conditional headers and sends the same ETag whatever the file holds."""
+    etag = '"v1"'
+
+    def do_GET(self):
+        del self.headers['If-Modified-Since']
+        super().do_GET()
+
+    def end_headers(self):
+        self.send_header('ETag', self.etag)
+        super().end_headers()
+
+
+def serve(tmp_path, handler):
+    """Serve a temporary directory over HTTP; yields (directory, base URL)."""
+    served = tmp_path / "served"
+    served.mkdir()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(handler, directory=str(served)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield served, f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def http_dir(tmp_path):
+    """Serve a temporary directory over HTTP; yields (directory, base URL)."""
+    yield from serve(tmp_path, QuietHandler)
+
+
+@pytest.fixture
+def etag_http_dir(tmp_path):
+    """Like http_dir, from a server that ignores conditional headers and sends a fixed ETag."""
+    yield from serve(tmp_path, FixedETagHandler)
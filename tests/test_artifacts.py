@@ -0,0 +1,40 @@
+import os
+
+from covid_data.artifacts import ArtifactStore
+
+
+def publish_version(store, tmp_path, run_id, content):
+    source = tmp_path / "confirmed.csv"
+    source.write_text(content)
+    ref = store.publish("raw/confirmed", str(source))
+    store.write_manifest(run_id, ["raw/confirmed"])
+    return ref
+
+
+def test_gc_keeps_referenced_and_recent_objects(tmp_path):
+    store = ArtifactStore(str(tmp_path / "artifacts"))
+    old = publish_version(store, tmp_path, "run_1", "a,b\n1,2\n")
+    middle = publish_version(store, tmp_path, "run_2", "a,b\n1,3\n")
+    latest = publish_version(store, tmp_path, "run_3", "a,b\n1,4\n")
+
+    # Everything is younger than the default grace period
+    assert store.gc(keep_runs=1)['objects'] == 0
+
+    removed = store.gc(keep_runs=2, grace_seconds=0)
+    assert removed['runs'] == 1
+    assert removed['objects'] == 1
+    assert not os.path.exists(old['path'])
+    assert os.path.exists(middle['path'])
+    assert os.path.exists(latest['path'])
+    assert store.resolve(store.ref("raw/confirmed")) == latest['path']
+    assert [m['run_id'] for m in store.manifests()] == ["run_2", "run_3"]
+
+
+def test_gc_keeps_runs_without_manifest(tmp_path):
+    store = ArtifactStore(str(tmp_path / "artifacts"))
+    publish_version(store, tmp_path, "run_1", "a\n1\n")
+    store.record_task("run_2", "download", seconds=0.1)
+
+    store.gc(keep_runs=0, grace_seconds=0)
+    assert os.path.exists(os.path.join(store.root, "runs", "run_2", "tasks", "download.json"))
+    assert store.manifests() == []
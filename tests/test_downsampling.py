@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from covid_data.downsampling import lttb, lttb_indices, lttb_indices_2d, resample_mean
+
+
+def daily_frame(days, start='2020-01-22'):
+    dates = pd.date_range(start, periods=days, freq='D')
+    return pd.DataFrame({'Date': dates, 'Cases': np.arange(days, dtype=float)})
+
+
+@pytest.mark.parametrize('n_out', [3, 10, 100])
+def test_lttb_keeps_ends_and_budget(n_out):
+    rng = np.random.default_rng(1)
+    values = rng.normal(size=500).cumsum()
+
+    keep = lttb_indices(values, n_out)
+
+    assert len(keep) == n_out
+    assert keep[0] == 0 and keep[-1] == len(values) - 1
+    assert (np.diff(keep) > 0).all()
+
+
+def test_lttb_keeps_a_spike():
+    values = np.zeros(1000)
+    values[537] = 100
+
+    assert 537 in lttb_indices(values, 50)
+
+
+def test_lttb_rows_match_single_series():
+    rng = np.random.default_rng(2)
+    values = rng.normal(size=(3, 400)).cumsum(axis=1)
+
+    keep = lttb_indices_2d(values, 40)
+
+    for row, series in enumerate(values):
+        np.testing.assert_array_equal(keep[row], lttb_indices(series, 40))
+
+
+def test_short_series_unchanged():
+    np.testing.assert_array_equal(lttb_indices(np.arange(5), 10), np.arange(5))
+
+    df = daily_frame(20)
+    reduced, changed = lttb(df, ['Cases'], 50)
+    assert not changed and reduced is df
+
+    reduced, period = resample_mean(df, 50)
+    assert period is None and reduced is df
+
+
+@pytest.mark.parametrize('days, n_out, period', [
+    (100, 20, 'weekly'),
+    (400, 20, 'monthly'),
+    (1200, 20, 'quarterly'),
+    # Past the longest period the quarterly means are returned even if they do not fit
+    (1200, 5, 'quarterly'),
+])
+def test_resample_mean_picks_shortest_fitting_period(days, n_out, period):
+    assert resample_mean(daily_frame(days), n_out)[1] == period
+
+
+def test_resample_mean_values():
+    # Monday 2020-01-06 to Sunday 2020-01-19: two full weeks ending on Sundays
+    df = daily_frame(14, start='2020-01-06')
+
+    reduced, period = resample_mean(df, 5)
+
+    assert period == 'weekly'
+    assert reduced['Date'].tolist() == [pd.Timestamp('2020-01-12'), pd.Timestamp('2020-01-19')]
+    assert reduced['Cases'].tolist() == [3.0, 10.0]
@@ -0,0 +1,69 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from covid_data.ingest import fetch_if_changed
+from covid_data.pipeline import process_source
+
+DATES = ['1/22/20', '1/23/20', '1/24/20']
+
+
+def raw_frame(dates, empty=()):
+    df = pd.DataFrame({
+        'Province/State': [np.nan, 'Ontario'],
+        'Country/Region': ['Albania', 'Canada'],
+        'Lat': [41.1, 51.2],
+        'Long': [20.1, -85.3],
+    })
+    for k, date in enumerate(dates):
+        df[date] = [k, 10 * k]
+    for date in empty:
+        df[date] = np.nan
+    return df
+
+
+def publish(served, df, mtime):
+    """Write the source file and give it a distinct Last-Modified time."""
+    path = served / "confirmed.csv"
+    df.to_csv(path, index=False)
+    os.utime(path, (mtime, mtime))
+
+
+def run(url, raw_dir, processed_dir):
+    """Download and process the source the way the pipeline does."""
+    changed = fetch_if_changed(url, str(raw_dir / "confirmed.csv"))
+    processed_file, updated = process_source("confirmed", str(raw_dir), str(processed_dir), changed=changed)
+    return changed, updated, processed_file
+
+
+def test_incremental_runs_against_http_source(http_dir, tmp_path):
+    served, base_url = http_dir
+    url = f"{base_url}/confirmed.csv"
+    raw_dir, processed_dir = tmp_path / "raw", tmp_path / "processed"
+    raw_dir.mkdir()
+    processed_dir.mkdir()
+
+    publish(served, raw_frame(DATES[:2]), 1_600_000_000)
+    changed, updated, processed_file = run(url, raw_dir, processed_dir)
+    assert changed and updated
+    assert pd.read_csv(processed_file).columns[4:].tolist() == DATES[:2]
+
+    # Unchanged source: 304 Not Modified, nothing processed
+    assert run(url, raw_dir, processed_dir)[:2] == (False, False)
+
+    # A new date is appended
+    publish(served, raw_frame(DATES), 1_600_100_000)
+    changed, updated, _ = run(url, raw_dir, processed_dir)
+    assert changed and updated
+    processed = pd.read_csv(processed_file)
+    assert processed.columns[4:].tolist() == DATES
+    assert processed['1/24/20'].tolist() == [2, 20]
+
+    # A date the source lists without values yet is not new and rewrites nothing
+    os.utime(processed_file, (1_500_000_000, 1_500_000_000))
+    publish(served, raw_frame(DATES, empty=['1/25/20']), 1_600_200_000)
+    changed, updated, _ = run(url, raw_dir, processed_dir)
+    assert changed and not updated
+    assert os.path.getmtime(processed_file) == 1_500_000_000
+    assert pd.read_csv(processed_file).columns[4:].tolist() == DATES
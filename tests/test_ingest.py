@@ -0,0 +1,43 @@
+import os
+import time
+
+import pytest
+
+from covid_data.ingest import ChecksumMismatch, fetch_if_changed, fetch_source
+
+
+def test_client_errors_are_not_retried(http_dir, tmp_path):
+    _, base_url = http_dir
+    start = time.perf_counter()
+    stats = fetch_source(f"{base_url}/missing.csv", str(tmp_path / "missing.csv"), backoff=1.0)
+
+    assert stats['attempts'] == 1
+    assert '404' in stats['error']
+    assert time.perf_counter() - start < 1.0
+
+
+def test_connection_errors_are_retried(tmp_path):
+    # Nothing listens on port 9 of localhost (discard), so every attempt is refused
+    stats = fetch_source("http://127.0.0.1:9/confirmed.csv", str(tmp_path / "confirmed.csv"),
+                         retries=2, backoff=0.01)
+
+    assert stats['attempts'] == 3
+    assert stats['error']
+
+
+def test_resent_version_must_match_recorded_hash(etag_http_dir, tmp_path):
+    served, base_url = etag_http_dir
+    raw_file = str(tmp_path / "confirmed.csv")
+    (served / "confirmed.csv").write_text("a,b\n1,2\n")
+    assert fetch_if_changed(f"{base_url}/confirmed.csv", raw_file)
+
+    # Same ETag and content: the server re-sent the version we hold
+    assert not fetch_if_changed(f"{base_url}/confirmed.csv", raw_file)
+
+    # Same ETag but different bytes: rejected, the held file is kept
+    (served / "confirmed.csv").write_text("a,b\n1,3\n")
+    with pytest.raises(ChecksumMismatch):
+        fetch_if_changed(f"{base_url}/confirmed.csv", raw_file)
+    with open(raw_file) as f:
+        assert f.read() == "a,b\n1,2\n"
+    assert not os.path.exists(raw_file + ".part")
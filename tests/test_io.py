@@ -0,0 +1,33 @@
+import os
+
+from covid_data.io import read_json, write_json
+
+
+def test_round_trip_leaves_no_temporary_files(tmp_path):
+    path = str(tmp_path / 'state.json')
+    write_json(path, {'etag': 'abc'})
+    write_json(path, {'etag': 'def', 'sizes': [1, 2]}, indent=None)
+
+    assert read_json(path) == {'etag': 'def', 'sizes': [1, 2]}
+    assert os.listdir(tmp_path) == ['state.json']
+
+
+def test_missing_or_corrupt_files_return_default(tmp_path):
+    path = tmp_path / 'state.json'
+    assert read_json(str(path)) is None
+
+    path.write_text('{"etag": ')
+    assert read_json(str(path), default={}) == {}
+
+
+def test_failed_write_keeps_the_previous_file(tmp_path):
+    path = str(tmp_path / 'state.json')
+    write_json(path, {'etag': 'abc'})
+
+    try:
+        write_json(path, {'etag': object()})
+    except TypeError:
+        pass
+
+    assert read_json(path) == {'etag': 'abc'}
+    assert os.listdir(tmp_path) == ['state.json']
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+from covid_data.metrics import (
+    DERIVED_METRICS,
+    ROLLING_WINDOW,
+    derive_metrics,
+    growth_rate,
+    mortality_rate,
+    rolling_mean,
+)
+
+
+def test_rolling_mean_matches_pandas():
+    rng = np.random.default_rng(0)
+    values = rng.integers(0, 1000, size=(4, 30))
+
+    result = rolling_mean(values)
+
+    expected = np.vstack([pd.Series(row).rolling(ROLLING_WINDOW).mean().to_numpy() for row in values])
+    np.testing.assert_allclose(result, expected)
+    # The first window - 1 days have no full window
+    assert np.isnan(result[:, :ROLLING_WINDOW - 1]).all()
+    assert not np.isnan(result[:, ROLLING_WINDOW - 1:]).any()
+
+
+def test_rolling_mean_shorter_than_window():
+    result = rolling_mean(np.ones((2, ROLLING_WINDOW - 1), dtype=np.int64))
+    assert result.shape == (2, ROLLING_WINDOW - 1)
+    assert np.isnan(result).all()
+
+
+def test_mortality_rate_with_zero_cases():
+    confirmed = np.array([[0, 10, 200], [0, 0, 0]])
+    deaths = np.array([[0, 1, 5], [0, 0, 0]])
+
+    np.testing.assert_allclose(mortality_rate(confirmed, deaths), [[0, 10, 2.5], [0, 0, 0]])
+
+
+def test_growth_rate_without_a_base_is_nan():
+    confirmed = np.array([
+        [0, 0, 10, 20],
+        [5, 10, 10, 30],
+    ])
+
+    result = growth_rate(confirmed, window=2)
+
+    assert np.isnan(result[:, :2]).all()
+    # Nothing to grow from two days earlier
+    assert np.isnan(result[0, 2]) and np.isnan(result[0, 3])
+    np.testing.assert_allclose(result[1, 2:], [100, 200])
+
+
+def test_derive_metrics_keys():
+    zeros = np.zeros((1, 10), dtype=np.int64)
+    metrics = {name: zeros for name in ('confirmed', 'deaths', 'daily_confirmed', 'daily_deaths')}
+
+    derived = derive_metrics(metrics)
+
+    assert sorted(derived) == sorted(DERIVED_METRICS)
+    assert (derived['mortality_rate'] == 0).all()
+    assert np.isnan(derived['growth_7d']).all()
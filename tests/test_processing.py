@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from covid_data.formats import columnar_available, columnar_path, read_processed
+from covid_data.processing import process_full, process_streaming
+
+DATES = ['1/22/20', '1/23/20', '1/24/20']
+
+
+def global_frame():
+    """A global-layout raw frame whose provinces are missing for the first 6 rows."""
+    provinces = [np.nan] * 6 + ['Ontario', 'Quebec']
+    countries = ['A', 'B', 'C', 'D', 'E', 'F', 'Canada', 'Canada']
+    df = pd.DataFrame({
+        'Province/State': provinces,
+        'Country/Region': countries,
+        'Lat': np.arange(8, dtype=float),
+        'Long': -np.arange(8, dtype=float),
+    })
+    for k, date in enumerate(DATES):
+        df[date] = np.arange(8) * (k + 1)
+    df['1/25/20'] = np.nan
+    return df
+
+
+def us_frame():
+    """A US county-layout raw frame, with no Admin2/FIPS on the first rows."""
+    n = 6
+    df = pd.DataFrame({
+        'UID': 16 + np.arange(n),
+        'iso2': ['AS'] * 2 + ['US'] * (n - 2),
+        'iso3': ['ASM'] * 2 + ['USA'] * (n - 2),
+        'code3': [16] * 2 + [840] * (n - 2),
+        'FIPS': [np.nan] * 2 + [1001.0 + i for i in range(n - 2)],
+        'Admin2': [np.nan] * 2 + [f'County {i}' for i in range(n - 2)],
+        'Province_State': ['American Samoa'] * 2 + ['Alabama'] * (n - 2),
+        'Country_Region': ['US'] * n,
+        'Lat': np.arange(n, dtype=float),
+        'Long_': -np.arange(n, dtype=float),
+        'Combined_Key': [f'Place {i}, US' for i in range(n)],
+    })
+    for k, date in enumerate(DATES):
+        df[date] = np.arange(n) * (k + 1)
+    return df
+
+
+@pytest.mark.parametrize('chunk_size', [2, 5, 100])
+def test_streaming_chunks_smaller_than_first_province(tmp_path, chunk_size):
+    raw_file = tmp_path / 'confirmed.csv'
+    global_frame().to_csv(raw_file, index=False)
+
+    stats = process_streaming(str(raw_file), str(tmp_path / 'streamed.csv'), chunk_size=chunk_size)
+    process_full(str(raw_file), str(tmp_path / 'full.csv'))
+
+    assert stats['date_columns'] == DATES
+    streamed = pd.read_csv(tmp_path / 'streamed.csv')
+    pd.testing.assert_frame_equal(streamed, pd.read_csv(tmp_path / 'full.csv'))
+
+    if columnar_available():
+        typed = read_processed(str(tmp_path / 'streamed.csv'))
+        assert typed['Province/State'].tolist()[6:] == ['Ontario', 'Quebec']
+        assert typed['Province/State'].isna().sum() == 6
+        assert typed[DATES].to_numpy().tolist() == streamed[DATES].to_numpy().tolist()
+
+
+def test_us_county_layout_keeps_metadata(tmp_path):
+    raw_file = tmp_path / 'confirmed_us.csv'
+    us_frame().to_csv(raw_file, index=False)
+
+    assert process_full(str(raw_file), str(tmp_path / 'full.csv')) == DATES
+    stats = process_streaming(str(raw_file), str(tmp_path / 'streamed.csv'), chunk_size=2)
+    assert stats['date_columns'] == DATES
+
+    if columnar_available():
+        assert columnar_path(str(tmp_path / 'streamed.csv')).endswith('.feather')
+        typed = read_processed(str(tmp_path / 'streamed.csv'))
+        assert typed['Admin2'].tolist()[2:] == [f'County {i}' for i in range(4)]
+        assert typed['Combined_Key'].tolist()[0] == 'Place 0, US'
+        assert typed[DATES].to_numpy().tolist() == us_frame()[DATES].to_numpy().tolist()
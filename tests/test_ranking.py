@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from covid_data.cube import CountryCube
+from covid_data.metrics import DerivedMetrics
+from covid_data.ranking import RANKED_METRICS, RankingIndex, metric_arrays
+
+DATES = [f'1/{day}/20' for day in range(22, 32)]
+
+
+def processed_frame(counts):
+    """A processed-layout frame with one row per country and the given (country, date) counts."""
+    countries = list(counts)
+    df = pd.DataFrame({
+        'Province/State': [np.nan] * len(countries),
+        'Country/Region': countries,
+        'Lat': 0.0,
+        'Long': 0.0,
+    })
+    values = np.array([counts[country] for country in countries])
+    return pd.concat([df, pd.DataFrame(values, columns=DATES)], axis=1)
+
+
+@pytest.fixture
+def ranking():
+    days = np.arange(len(DATES))
+    # Ties on confirmed and deaths, no cases at all (NaN growth) and a late start
+    confirmed = {
+        'Atlantis': 100 + 10 * days,
+        'Borduria': 100 + 10 * days,
+        'Carpania': 0 * days,
+        'Dalmora': np.where(days < 5, 0, 50 * days),
+        'Elbonia': 300 + 0 * days,
+        'Freedonia': 20 * days,
+    }
+    deaths = {country: series // 10 for country, series in confirmed.items()}
+    recovered = {country: 0 * days for country in confirmed}
+    frames = {
+        'confirmed': processed_frame(confirmed),
+        'deaths': processed_frame(deaths),
+        'recovered': processed_frame(recovered),
+    }
+    cube = CountryCube.from_frames(frames)
+    return RankingIndex.from_metrics(cube, DerivedMetrics.from_cube(cube))
+
+
+def sorted_top(ranking, metric, position, n, min_confirmed=0):
+    """The top n countries from sorting the metric's column directly."""
+    arrays = metric_arrays(ranking.cube, ranking.derived)
+    column = pd.Series(arrays[metric][:, position], index=ranking.cube.countries)
+    confirmed = ranking.cube.metrics['confirmed'][:, position]
+    column = column[confirmed >= min_confirmed].dropna()
+    return column.sort_values(ascending=False, kind='stable').index[:n].tolist()
+
+
+@pytest.mark.parametrize('metric', list(RANKED_METRICS))
+@pytest.mark.parametrize('n', [1, 3, 10])
+def test_top_matches_sorting_the_column(ranking, metric, n):
+    for position in range(len(DATES)):
+        leaderboard = ranking.top(metric, position, n=n)
+        assert leaderboard['Country'].tolist() == sorted_top(ranking, metric, position, n)
+        assert leaderboard['Rank'].tolist() == list(range(1, len(leaderboard) + 1))
+
+
+@pytest.mark.parametrize('metric', list(RANKED_METRICS))
+def test_top_with_min_confirmed(ranking, metric):
+    position = len(DATES) - 1
+    leaderboard = ranking.top(metric, position, n=10, min_confirmed=200)
+    assert leaderboard['Country'].tolist() == sorted_top(ranking, metric, position, 10, min_confirmed=200)
+
+
+def test_nan_growth_is_left_out(ranking):
+    position = len(DATES) - 1
+    countries = ranking.top('growth_7d', position, n=10)['Country'].tolist()
+    # No cases seven days earlier, so no growth to rank
+    assert 'Carpania' not in countries and 'Dalmora' not in countries
+    # Equal values keep the country axis order
+    assert ranking.top('confirmed', 0, n=2)['Country'].tolist() == ['Elbonia', 'Atlantis']
@@ -0,0 +1,136 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from covid_data.config import validation_report_path
+from covid_data.validation import ValidationFailed, check_frame, validate_files, validate_frames
+
+DATES = ['1/22/20', '1/23/20', '1/24/20', '1/25/20']
+
+
+def raw_frame(dates=DATES, rows=3):
+    """A clean global-layout raw frame with rising cumulative counts."""
+    df = pd.DataFrame({
+        'Province/State': pd.Series([np.nan] * rows, dtype=object),
+        'Country/Region': [f'Country {i}' for i in range(rows)],
+        'Lat': np.arange(rows, dtype=float),
+        'Long': np.arange(rows, dtype=float),
+    })
+    for k, date in enumerate(dates):
+        df[date] = np.arange(rows) * 10 + k
+    return df
+
+
+def test_clean_frames_pass():
+    report = validate_frames({'confirmed': raw_frame(), 'deaths': raw_frame()})
+    assert report['ok']
+    assert report['errors'] == [] and report['warnings'] == []
+    assert report['datasets']['confirmed']['dates'] == len(DATES)
+
+
+def test_negative_counts_warn_below_limit_and_fail_above():
+    df = raw_frame()
+    df.loc[0, '1/22/20'] = -1
+
+    stats = check_frame(df)
+    assert stats['negative_values'] == 1
+    assert stats['negative_examples'] == ['Country 0']
+
+    report = validate_frames({'confirmed': df}, max_negative_share=0.5)
+    assert report['ok']
+    assert report['warnings'] == ["confirmed: 1 negative values (8.333% of counts, limit 50.000%)"]
+
+    report = validate_frames({'confirmed': df}, max_negative_share=0.01)
+    assert not report['ok']
+    assert report['errors'][0].startswith("confirmed: 1 negative values")
+
+
+def test_decreasing_cumulative_counts():
+    df = raw_frame()
+    df.loc[1, '1/24/20'] = 5
+
+    stats = check_frame(df)
+    assert stats['decreasing_values'] == 1
+    assert stats['decreasing_rows'] == 1
+
+    report = validate_frames({'confirmed': df}, max_decrease_share=0.01)
+    assert not report['ok']
+    assert report['errors'] == ["confirmed: 1 decreasing values (8.333% of counts, limit 1.000%)"]
+
+
+def test_duplicate_keys_are_errors():
+    df = raw_frame()
+    df.loc[2, 'Country/Region'] = 'Country 1'
+    df.loc[[1, 2], 'Province/State'] = 'North'
+
+    report = validate_frames({'confirmed': df})
+    assert not report['ok']
+    assert report['errors'] == ["confirmed: 2 rows with duplicate keys ['North, Country 1']"]
+
+
+def test_unparseable_dates_are_errors():
+    df = raw_frame()
+    df['13/45/20'] = df['1/25/20']
+    df['2020-01-26'] = df['1/25/20']
+
+    stats = check_frame(df)
+    assert stats['unparsed_dates'] == 2
+    assert stats['unparsed_examples'] == ['13/45/20', '2020-01-26']
+    assert stats['dates'] == len(DATES)
+    assert not validate_frames({'confirmed': df})['ok']
+
+
+def test_date_gaps_are_warnings():
+    df = raw_frame(dates=['1/22/20', '1/23/20', '1/26/20'])
+
+    stats = check_frame(df)
+    assert stats['missing_dates'] == 2
+    assert stats['missing_examples'] == ['1/24/20', '1/25/20']
+
+    report = validate_frames({'confirmed': df})
+    assert report['ok']
+    assert report['warnings'] == ["confirmed: 2 days missing from the dates ['1/24/20', '1/25/20']"]
+
+
+def test_mismatched_dates_between_datasets():
+    confirmed = raw_frame()
+    deaths = raw_frame(dates=DATES[:3])
+    # An all-empty column is dropped by processing, so it does not count
+    recovered = raw_frame()
+    recovered['1/25/20'] = np.nan
+
+    report = validate_frames({'confirmed': confirmed, 'deaths': deaths})
+    assert not report['ok']
+    assert report['errors'] == ["confirmed: 1 dates missing from other datasets ['1/25/20']"]
+    assert report['datasets']['confirmed']['unshared_dates'] == 1
+    assert report['datasets']['deaths']['unshared_dates'] == 0
+
+    assert validate_frames({'deaths': deaths, 'recovered': recovered})['ok']
+
+
+def test_validate_files_writes_report(tmp_path):
+    raw_dir = tmp_path / 'raw'
+    raw_dir.mkdir()
+    bad = raw_frame()
+    bad['1/24/20'] = bad['1/24/20'].astype(object)
+    bad.loc[0, '1/24/20'] = 'twelve'
+    raw_frame().to_csv(raw_dir / 'confirmed.csv', index=False)
+    bad.to_csv(raw_dir / 'deaths.csv', index=False)
+    files = {key: str(raw_dir / f'{key}.csv') for key in ('confirmed', 'deaths')}
+
+    report = validate_files(files, processed_dir=str(tmp_path))
+    assert not report['ok']
+    assert report['errors'] == ["deaths: 1 non-numeric counts"]
+    with open(validation_report_path(str(tmp_path))) as f:
+        assert json.load(f) == report
+
+    with pytest.raises(ValidationFailed) as failure:
+        validate_files(files, processed_dir=str(tmp_path), raise_on_error=True)
+    assert failure.value.report['errors'] == report['errors']
+
+
+def test_validate_files_missing_file(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        validate_files({'confirmed': str(tmp_path / 'confirmed.csv')})